@@ -0,0 +1,189 @@
+import os
+import time
+import uuid
+import random
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+import requests
+from requests.adapters import HTTPAdapter
+
+# Background delivery of Telegram alerts.
+# A submitted alert returns a delivery id at once; a small thread pool sends it
+# to every chat concurrently over one pooled keep-alive requests.Session (one
+# TLS handshake per pooled connection instead of one per message). Sends are
+# throttled by a token bucket for the bot-wide limit and a minimum interval per
+# chat, failed sends are retried with exponential backoff (honouring the
+# retry_after Telegram returns with 429), and the outcome per chat is kept so
+# callers can poll the delivery status.
+#
+# Serverless platforms (Vercel) may freeze or kill a function as soon as its
+# response is sent, taking background sends with them. With synchronous=True
+# (the default when VERCEL is set, or TELEGRAM_SYNC_DELIVERY=1) submit() still
+# sends to the chats concurrently but only returns once every send finished.
+
+TELEGRAM_API_BASE = 'https://api.telegram.org'
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, bursts up to `capacity`"""
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+class TelegramDelivery:
+    def __init__(self, bot_token, api_base=TELEGRAM_API_BASE, workers=8, rate_per_second=25.0,
+                 per_chat_interval=1.0, max_retries=3, backoff=1.0, timeout=10.0, history=500, synchronous=False):
+        self.bot_token = bot_token
+        self.synchronous = synchronous
+        self.api_base = api_base.rstrip('/')
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.history = history
+        self.per_chat_interval = per_chat_interval
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='telegram')
+        self.bucket = TokenBucket(rate_per_second)
+        self.lock = threading.Lock()
+        self.deliveries = OrderedDict()
+        self.chat_next_send = {}
+        self.sent = 0
+        self.failed = 0
+        self.retries = 0
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            os.environ.get('TELEGRAM_BOT_TOKEN'),
+            api_base=os.environ.get('TELEGRAM_API_BASE', TELEGRAM_API_BASE),
+            workers=int(os.environ.get('TELEGRAM_WORKERS', 8)),
+            rate_per_second=float(os.environ.get('TELEGRAM_RATE_PER_SECOND', 25)),
+            max_retries=int(os.environ.get('TELEGRAM_MAX_RETRIES', 3)),
+            synchronous=os.environ.get('TELEGRAM_SYNC_DELIVERY', '1' if os.environ.get('VERCEL') else '0') == '1'
+        )
+
+    @property
+    def url(self):
+        return f"{self.api_base}/bot{self.bot_token}/sendMessage"
+
+    def submit(self, chat_ids, message, parse_mode='HTML'):
+        """Queue one message for every chat; returns the delivery id (after sending, in synchronous mode)"""
+        # A chat listed twice gets the message once
+        chat_ids = list(dict.fromkeys(chat_ids))
+        delivery_id = uuid.uuid4().hex
+        delivery = {
+            'id': delivery_id,
+            'status': 'queued',
+            'created_at': time.time(),
+            'finished_at': None,
+            'chats': {chat_id: {'status': 'queued', 'attempts': 0, 'error': None} for chat_id in chat_ids}
+        }
+        with self.lock:
+            self.deliveries[delivery_id] = delivery
+            while len(self.deliveries) > self.history:
+                self.deliveries.popitem(last=False)
+        futures = [self.executor.submit(self._send, delivery, chat_id, message, parse_mode) for chat_id in chat_ids]
+        if self.synchronous:
+            wait(futures)
+        return delivery_id
+
+    def _wait_for_chat(self, chat_id):
+        # Telegram allows about one message per second to the same chat
+        with self.lock:
+            now = time.monotonic()
+            send_at = max(now, self.chat_next_send.get(chat_id, 0.0))
+            self.chat_next_send[chat_id] = send_at + self.per_chat_interval
+        if send_at > now:
+            time.sleep(send_at - now)
+
+    def _send(self, delivery, chat_id, message, parse_mode):
+        result = delivery['chats'][chat_id]
+        payload = {'chat_id': chat_id, 'text': message, 'parse_mode': parse_mode}
+        with self.lock:
+            delivery['status'] = 'sending'
+            result['status'] = 'sending'
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                with self.lock:
+                    self.retries += 1
+            self._wait_for_chat(chat_id)
+            self.bucket.acquire()
+            result['attempts'] = attempt + 1
+            retry_after = None
+            try:
+                response = self.session.post(self.url, json=payload, timeout=self.timeout)
+                if response.status_code == 200:
+                    result['status'], result['error'] = 'sent', None
+                    print(f"Telegram alert sent successfully to chat_id: {chat_id}")
+                    break
+                result['error'] = f"HTTP {response.status_code}: {response.text[:200]}"
+                if response.status_code == 429:
+                    try:
+                        retry_after = float(response.json().get('parameters', {}).get('retry_after', 0)) or None
+                    except ValueError:
+                        pass
+                elif response.status_code < 500:
+                    # Bad chat id, blocked bot, malformed message: retrying will not help
+                    break
+            except requests.RequestException as e:
+                result['error'] = str(e)
+            if attempt < self.max_retries:
+                time.sleep(retry_after or self.backoff * (2 ** attempt) * random.uniform(0.8, 1.2))
+        if result['status'] != 'sent':
+            result['status'] = 'failed'
+            print(f"Failed to send Telegram alert to chat_id: {chat_id}, Error: {result['error']}")
+        self._finish(delivery, result['status'] == 'sent')
+
+    def _finish(self, delivery, sent):
+        with self.lock:
+            if sent:
+                self.sent += 1
+            else:
+                self.failed += 1
+            statuses = [chat['status'] for chat in delivery['chats'].values()]
+            if all(status in ('sent', 'failed') for status in statuses):
+                delivery['finished_at'] = time.time()
+                if all(status == 'sent' for status in statuses):
+                    delivery['status'] = 'delivered'
+                elif any(status == 'sent' for status in statuses):
+                    delivery['status'] = 'partial'
+                else:
+                    delivery['status'] = 'failed'
+
+    def status(self, delivery_id):
+        with self.lock:
+            delivery = self.deliveries.get(delivery_id)
+            if delivery is None:
+                return None
+            chats = {chat_id: dict(result) for chat_id, result in delivery['chats'].items()}
+            status = dict(delivery, chats=chats)
+        status['successful_sends'] = sum(1 for result in chats.values() if result['status'] == 'sent')
+        status['failed_count'] = sum(1 for result in chats.values() if result['status'] == 'failed')
+        return status
+
+    def stats(self):
+        with self.lock:
+            pending = sum(1 for d in self.deliveries.values() if d['finished_at'] is None)
+            return {'sent': self.sent, 'failed': self.failed, 'retries': self.retries, 'pending_deliveries': pending}
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        self.session.close()
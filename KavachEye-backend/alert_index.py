@@ -0,0 +1,173 @@
+import os
+import time
+import threading
+from datetime import datetime
+
+# In-process index of active alerts for the per-location cooldown.
+# create_alert and the dashboard's /api/alert/status polls only need to know
+# when the latest active alert for a location was raised, so instead of a
+# Supabase query per call the index keeps {location: {alert_id: raised_at}}
+# for alerts younger than `cooldown` seconds. It is warmed from Supabase at
+# startup and written through by the routes that insert, resolve or reset
+# alerts; entries past the cooldown are dropped as they are read.
+#
+# Consistency (ALERT_INDEX_MODE):
+#   local         the index is authoritative. Right for a single backend
+#                 process, which is the only writer of its own alerts.
+#   read-through  for several instances behind a load balancer. A location's
+#                 entry is reloaded from Supabase once it is older than
+#                 ALERT_INDEX_MAX_STALENESS seconds, so alerts raised or
+#                 resolved by another instance show up within that bound.
+#                 Two instances can still both accept an alert for the same
+#                 location inside that window.
+#
+# The default is read-through (with a 1 second staleness bound) when VERCEL is
+# set, since serverless runs several short-lived instances, and local for the
+# long-running server.
+
+def parse_timestamp(value):
+    """Epoch seconds for a Supabase / isoformat timestamp (naive values are local time)"""
+    return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+
+class AlertCooldownIndex:
+    MODES = ('local', 'read-through')
+
+    def __init__(self, cooldown=180.0, mode='local', loader=None, max_staleness=10.0):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown alert index mode: {mode}")
+        if mode == 'read-through' and loader is None:
+            raise ValueError("read-through mode needs a loader")
+        self.cooldown = cooldown
+        self.mode = mode
+        self.loader = loader
+        self.max_staleness = max_staleness
+        self.locations = {}
+        self.loaded_at = {}
+        self.alert_locations = {}
+        self.lock = threading.Lock()
+        self.warmed = False
+        self.hits = 0
+        self.reloads = 0
+        self.reload_errors = 0
+
+    @classmethod
+    def from_env(cls, loader=None):
+        serverless = bool(os.environ.get('VERCEL'))
+        return cls(
+            cooldown=float(os.environ.get('ALERT_COOLDOWN_SECONDS', 180)),
+            mode=os.environ.get('ALERT_INDEX_MODE', 'read-through' if serverless else 'local'),
+            loader=loader,
+            max_staleness=float(os.environ.get('ALERT_INDEX_MAX_STALENESS', 1 if serverless else 10))
+        )
+
+    def warm(self, rows):
+        """Replace the index with active alert rows ({'id', 'location', 'timestamp'})"""
+        now = time.time()
+        with self.lock:
+            self.locations.clear()
+            self.alert_locations.clear()
+            for row in rows:
+                self._add(row.get('location'), row['id'], parse_timestamp(row['timestamp']))
+            self.loaded_at = {location: now for location in self.locations}
+            self.warmed = True
+        return len(self.alert_locations)
+
+    def _add(self, location, alert_id, raised_at):
+        self.locations.setdefault(location, {})[alert_id] = raised_at
+        self.alert_locations[alert_id] = location
+
+    def _discard(self, location):
+        for alert_id in self.locations.pop(location, {}):
+            self.alert_locations.pop(alert_id, None)
+
+    def _reload(self, location, now):
+        # Called with the lock released: the loader is a network round trip
+        try:
+            rows = self.loader(location, now - self.cooldown)
+        except Exception as e:
+            print(f"Error reloading alert index for {location}: {e}")
+            with self.lock:
+                self.reload_errors += 1
+            return
+        with self.lock:
+            self._discard(location)
+            for row in rows:
+                self._add(location, row['id'], parse_timestamp(row['timestamp']))
+            self.loaded_at[location] = now
+            self.reloads += 1
+
+    def _latest(self, location, now):
+        """Latest raise time inside the cooldown, pruning expired entries (called with the lock held)"""
+        alerts = self.locations.get(location)
+        if not alerts:
+            return None
+        for alert_id, raised_at in list(alerts.items()):
+            if now - raised_at >= self.cooldown:
+                del alerts[alert_id]
+                self.alert_locations.pop(alert_id, None)
+        if not alerts:
+            del self.locations[location]
+            return None
+        return max(alerts.values())
+
+    def remaining(self, location):
+        """Seconds until a new alert is allowed for the location (0 when none is active)"""
+        now = time.time()
+        if self.mode == 'read-through' and now - self.loaded_at.get(location, 0.0) > self.max_staleness:
+            self._reload(location, now)
+        with self.lock:
+            self.hits += 1
+            latest = self._latest(location, now)
+        return 0.0 if latest is None else max(0.0, latest + self.cooldown - now)
+
+    def claim(self, location, alert_id, raised_at=None):
+        """
+        Record a new alert unless the location is cooling down; returns the seconds
+        remaining (0 when the alert was recorded). Check and record happen under one
+        lock, so concurrent requests for a location cannot both pass.
+        """
+        now = time.time()
+        if self.mode == 'read-through' and now - self.loaded_at.get(location, 0.0) > self.max_staleness:
+            self._reload(location, now)
+        with self.lock:
+            self.hits += 1
+            latest = self._latest(location, now)
+            if latest is not None:
+                return max(0.0, latest + self.cooldown - now)
+            self._add(location, alert_id, raised_at if raised_at is not None else now)
+            return 0.0
+
+    def release(self, alert_id):
+        """Forget one alert (resolved, or never stored)"""
+        with self.lock:
+            location = self.alert_locations.pop(alert_id, None)
+            if location is None:
+                return
+            alerts = self.locations.get(location, {})
+            alerts.pop(alert_id, None)
+            if not alerts:
+                self.locations.pop(location, None)
+
+    def reset(self, location):
+        """Forget every alert of a location (all resolved)"""
+        with self.lock:
+            self._discard(location)
+
+    def stats(self):
+        now = time.time()
+        with self.lock:
+            active = {}
+            for location in list(self.locations):
+                latest = self._latest(location, now)
+                if latest is not None:
+                    active[location] = round(latest + self.cooldown - now, 1)
+            return {
+                'mode': self.mode,
+                'cooldown_seconds': self.cooldown,
+                'max_staleness_seconds': self.max_staleness if self.mode == 'read-through' else None,
+                'warmed': self.warmed,
+                'lookups': self.hits,
+                'reloads': self.reloads,
+                'reload_errors': self.reload_errors,
+                'cooling_down': active
+            }
@@ -1,8 +1,11 @@
 from flask import Flask, request, jsonify, Response
 from flask_cors import CORS
+from flask_socketio import SocketIO, emit
 import cv2
 import numpy as np
 import os
+import time
+import threading
 from datetime import datetime
 import json
 import hashlib
@@ -11,6 +14,14 @@ import secrets
 from dotenv import load_dotenv
 from supabase import create_client, Client
 import base64
+from collections import OrderedDict
+from stream_readers import StreamReaderRegistry
+from frame_cache import FrameResultCache
+from alert_delivery import TelegramDelivery
+from mailer import Mailer
+from alert_index import AlertCooldownIndex
+from blob_store import BlobStore, BlobStoreUnavailable, sniff_content_type
+from frame_decode import jpeg_dimensions, decode_frame
 
 # Load environment variables
 load_dotenv()
@@ -30,7 +41,12 @@ CORS(app, origins=[
     '*'
 ], 
      methods=['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS'],
-     allow_headers=['Content-Type', 'Authorization'])
+     allow_headers=['Content-Type', 'Authorization'],
+     expose_headers=['X-Cache', 'X-Cache-Hit-Rate', 'X-Cache-Saved-Ms', 'X-Cache-Distance'])
+
+# Socket.IO carries the persistent /analysis channel (needs a long-running
+# server; serverless deployments keep using the HTTP /api/predict endpoint)
+socketio = SocketIO(app, cors_allowed_origins='*', async_mode='threading')
 
 # Supabase Configuration
 SUPABASE_URL = os.environ.get('SUPABASE_URL')
@@ -54,9 +70,83 @@ def init_db():
         print(f"Error initializing database: {e}")
         raise e
 
+def load_active_alerts(location=None, since=None):
+    """Active alerts raised since `since` (epoch seconds), for one location or all"""
+    since = since if since is not None else time.time() - alert_index.cooldown
+    query = supabase.table('alerts').select('id, location, timestamp').eq('status', 'active').gte('timestamp', datetime.fromtimestamp(since).isoformat())
+    if location is not None:
+        query = query.eq('location', location)
+    return query.execute().data
+
+# Cooldown state per location, answered from memory (see alert_index.py for ALERT_INDEX_MODE)
+alert_index = AlertCooldownIndex.from_env(loader=load_active_alerts)
+
+def warm_alert_index():
+    try:
+        count = alert_index.warm(load_active_alerts())
+        print(f"Alert index warmed with {count} active alerts ({alert_index.mode} mode)")
+    except Exception as e:
+        print(f"Error warming alert index: {e}")
+
+def ensure_alert_index():
+    # Serverless imports never run __main__, so the first cooldown check warms the index
+    if not alert_index.warmed:
+        warm_alert_index()
+
+# Alert snapshots live in a content-addressed blob store; rows keep only the hash
+blob_store = BlobStore.from_env()
+
+# Snapshot hashes per alert id, so repeat image requests skip the database
+# (an alert's snapshot never changes once stored)
+alert_image_hashes = OrderedDict()
+ALERT_IMAGE_HASHES_MAX = 1024
+
+def stream_location(stream_id):
+    """Convert stream_id to location format (e.g., stream_park -> Park)"""
+    if stream_id == 'emergency_stream':
+        return 'Live Camera Feed'
+    return stream_id.replace('stream_', '').replace('_', ' ').title()
+
+def split_remaining(seconds):
+    return {
+        'minutes': max(0, int(seconds // 60)),
+        'seconds': max(0, int(seconds % 60))
+    }
+
 # Global variables for video streams
 active_streams = {}
 
+# One long-lived reader per started stream, reaped after STREAM_IDLE_TIMEOUT seconds without requests;
+# frames older than STREAM_MAX_FRAME_AGE seconds are reported as a stalled stream.
+# Reader threads need a long-running process: serverless functions (VERCEL) are
+# frozen between requests, so there STREAM_READERS defaults to off and every
+# request opens the stream itself.
+use_stream_readers = os.environ.get('STREAM_READERS', '0' if os.environ.get('VERCEL') else '1') == '1'
+stream_readers = StreamReaderRegistry(idle_timeout=int(os.environ.get('STREAM_IDLE_TIMEOUT', 300)),
+                                      max_frame_age=float(os.environ.get('STREAM_MAX_FRAME_AGE', 5))) if use_stream_readers else None
+
+def read_stream_frame(url):
+    """One frame from a freshly opened capture: (frame, capture time, error)"""
+    cap = cv2.VideoCapture(url)
+    try:
+        if not cap.isOpened():
+            return None, None, 'Cannot open video stream'
+        ret, frame = cap.read()
+        if not ret:
+            return None, None, 'Cannot read frame'
+        return frame, time.time(), None
+    finally:
+        cap.release()
+
+def get_stream_frame(stream_id):
+    """Latest frame, capture time and error from the stream's background reader (restarted if reaped)"""
+    if stream_readers is None:
+        return read_stream_frame(active_streams[stream_id]['url'])
+    reader = stream_readers.get(stream_id)
+    if reader is None:
+        reader = stream_readers.start(stream_id, active_streams[stream_id]['url'])
+    return reader.latest()
+
 @app.route('/')
 def home():
     return jsonify({"status": "running", "message": "KavachEye Backend Server (Supabase)"})
@@ -118,6 +208,10 @@ def start_stream():
             'last_update': datetime.now()
         }
         
+        # Start the background reader so frame requests are served immediately
+        if stream_readers is not None:
+            stream_readers.start(stream_id, stream_url)
+        
         return jsonify({
             'status': 'success',
             'message': f'Stream {stream_id} started successfully',
@@ -134,17 +228,10 @@ def get_frame(stream_id):
         if stream_id not in active_streams:
             return jsonify({'error': 'Stream not found'}), 404
         
-        stream_info = active_streams[stream_id]
-        cap = cv2.VideoCapture(stream_info['url'])
+        frame, frame_time, error = get_stream_frame(stream_id)
             
-        if not cap.isOpened():
-            return jsonify({'error': 'Cannot open video stream'}), 500
-        
-        ret, frame = cap.read()
-        cap.release()
-            
-        if not ret:
-            return jsonify({'error': 'Cannot read frame'}), 500
+        if frame is None:
+            return jsonify({'error': error or 'Cannot read frame'}), 500
             
         # Convert frame to base64
         _, buffer = cv2.imencode('.jpg', frame)
@@ -153,7 +240,7 @@ def get_frame(stream_id):
         return jsonify({
             'status': 'success',
             'frame': f'data:image/jpeg;base64,{frame_base64}',
-            'timestamp': datetime.now().isoformat()
+            'timestamp': datetime.fromtimestamp(frame_time).isoformat()
         })
         
     except Exception as e:
@@ -165,6 +252,8 @@ def stop_stream(stream_id):
     try:
         if stream_id in active_streams:
             del active_streams[stream_id]
+        if stream_readers is not None:
+            stream_readers.stop(stream_id)
         
         # Update stream status in Supabase
         supabase.table('streams').update({
@@ -191,7 +280,8 @@ def list_streams():
         return jsonify({
             'status': 'success',
             'streams': streams,
-            'active_count': len(active_streams)
+            'active_count': len(active_streams),
+            'readers': stream_readers.stats() if stream_readers is not None else None
         })
         
     except Exception as e:
@@ -200,6 +290,7 @@ def list_streams():
 @app.route('/api/alert', methods=['POST'])
 def create_alert():
     """Create a new alert"""
+    claimed_alert = None
     try:
         data = request.get_json()
         print(f"Creating alert with data: {data}")
@@ -226,62 +317,46 @@ def create_alert():
                 'image_captured': image_data is not None
             })
         
-        # Check if alert already sent for this location within the last 3 minutes
+        # Check if alert already sent for this location within the cooldown
+        # (claiming the slot here also records the new alert in the index)
+        alert_time = datetime.now()
         try:
-            from datetime import timedelta
-            three_minutes_ago = (datetime.now() - timedelta(minutes=3)).isoformat()
-            
-            existing_alert = supabase.table('alerts').select('*').eq('location', location).eq('status', 'active').gte('timestamp', three_minutes_ago).execute()
-            
-            if existing_alert.data:
-                # Calculate time remaining until next alert is allowed
-                latest_alert = max(existing_alert.data, key=lambda x: x.get('timestamp', ''))
-                alert_time = datetime.fromisoformat(latest_alert['timestamp'].replace('Z', '+00:00'))
-                next_allowed_time = alert_time + timedelta(minutes=3)
-                time_remaining = next_allowed_time - datetime.now()
-                minutes_remaining = max(0, int(time_remaining.total_seconds() // 60))
-                seconds_remaining = max(0, int(time_remaining.total_seconds() % 60))
-                
+            ensure_alert_index()
+            remaining = alert_index.claim(location, alert_id, alert_time.timestamp())
+            if remaining:
+                time_remaining = split_remaining(remaining)
                 return jsonify({
                     'status': 'error',
-                    'message': f'Alert already sent for this location. Next alert allowed in {minutes_remaining}m {seconds_remaining}s',
+                    'message': f"Alert already sent for this location. Next alert allowed in {time_remaining['minutes']}m {time_remaining['seconds']}s",
                     'alert_sent': True,
-                    'time_remaining': {
-                        'minutes': minutes_remaining,
-                        'seconds': seconds_remaining
-                    }
+                    'time_remaining': time_remaining
                 }), 400
+            claimed_alert = alert_id
         except Exception as e:
             print(f"Error checking existing alerts: {e}")
         
-        # Process image data if provided
+        # Process image data if provided: the bytes go to the blob store once and
+        # the row only records where to find them. Until the store is durable
+        # (BLOB_STORE_DIR set) the row keeps the data URL as well, so snapshots
+        # survive serverless cold starts and requests served by other instances
         image_url = None
-        image_filename = None
-        image_size = None
-        image_type = None
+        image_info = {'hash': None, 'size': None, 'width': None, 'height': None, 'thumbnail_hash': None}
         
         print(f"Image data received: {image_data is not None}")
         if image_data:
             print(f"Image data length: {len(image_data)}")
-            print(f"Image data starts with: {image_data[:50]}...")
             
             try:
-                # Generate unique filename
-                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                image_filename = f"alert_{alert_id}_{timestamp}.jpg"
-                
                 # Decode base64 image data
-                import base64
                 image_bytes = base64.b64decode(image_data.split(',')[1] if ',' in image_data else image_data)
-                image_size = len(image_bytes)
-                image_type = 'image/jpeg'
+                image_info = blob_store.put_image(image_bytes)
+                image_url = f"/api/alert/{alert_id}/image"
                 
-                # For now, we'll store the base64 data directly
-                # In production, you might want to upload to Supabase Storage
-                image_url = f"data:image/jpeg;base64,{base64.b64encode(image_bytes).decode()}"
-                
-                print(f"Image captured for alert {alert_id}: {image_filename} ({image_size} bytes)")
+                print(f"Image captured for alert {alert_id}: {image_info['hash'][:12]} ({image_info['size']} bytes)")
                 
+            except BlobStoreUnavailable as store_error:
+                # The alert is still raised with the snapshot kept inline
+                print(f"Alert {alert_id} image kept inline: {store_error}")
             except Exception as img_error:
                 print(f"Error processing image data: {img_error}")
                 image_data = None
@@ -294,10 +369,15 @@ def create_alert():
             'severity': severity,
             'message': message,
             'location': location,
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': alert_time.isoformat(),
             'status': 'active',
-            'image_data': image_data,
+            'image_data': image_data if image_data and not (blob_store.durable and image_url) else None,
             'image_url': image_url,
+            'image_hash': image_info['hash'],
+            'image_size': image_info['size'],
+            'image_width': image_info['width'],
+            'image_height': image_info['height'],
+            'image_thumbnail_hash': image_info['thumbnail_hash'],
             'image_timestamp': datetime.now().isoformat()
         }
         
@@ -307,6 +387,8 @@ def create_alert():
             print(f"Alert {alert_id} created successfully in Supabase")
         except Exception as supabase_error:
             print(f"Error inserting alert into Supabase: {supabase_error}")
+            # No row exists, so the location must not stay muted for the cooldown
+            alert_index.release(alert_id)
             # Return success anyway since the alert was processed
             return jsonify({
                 'status': 'success',
@@ -326,6 +408,9 @@ def create_alert():
         
     except Exception as e:
         print(f"Error creating alert: {str(e)}")
+        # An alert that never reached the database must not hold the cooldown
+        if claimed_alert is not None:
+            alert_index.release(claimed_alert)
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/alert/status/<stream_id>', methods=['GET'])
@@ -344,32 +429,13 @@ def get_alert_status(stream_id):
                 'message': 'Supabase not configured'
             })
         
-        # Convert stream_id to location format (e.g., stream_park -> Park)
-        location = stream_id.replace('stream_', '').replace('_', ' ').title()
-        if stream_id == 'emergency_stream':
-            location = 'Live Camera Feed'
-        
-        # Check if there's an active alert for this location within the last 3 minutes
-        from datetime import timedelta
-        three_minutes_ago = (datetime.now() - timedelta(minutes=3)).isoformat()
-        
-        result = supabase.table('alerts').select('*').eq('location', location).eq('status', 'active').gte('timestamp', three_minutes_ago).execute()
-        
-        alert_sent = len(result.data) > 0
-        time_remaining = None
-        
-        if alert_sent and result.data:
-            # Calculate time remaining until next alert is allowed
-            latest_alert = max(result.data, key=lambda x: x.get('timestamp', ''))
-            alert_time = datetime.fromisoformat(latest_alert['timestamp'].replace('Z', '+00:00'))
-            next_allowed_time = alert_time + timedelta(minutes=3)
-            time_remaining = next_allowed_time - datetime.now()
-            minutes_remaining = max(0, int(time_remaining.total_seconds() // 60))
-            seconds_remaining = max(0, int(time_remaining.total_seconds() % 60))
-            time_remaining = {
-                'minutes': minutes_remaining,
-                'seconds': seconds_remaining
-            }
+        location = stream_location(stream_id)
+        
+        # Answered from the in-memory cooldown index, no database round trip
+        ensure_alert_index()
+        remaining = alert_index.remaining(location)
+        alert_sent = remaining > 0
+        time_remaining = split_remaining(remaining) if alert_sent else None
         
         print(f"Alert status for {location}: {alert_sent}")
         
@@ -397,16 +463,14 @@ def get_alert_status(stream_id):
 def reset_alert_status(stream_id):
     """Reset alert status for a specific stream (for testing)"""
     try:
-        # Convert stream_id to location format
-        location = stream_id.replace('stream_', '').replace('_', ' ').title()
-        if stream_id == 'emergency_stream':
-            location = 'Live Camera Feed'
+        location = stream_location(stream_id)
         
         # Update all alerts for this location to resolved
         supabase.table('alerts').update({
             'status': 'resolved',
             'resolved_at': datetime.now().isoformat()
         }).eq('location', location).execute()
+        alert_index.reset(location)
         
         return jsonify({
             'status': 'success',
@@ -417,6 +481,62 @@ def reset_alert_status(stream_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/alert/index', methods=['GET'])
+def alert_index_status():
+    """Cooldown index mode, counters and the locations currently cooling down"""
+    return jsonify({'status': 'success', 'index': alert_index.stats()})
+
+def alert_image_hash(alert_id, thumbnail=False):
+    """Blob hash of an alert's snapshot (or thumbnail), or None if it has none"""
+    hashes = alert_image_hashes.get(alert_id)
+    if hashes is None:
+        result = supabase.table('alerts').select('image_hash, image_thumbnail_hash').eq('id', alert_id).execute()
+        if not result.data or not result.data[0].get('image_hash'):
+            return None
+        hashes = (result.data[0]['image_hash'], result.data[0].get('image_thumbnail_hash'))
+        alert_image_hashes[alert_id] = hashes
+        while len(alert_image_hashes) > ALERT_IMAGE_HASHES_MAX:
+            alert_image_hashes.popitem(last=False)
+    # Snapshots that could not be decoded have no thumbnail; serve the original
+    return (hashes[1] or hashes[0]) if thumbnail else hashes[0]
+
+def alert_inline_image(alert_id):
+    """Snapshot bytes from the row's inline data URL, or None"""
+    result = supabase.table('alerts').select('image_data').eq('id', alert_id).execute()
+    image_data = result.data[0].get('image_data') if result.data else None
+    if not image_data:
+        return None
+    return base64.b64decode(image_data.split(',')[1] if ',' in image_data else image_data)
+
+@app.route('/api/alert/<alert_id>/image', methods=['GET'])
+def alert_image(alert_id):
+    """Snapshot bytes of an alert (?thumbnail=1 for the small JPEG), cacheable forever"""
+    try:
+        digest = alert_image_hash(alert_id, option_enabled(request.args, 'thumbnail', False))
+        if digest is None:
+            return jsonify({'error': 'Alert has no image'}), 404
+        etag = f'"{digest}"'
+        headers = {
+            'ETag': etag,
+            'Cache-Control': 'public, max-age=31536000, immutable'
+        }
+        if etag in request.headers.get('If-None-Match', ''):
+            return Response(status=304, headers=headers)
+        data = blob_store.get(digest)
+        if data is None:
+            # The blob lived on another (or a recycled) instance: fall back to the
+            # inline copy rows keep while the store is not durable
+            data = alert_inline_image(alert_id)
+            if data is None:
+                return jsonify({'error': 'Image blob not found'}), 404
+            return Response(data, mimetype=sniff_content_type(data), headers={'Cache-Control': 'no-cache'})
+        return Response(data, mimetype=sniff_content_type(data), headers=headers)
+        
+    except BlobStoreUnavailable as e:
+        return jsonify({'error': str(e)}), 503
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/alerts', methods=['GET'])
 def list_alerts():
     """List all alerts"""
@@ -442,6 +562,7 @@ def resolve_alert(alert_id):
             'status': 'resolved',
             'resolved_at': datetime.now().isoformat()
         }).eq('id', alert_id).execute()
+        alert_index.release(alert_id)
         
         return jsonify({
             'status': 'success',
@@ -458,17 +579,10 @@ def detect_anomaly(stream_id):
         if stream_id not in active_streams:
             return jsonify({'error': 'Stream not found'}), 404
         
-        stream_info = active_streams[stream_id]
-        cap = cv2.VideoCapture(stream_info['url'])
-            
-        if not cap.isOpened():
-            return jsonify({'error': 'Cannot open video stream'}), 500
-        
-        ret, frame = cap.read()
-        cap.release()
+        frame, frame_time, error = get_stream_frame(stream_id)
         
-        if not ret:
-            return jsonify({'error': 'Cannot read frame'}), 500
+        if frame is None:
+            return jsonify({'error': error or 'Cannot read frame'}), 500
         
         # Basic anomaly detection (you can enhance this)
         # Convert to grayscale for processing
@@ -500,7 +614,7 @@ def detect_anomaly(stream_id):
             'anomaly_detected': anomaly_detected,
             'confidence': confidence,
             'frame': f'data:image/jpeg;base64,{frame_base64}',
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': datetime.fromtimestamp(frame_time).isoformat(),
             'metrics': {
                 'avg_brightness': float(avg_brightness),
                 'frame_size': frame.shape
@@ -578,9 +692,13 @@ def register():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# Telegram alerts are delivered in the background (pooled session, concurrent
+# sends, rate limited, retried); the endpoint only queues them
+telegram_delivery = TelegramDelivery.from_env()
+
 @app.route('/api/send-telegram-alert', methods=['POST'])
 def send_telegram_alert():
-    """Send alert via Telegram"""
+    """Queue an alert for every Telegram chat; returns 202 with a delivery id to poll (200 once sent, when synchronous)"""
     try:
         data = request.get_json()
         message = data.get('message', 'Alert from KavachEye')
@@ -588,365 +706,106 @@ def send_telegram_alert():
         # Get environment variables
         bot_token = os.environ.get('TELEGRAM_BOT_TOKEN')
         chat_ids = os.environ.get('TELEGRAM_CHAT_IDS')
+        if not bot_token or not chat_ids:
+            return jsonify({'status': 'error', 'message': 'Telegram is not configured'}), 500
         
-        # Split chat IDs
-        chat_id_list = [chat_id.strip() for chat_id in chat_ids.split(',')]
+        # Split chat IDs (each chat once, even if listed twice)
+        chat_id_list = list(dict.fromkeys(chat_id.strip() for chat_id in chat_ids.split(',') if chat_id.strip()))
         
-        # Telegram API URL
-        url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
-        
-        success_count = 0
-        failed_count = 0
-        
-        for chat_id in chat_id_list:
-            try:
-                # Prepare payload
-                payload = {
-                    'chat_id': chat_id,
-                    'text': message,
-                    'parse_mode': 'HTML'
-                }
-                
-                import requests
-                response = requests.post(url, json=payload)
-                
-                if response.status_code == 200:
-                    success_count += 1
-                    print(f"Telegram alert sent successfully to chat_id: {chat_id}")
-                else:
-                    failed_count += 1
-                    print(f"Failed to send Telegram alert to chat_id: {chat_id}, Response: {response.text}")
-                    
-            except Exception as e:
-                failed_count += 1
-                print(f"Error sending Telegram alert to chat_id: {chat_id}, Error: {str(e)}")
-        
-        if success_count > 0:
-            return jsonify({
-                'status': 'success',
-                'message': f'Telegram alert sent successfully to {success_count} recipients',
-                'successful_sends': success_count,
-                'failed_count': failed_count
-            })
-        else:
+        delivery_id = telegram_delivery.submit(chat_id_list, message)
+        if telegram_delivery.synchronous:
+            # Serverless: the sends have already finished, report their outcome
+            delivery = telegram_delivery.status(delivery_id)
+            if delivery['successful_sends'] > 0:
+                return jsonify({
+                    'status': 'success',
+                    'message': f"Telegram alert sent successfully to {delivery['successful_sends']} recipients",
+                    'successful_sends': delivery['successful_sends'],
+                    'failed_count': delivery['failed_count'],
+                    'delivery_id': delivery_id
+                })
             return jsonify({
                 'status': 'error',
                 'message': 'Failed to send Telegram alert to any recipients',
-                'failed_count': failed_count
+                'failed_count': delivery['failed_count'],
+                'delivery_id': delivery_id
             }), 500
+        return jsonify({
+            'status': 'accepted',
+            'message': f'Telegram alert queued for {len(chat_id_list)} recipients',
+            'delivery_id': delivery_id,
+            'recipients': len(chat_id_list),
+            'status_url': f'/api/telegram-delivery/{delivery_id}'
+        }), 202
             
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/telegram-delivery/<delivery_id>', methods=['GET'])
+def telegram_delivery_status(delivery_id):
+    """Per-chat outcome of a queued Telegram alert"""
+    status = telegram_delivery.status(delivery_id)
+    if status is None:
+        return jsonify({'status': 'error', 'message': 'Unknown delivery id'}), 404
+    return jsonify({'status': 'success', 'delivery': status, 'totals': telegram_delivery.stats()})
+
+# Alert emails go through the mailer queue (pooled SMTP connections, template
+# compiled once, recipients batched); the endpoint only queues them
+mailer = Mailer.from_env()
+
 @app.route('/api/send-email-alert', methods=['POST'])
 def send_email_alert():
-    """Send alert via email"""
+    """Queue an alert email for every recipient; returns 202 with a delivery id to poll (200 once sent, when synchronous)"""
     try:
         data = request.get_json()
         subject = data.get('subject', 'KavachEye Security Alert')
         message = data.get('message', 'Alert from KavachEye')
         
         # Get environment variables
-        gmail_email = os.environ.get('GMAIL_EMAIL')
-        gmail_password = os.environ.get('GMAIL_APP_PASSWORD')
         recipient_emails = os.environ.get('RECIPIENT_EMAILS')
+        if not recipient_emails or not mailer.sender:
+            return jsonify({'status': 'error', 'message': 'Email is not configured'}), 500
         
-        # Split recipient emails
-        recipients = [email.strip() for email in recipient_emails.split(',')]
+        # Split recipient emails (each address once, even if listed twice)
+        recipients = list(dict.fromkeys(email.strip() for email in recipient_emails.split(',') if email.strip()))
         
-        try:
-            import smtplib
-            from email.mime.text import MIMEText
-            from email.mime.multipart import MIMEMultipart
-            
-            # Create SMTP session
-            server = smtplib.SMTP('smtp.gmail.com', 587)
-            server.starttls()
-            server.login(gmail_email, gmail_password)
-            
-            successful_sends = 0
-            
-            # Send individual email to each recipient
-            for recipient in recipients:
-                try:
-                    # Create message for individual recipient
-                    msg = MIMEMultipart('alternative')
-                    msg['From'] = gmail_email
-                    msg['To'] = recipient
-                    msg['Subject'] = subject
-                    
-                    # Create HTML email template
-                    html_template = f"""
-                    <!DOCTYPE html>
-                    <html lang="en">
-                    <head>
-                        <meta charset="UTF-8">
-                        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-                        <title>SECURITY ALERT - KavachEye System</title>
-                        <style>
-                            body {{
-                                font-family: Arial, sans-serif;
-                                margin: 0;
-                                padding: 20px;
-                                background-color: #f4f4f4;
-                                color: #333;
-                                line-height: 1.6;
-                            }}
-                            .container {{
-                                max-width: 600px;
-                                margin: 0 auto;
-                                background-color: #ffffff;
-                                border-radius: 12px;
-                                box-shadow: 0 4px 20px rgba(0, 0, 0, 0.1);
-                                overflow: hidden;
-                            }}
-                            .header {{
-                                background: linear-gradient(135deg, #d32f2f 0%, #b71c1c 100%);
-                                color: white;
-                                padding: 30px;
-                                text-align: center;
-                            }}
-                            .header h1 {{
-                                margin: 0;
-                                font-size: 24px;
-                                font-weight: bold;
-                                text-transform: uppercase;
-                                letter-spacing: 1px;
-                            }}
-                            .header p {{
-                                margin: 8px 0 0 0;
-                                font-size: 14px;
-                                opacity: 0.9;
-                            }}
-                            .content {{
-                                padding: 30px;
-                            }}
-                            .main-alert-box {{
-                                background: linear-gradient(135deg, #fff5f5 0%, #ffebee 100%);
-                                border: 2px solid #f44336;
-                                border-radius: 12px;
-                                padding: 25px;
-                                margin-bottom: 25px;
-                                box-shadow: 0 2px 10px rgba(244, 67, 54, 0.1);
-                            }}
-                            .alert-title {{
-                                color: #d32f2f;
-                                font-weight: bold;
-                                font-size: 18px;
-                                margin-bottom: 15px;
-                                text-transform: uppercase;
-                                display: flex;
-                                align-items: center;
-                                gap: 10px;
-                            }}
-                            .alert-message {{
-                                color: #333;
-                                margin: 0 0 20px 0;
-                                font-size: 15px;
-                                line-height: 1.6;
-                            }}
-                            .alert-details {{
-                                background-color: rgba(255, 255, 255, 0.7);
-                                border-radius: 8px;
-                                padding: 20px;
-                                margin: 20px 0;
-                            }}
-                            .detail-row {{
-                                display: flex;
-                                justify-content: space-between;
-                                align-items: center;
-                                padding: 8px 0;
-                                border-bottom: 1px solid #eee;
-                            }}
-                            .detail-row:last-child {{
-                                border-bottom: none;
-                            }}
-                            .detail-label {{
-                                font-weight: bold;
-                                color: #555;
-                                font-size: 13px;
-                            }}
-                            .detail-value {{
-                                color: #333;
-                                font-size: 13px;
-                            }}
-                            .priority-high {{
-                                background-color: #ffebee;
-                                color: #d32f2f;
-                                font-weight: bold;
-                                padding: 4px 8px;
-                                border-radius: 4px;
-                            }}
-                            .status-active {{
-                                background-color: #e8f5e8;
-                                color: #2e7d32;
-                                font-weight: bold;
-                                padding: 4px 8px;
-                                border-radius: 4px;
-                            }}
-                            .action-buttons {{
-                                display: flex;
-                                gap: 15px;
-                                justify-content: center;
-                                margin-top: 25px;
-                            }}
-                            .btn {{
-                                display: inline-block;
-                                padding: 12px 24px;
-                                text-decoration: none;
-                                border-radius: 8px;
-                                font-weight: bold;
-                                font-size: 14px;
-                                text-align: center;
-                                transition: all 0.3s ease;
-                                border: none;
-                                cursor: pointer;
-                            }}
-                            .btn-primary {{
-                                background: linear-gradient(135deg, #1976d2 0%, #1565c0 100%);
-                                color: white;
-                                box-shadow: 0 2px 8px rgba(25, 118, 210, 0.3);
-                            }}
-                            .btn-primary:hover {{
-                                transform: translateY(-2px);
-                                box-shadow: 0 4px 12px rgba(25, 118, 210, 0.4);
-                            }}
-                            .btn-secondary {{
-                                background: linear-gradient(135deg, #388e3c 0%, #2e7d32 100%);
-                                color: white;
-                                box-shadow: 0 2px 8px rgba(56, 142, 60, 0.3);
-                            }}
-                            .btn-secondary:hover {{
-                                transform: translateY(-2px);
-                                box-shadow: 0 4px 12px rgba(56, 142, 60, 0.4);
-                            }}
-                            .timestamp {{
-                                text-align: center;
-                                padding: 15px;
-                                background-color: #f8f9fa;
-                                border-top: 1px solid #eee;
-                                font-size: 12px;
-                                color: #666;
-                            }}
-                            .footer {{
-                                background-color: #f5f5f5;
-                                padding: 20px;
-                                text-align: center;
-                                border-top: 1px solid #eee;
-                                font-size: 12px;
-                                color: #666;
-                            }}
-                            .logo {{
-                                font-size: 32px;
-                                margin-bottom: 15px;
-                            }}
-                        </style>
-                    </head>
-                    <body>
-                        <div class="container">
-                            <div class="header">
-                                <div class="logo">🚨</div>
-                                <h1>SECURITY ALERT</h1>
-                                <p>KavachEye Security Monitoring System</p>
-                            </div>
-                            
-                            <div class="content">
-                                <div class="main-alert-box">
-                                    <div class="alert-title">
-                                        ⚠️ SECURITY INCIDENT DETECTED
-                                    </div>
-                                    <div class="alert-message">{message}</div>
-                                    
-                                    <div class="alert-details">
-                                        <div class="detail-row">
-                                            <span class="detail-label">Alert ID:</span>
-                                            <span class="detail-value">ALERT-{datetime.now().strftime('%Y%m%d%H%M%S')}</span>
-                                        </div>
-                                        <div class="detail-row">
-                                            <span class="detail-label">Alert Type:</span>
-                                            <span class="detail-value priority-high">Security Incident</span>
-                                        </div>
-                                        <div class="detail-row">
-                                            <span class="detail-label">Severity Level:</span>
-                                            <span class="detail-value priority-high">HIGH PRIORITY</span>
-                                        </div>
-                                        <div class="detail-row">
-                                            <span class="detail-label">Location:</span>
-                                            <span class="detail-value">Camera Feed Zone</span>
-                                        </div>
-                                        <div class="detail-row">
-                                            <span class="detail-label">Detection Time:</span>
-                                            <span class="detail-value">{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</span>
-                                        </div>
-                                        <div class="detail-row">
-                                            <span class="detail-label">System Status:</span>
-                                            <span class="detail-value status-active">ACTIVE MONITORING</span>
-                                        </div>
-                                        <div class="detail-row">
-                                            <span class="detail-label">Response Status:</span>
-                                            <span class="detail-value status-active">AUTHORITIES NOTIFIED</span>
-                                        </div>
-                                    </div>
-                                    
-                                    <div class="action-buttons">
-                                        <a href="https://kavacheye-frontend.vercel.app" class="btn btn-primary">📊 View Dashboard</a>
-                                        <a href="#" class="btn btn-secondary">✅ Mark as Resolved</a>
-                                    </div>
-                                </div>
-                            </div>
-                            
-                            <div class="timestamp">
-                                Alert generated: {datetime.now().strftime('%B %d, %Y at %I:%M:%S %p')} UTC
-                            </div>
-                            
-                            <div class="footer">
-                                <p><strong>This is an automated security alert from KavachEye Security System.</strong></p>
-                                <p>For immediate assistance, contact your security administrator or call emergency services.</p>
-                                <p>Do not reply to this email. This is a system-generated notification.</p>
-                            </div>
-                        </div>
-                    </body>
-                    </html>
-                    """
-                    
-                    # Create both plain text and HTML versions
-                    text_part = MIMEText(message, 'plain')
-                    html_part = MIMEText(html_template, 'html')
-                    
-                    # Attach both parts
-                    msg.attach(text_part)
-                    msg.attach(html_part)
-                    
-                    # Send individual email
-                    text = msg.as_string()
-                    server.sendmail(gmail_email, [recipient], text)
-                    successful_sends += 1
-                    
-                    print(f"Email Alert sent successfully to: {recipient}")
-                    
-                except Exception as individual_error:
-                    print(f"Failed to send email to {recipient}: {individual_error}")
-                    continue
-            
-            server.quit()
-            
-            return jsonify({
-                'status': 'success',
-                'message': 'Email alerts sent successfully',
-                'successful_sends': successful_sends,
-                'recipients': recipients
-            })
-            
-        except Exception as email_error:
-            print(f"Email sending error: {email_error}")
+        delivery_id = mailer.submit(subject, message, recipients)
+        if mailer.synchronous:
+            # Serverless: the emails have already been sent, report their outcome
+            delivery = mailer.status(delivery_id)
+            if delivery['successful_sends'] > 0:
+                return jsonify({
+                    'status': 'success',
+                    'message': 'Email alerts sent successfully',
+                    'successful_sends': delivery['successful_sends'],
+                    'failed_count': delivery['failed_count'],
+                    'delivery_id': delivery_id
+                })
             return jsonify({
                 'status': 'error',
-                'message': f'Failed to send email: {str(email_error)}'
+                'message': 'Failed to send email to any recipients',
+                'failed_count': delivery['failed_count'],
+                'delivery_id': delivery_id
             }), 500
+        return jsonify({
+            'status': 'accepted',
+            'message': f'Email alert queued for {len(recipients)} recipients',
+            'delivery_id': delivery_id,
+            'recipients': recipients,
+            'status_url': f'/api/email-delivery/{delivery_id}'
+        }), 202
             
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/email-delivery/<delivery_id>', methods=['GET'])
+def email_delivery_status(delivery_id):
+    """Per-recipient outcome of a queued alert email"""
+    status = mailer.status(delivery_id)
+    if status is None:
+        return jsonify({'status': 'error', 'message': 'Unknown delivery id'}), 404
+    return jsonify({'status': 'success', 'delivery': status, 'totals': mailer.stats()})
+
 @app.route('/api/get-telegram-updates', methods=['GET'])
 def get_telegram_updates():
     """Get Telegram bot updates"""
@@ -1070,69 +929,219 @@ def login():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# Near-duplicate frames from the same stream reuse the cached analysis
+predict_cache = FrameResultCache.from_env()
+
+def analyze_frame(frame):
+    """Analytics and detections for one decoded frame"""
+    # Basic AI analysis (simulated for now)
+    # In production, you would load your trained models here
+    
+    # Simulate gender detection
+    male_count = np.random.randint(0, 3)
+    female_count = np.random.randint(0, 2)
+    
+    # Simulate violence detection
+    violence_detected = bool(np.random.choice([True, False], p=[0.1, 0.9]))
+    violence_count = 1 if violence_detected else 0
+    
+    # Calculate safety score
+    safety_score = max(0, 100 - (violence_count * 20) - (male_count * 5))
+    
+    # Simulate pose detection
+    pose_detected = bool(np.random.choice([True, False], p=[0.3, 0.7]))
+    
+    return {
+        'analytics': {
+            'maleCount': male_count,
+            'femaleCount': female_count,
+            'violenceCount': violence_count,
+            'safetyScore': safety_score,
+            'poseDetected': pose_detected
+        },
+        'detections': {
+            'people': male_count + female_count,
+            'anomalies': violence_count,
+            'pose_analysis': pose_detected
+        }
+    }
+
+def read_predict_request():
+    """
+    Image bytes and options from a /api/predict request. Accepts a raw image body
+    (image/jpeg, options in the query string), a multipart upload (file field
+    'image' or 'frame') or the original JSON with a base64 data URL.
+    """
+    if request.mimetype.startswith('image/') or request.mimetype == 'application/octet-stream':
+        return request.get_data(), request.args.to_dict()
+    if request.mimetype == 'multipart/form-data':
+        upload = request.files.get('image') or request.files.get('frame')
+        if upload is None:
+            raise ValueError('No image data provided')
+        options = request.form.to_dict()
+        options.update(request.args.to_dict())
+        return upload.read(), options
+    data = request.get_json(silent=True)
+    if not data or 'image' not in data:
+        raise ValueError('No image data provided')
+    # Decode base64 image
+    image_data = data['image'].split(',')[1] if ',' in data['image'] else data['image']
+    return base64.b64decode(image_data), data
+
+def option_enabled(options, name, default=True):
+    value = options.get(name, default)
+    if isinstance(value, str):
+        return value.strip().lower() not in ('0', 'false', 'no', 'off')
+    return bool(value)
+
+def run_prediction(frame, stream_id):
+    """Analysis for one decoded frame through the result cache; returns (result, cache_hit, distance)"""
+    frame_hash = predict_cache.frame_hash(frame)
+    result, distance, _ = predict_cache.lookup(stream_id, frame_hash)
+    if result is not None:
+        return result, True, distance
+    start = time.time()
+    result = analyze_frame(frame)
+    predict_cache.store(stream_id, frame_hash, result, (time.time() - start) * 1000)
+    return result, False, None
+
 @app.route('/api/predict', methods=['POST'])
 def predict_ai():
     """AI prediction endpoint for hybrid camera"""
     try:
-        data = request.get_json()
-        
-        if not data or 'image' not in data:
-            return jsonify({'error': 'No image data provided'}), 400
-        
-        # Decode base64 image
-        image_data = data['image'].split(',')[1] if ',' in data['image'] else data['image']
-        image_bytes = base64.b64decode(image_data)
+        try:
+            image_bytes, options = read_predict_request()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
         # Convert to OpenCV format
-        nparr = np.frombuffer(image_bytes, np.uint8)
-        frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        frame = decode_frame(image_bytes)
         
         if frame is None:
             return jsonify({'error': 'Invalid image data'}), 400
         
-        # Basic AI analysis (simulated for now)
-        # In production, you would load your trained models here
-        
-        # Simulate gender detection
-        male_count = np.random.randint(0, 3)
-        female_count = np.random.randint(0, 2)
-        
-        # Simulate violence detection
-        violence_detected = bool(np.random.choice([True, False], p=[0.1, 0.9]))
-        violence_count = 1 if violence_detected else 0
-        
-        # Calculate safety score
-        safety_score = max(0, 100 - (violence_count * 20) - (male_count * 5))
-        
-        # Simulate pose detection
-        pose_detected = bool(np.random.choice([True, False], p=[0.3, 0.7]))
+        result, cache_hit, distance = run_prediction(frame, options.get('stream_id', 'default'))
         
-        # Convert processed frame back to base64
-        _, buffer = cv2.imencode('.jpg', frame)
-        processed_frame = base64.b64encode(buffer).decode('utf-8')
-        
-        return jsonify({
+        payload = {
             'status': 'success',
-            'analytics': {
-                'maleCount': male_count,
-                'femaleCount': female_count,
-                'violenceCount': violence_count,
-                'safetyScore': safety_score,
-                'poseDetected': pose_detected
-            },
-            'frame': f'data:image/jpeg;base64,{processed_frame}',
+            'analytics': result['analytics'],
             'timestamp': datetime.now().isoformat(),
-            'detections': {
-                'people': male_count + female_count,
-                'anomalies': violence_count,
-                'pose_analysis': pose_detected
-                }
-            })
+            'detections': result['detections'],
+            'cached': cache_hit
+        }
+        # The frame is not modified, so the echo (on unless echo=0) returns the
+        # uploaded bytes instead of re-encoding the decoded frame
+        if option_enabled(options, 'echo'):
+            if jpeg_dimensions(image_bytes):
+                processed_frame = base64.b64encode(image_bytes).decode('utf-8')
+            else:
+                _, buffer = cv2.imencode('.jpg', frame)
+                processed_frame = base64.b64encode(buffer).decode('utf-8')
+            payload['frame'] = f'data:image/jpeg;base64,{processed_frame}'
+        
+        response = jsonify(payload)
+        response.headers.update(predict_cache.headers(cache_hit, distance))
+        return response
             
     except Exception as e:
         print(f"Error in predict_ai: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/predict/metrics', methods=['GET'])
+def predict_metrics():
+    """Hit rate and saved inference time of the /api/predict result cache"""
+    return jsonify({'status': 'success', 'cache': predict_cache.stats()})
+
+# Persistent analysis channel: one Socket.IO connection per camera on the
+# /analysis namespace. Frames arrive as binary attachments and results are
+# pushed back on the same connection. Flow control is credit based: the server
+# grants ANALYSIS_CREDITS credits on connect, the client spends one per frame
+# and every result returns it, so a client only sends when the server has room
+# and the frame rate follows what the server can actually analyze.
+ANALYSIS_CREDITS = int(os.environ.get('ANALYSIS_CREDITS', 2))
+analysis_sessions = {}
+analysis_sessions_lock = threading.Lock()
+
+@socketio.on('connect', namespace='/analysis')
+def analysis_connect():
+    stream_id = request.args.get('stream_id') or request.sid
+    with analysis_sessions_lock:
+        analysis_sessions[request.sid] = {
+            'stream_id': stream_id,
+            'in_flight': 0,
+            'frames': 0,
+            'rejected': 0,
+            'busy_ms': 0.0,
+            'connected_at': time.time()
+        }
+    print(f"Analysis channel opened for {stream_id}")
+    emit('ready', {'credits': ANALYSIS_CREDITS, 'stream_id': stream_id})
+
+@socketio.on('disconnect', namespace='/analysis')
+def analysis_disconnect():
+    with analysis_sessions_lock:
+        session = analysis_sessions.pop(request.sid, None)
+    if session:
+        print(f"Analysis channel closed for {session['stream_id']} after {session['frames']} frames")
+
+@socketio.on('frame', namespace='/analysis')
+def analysis_frame(message):
+    """message: {'seq': n, 'image': <JPEG bytes>} or the raw JPEG bytes"""
+    if isinstance(message, dict):
+        seq, image_bytes = message.get('seq'), message.get('image')
+    else:
+        seq, image_bytes = None, message
+    with analysis_sessions_lock:
+        session = analysis_sessions.get(request.sid)
+        if session is None:
+            return
+        if session['in_flight'] >= ANALYSIS_CREDITS:
+            # Sent without a credit: dropped, and no credit is returned for it
+            session['rejected'] += 1
+            emit('result', {'status': 'rejected', 'seq': seq, 'error': 'No credit available', 'credits': 0})
+            return
+        session['in_flight'] += 1
+
+    start = time.time()
+    response = {'seq': seq, 'credits': 1}
+    try:
+        frame = decode_frame(image_bytes) if image_bytes else None
+        if frame is None:
+            response.update({'status': 'error', 'error': 'Invalid image data'})
+        else:
+            result, cache_hit, _ = run_prediction(frame, session['stream_id'])
+            response.update({
+                'status': 'success',
+                'analytics': result['analytics'],
+                'detections': result['detections'],
+                'cached': cache_hit,
+                'timestamp': datetime.now().isoformat()
+            })
+    except Exception as e:
+        print(f"Error in analysis channel: {str(e)}")
+        response.update({'status': 'error', 'error': str(e)})
+    finally:
+        elapsed_ms = (time.time() - start) * 1000
+        # Release the slot before replying so the client's next frame is accepted
+        with analysis_sessions_lock:
+            session['in_flight'] -= 1
+            session['frames'] += 1
+            session['busy_ms'] += elapsed_ms
+    response['server_ms'] = round(elapsed_ms, 1)
+    emit('result', response)
+
+@app.route('/api/analysis/sessions', methods=['GET'])
+def analysis_session_stats():
+    """Open analysis channels with their achieved frame rate"""
+    now = time.time()
+    with analysis_sessions_lock:
+        sessions = [dict(session) for session in analysis_sessions.values()]
+    for session in sessions:
+        elapsed = max(now - session.pop('connected_at'), 1e-6)
+        session['fps'] = round(session['frames'] / elapsed, 2)
+        session['avg_ms'] = round(session['busy_ms'] / session['frames'], 1) if session['frames'] else 0.0
+    return jsonify({'status': 'success', 'credits': ANALYSIS_CREDITS, 'sessions': sessions})
+
 @app.route('/api/health')
 def health():
     """Health check endpoint"""
@@ -1158,6 +1167,7 @@ def health():
 if __name__ == '__main__':
     # Initialize database
     init_db()
+    warm_alert_index()
     
     # Get port from environment or use default
     port = int(os.environ.get('PORT', 5000))
@@ -1165,4 +1175,14 @@ if __name__ == '__main__':
     print(f"Starting KavachEye Backend Server (Supabase) on port {port}")
     print(f"Supabase URL: {SUPABASE_URL}")
     
-    app.run(host='0.0.0.0', port=port, debug=False) 
\ No newline at end of file
+    # `python app.py` runs the Werkzeug development server and is meant for local
+    # development only. Production should serve the app (and its websocket
+    # channel) with a threaded WSGI server instead, e.g.
+    #   gunicorn -w 1 --threads 100 app:app
+    # Local runs opt in with DEV_SERVER=1; without it this entry point refuses to start.
+    dev_server = os.environ.get('DEV_SERVER', '0').strip().lower() in ('1', 'true', 'yes', 'on')
+    if not dev_server:
+        print("Refusing to start the Werkzeug development server: set DEV_SERVER=1 for local use, "
+              "or serve app:app with a WSGI server (e.g. gunicorn -w 1 --threads 100 app:app)")
+    else:
+        socketio.run(app, host='0.0.0.0', port=port, debug=False, allow_unsafe_werkzeug=True) 
\ No newline at end of file
@@ -0,0 +1,108 @@
+import json
+import time
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import requests
+from alert_delivery import TelegramDelivery
+
+# Benchmark of Telegram alert delivery against a local stub of the Bot API.
+# The stub answers sendMessage after a fixed delay, can answer every Nth call
+# with 429 + retry_after, and counts TCP connections so keep-alive reuse shows.
+# Compares the old loop (one requests.post per chat) with TelegramDelivery.
+#
+#   python bench_telegram_delivery.py --chats 20 --latency-ms 150 --rate-limit-every 10
+
+class StubState:
+    def __init__(self, latency, rate_limit_every):
+        self.latency = latency
+        self.rate_limit_every = rate_limit_every
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.connections = 0
+
+def make_handler(state):
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def setup(self):
+            super().setup()
+            with state.lock:
+                state.connections += 1
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            with state.lock:
+                state.calls += 1
+                call = state.calls
+            time.sleep(state.latency)
+            if state.rate_limit_every and call % state.rate_limit_every == 0:
+                status, body = 429, {'ok': False, 'error_code': 429, 'parameters': {'retry_after': 1}}
+            else:
+                status, body = 200, {'ok': True, 'result': {}}
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    return StubHandler
+
+def run_sequential(api_base, chat_ids):
+    """The original behaviour: a fresh requests.post per chat, no retries"""
+    url = f"{api_base}/botTEST/sendMessage"
+    sent = 0
+    for chat_id in chat_ids:
+        response = requests.post(url, json={'chat_id': chat_id, 'text': 'benchmark', 'parse_mode': 'HTML'})
+        sent += response.status_code == 200
+    return sent
+
+def run_pooled(api_base, chat_ids, workers, rate):
+    delivery = TelegramDelivery('TEST', api_base=api_base, workers=workers, rate_per_second=rate,
+                                per_chat_interval=0.0, backoff=0.2)
+    start = time.time()
+    delivery_id = delivery.submit(chat_ids, 'benchmark')
+    accepted_ms = (time.time() - start) * 1000
+    while delivery.status(delivery_id)['finished_at'] is None:
+        time.sleep(0.01)
+    status = delivery.status(delivery_id)
+    delivery.close()
+    return status['successful_sends'], accepted_ms, delivery.stats()['retries']
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Telegram alert delivery against a local stub")
+    parser.add_argument('--chats', type=int, default=20)
+    parser.add_argument('--latency-ms', type=float, default=150.0, help="stub response delay")
+    parser.add_argument('--rate-limit-every', type=int, default=0, help="answer every Nth call with 429")
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--rate', type=float, default=25.0, help="token bucket messages per second")
+    args = parser.parse_args()
+
+    state = StubState(args.latency_ms / 1000, args.rate_limit_every)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(state))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    api_base = f"http://127.0.0.1:{server.server_port}"
+    chat_ids = [str(1000 + i) for i in range(args.chats)]
+
+    start = time.time()
+    sent = run_sequential(api_base, chat_ids)
+    sequential_s = time.time() - start
+    sequential_connections = state.connections
+    print(f"sequential: {sent}/{args.chats} sent in {sequential_s:.2f}s, {sequential_connections} connections "
+          f"(request thread blocked for the whole time)")
+
+    state.connections = 0
+    start = time.time()
+    sent, accepted_ms, retries = run_pooled(api_base, chat_ids, args.workers, args.rate)
+    pooled_s = time.time() - start
+    print(f"pooled:     {sent}/{args.chats} sent in {pooled_s:.2f}s, {state.connections} connections, "
+          f"{retries} retries, accepted in {accepted_ms:.1f}ms")
+    print(f"speedup: {sequential_s / pooled_s:.1f}x")
+    server.shutdown()
+
+if __name__ == '__main__':
+    main()
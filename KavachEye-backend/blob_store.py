@@ -0,0 +1,121 @@
+import os
+import re
+import hashlib
+import tempfile
+import cv2
+import numpy as np
+
+# Content-addressed store for alert snapshots.
+# Bytes are written once under their SHA-256 digest (blobs/ab/cd/abcd...), so
+# the same snapshot posted twice is stored once and a stored blob never
+# changes, which lets it be served with an immutable cache lifetime. A local
+# directory stands in for object storage: put/get/exists are the only calls
+# the app makes, so swapping in a bucket only touches this module. Images also
+# get a small JPEG thumbnail, stored as its own blob, for gallery views.
+
+DIGEST_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+class BlobStoreUnavailable(Exception):
+    """The store's directory cannot be created or written (e.g. a read-only filesystem)"""
+
+def sniff_content_type(data):
+    if data[:3] == b'\xff\xd8\xff':
+        return 'image/jpeg'
+    if data[:8] == b'\x89PNG\r\n\x1a\n':
+        return 'image/png'
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'image/webp'
+    return 'application/octet-stream'
+
+class BlobStore:
+    def __init__(self, root, thumbnail_width=320, thumbnail_quality=70, durable=True):
+        self.root = root
+        # False when blobs may vanish (per-instance temp storage); callers then
+        # keep their own copy of anything they cannot afford to lose
+        self.durable = durable
+        self.thumbnail_width = thumbnail_width
+        self.thumbnail_quality = thumbnail_quality
+
+    @classmethod
+    def from_env(cls):
+        # The default is under the temp directory because serverless filesystems
+        # are read-only elsewhere. That directory is per instance on Vercel and
+        # does not survive restarts, so the store only counts as durable once
+        # BLOB_STORE_DIR points at a persistent volume
+        root = os.environ.get('BLOB_STORE_DIR')
+        return cls(
+            root or os.path.join(tempfile.gettempdir(), 'kavacheye-blobs'),
+            thumbnail_width=int(os.environ.get('BLOB_THUMBNAIL_WIDTH', 320)),
+            thumbnail_quality=int(os.environ.get('BLOB_THUMBNAIL_QUALITY', 70)),
+            durable=bool(root)
+        )
+
+    def path(self, digest):
+        if not DIGEST_PATTERN.match(digest or ''):
+            raise ValueError(f"Invalid blob digest: {digest}")
+        return os.path.join(self.root, digest[:2], digest[2:4], digest)
+
+    def exists(self, digest):
+        return os.path.exists(self.path(digest))
+
+    def put(self, data):
+        """Store bytes under their SHA-256; returns the hex digest (existing blobs are not rewritten)"""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path(digest)
+        if os.path.exists(path):
+            return digest
+        # Directories are created on first write, so importing the app never
+        # touches the filesystem
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        except OSError as e:
+            raise BlobStoreUnavailable(f"Blob store unavailable at {self.root}: {e}") from e
+        # Write to a temp file and rename so readers never see a partial blob
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException as e:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            if isinstance(e, OSError):
+                raise BlobStoreUnavailable(f"Blob store unavailable at {self.root}: {e}") from e
+            raise
+        return digest
+
+    def get(self, digest):
+        """Blob bytes, or None if the digest is unknown"""
+        try:
+            with open(self.path(digest), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            raise BlobStoreUnavailable(f"Blob store unavailable at {self.root}: {e}") from e
+
+    def put_image(self, data):
+        """
+        Store an encoded image and its thumbnail. Returns the metadata kept on the
+        alert row: hash, size, width, height and thumbnail_hash (dimensions and
+        thumbnail are None when the bytes do not decode as an image).
+        """
+        info = {
+            'hash': self.put(data),
+            'size': len(data),
+            'width': None,
+            'height': None,
+            'thumbnail_hash': None
+        }
+        image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            return info
+        height, width = image.shape[:2]
+        info['width'], info['height'] = width, height
+        if width > self.thumbnail_width:
+            thumbnail_height = max(1, round(height * self.thumbnail_width / width))
+            image = cv2.resize(image, (self.thumbnail_width, thumbnail_height), interpolation=cv2.INTER_AREA)
+        success, encoded = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, self.thumbnail_quality])
+        if success:
+            info['thumbnail_hash'] = self.put(encoded.tobytes())
+        return info
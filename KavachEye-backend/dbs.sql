@@ -30,3 +30,11 @@ CREATE INDEX IF NOT EXISTS idx_users_phone ON users(phone);
 
 -- Create index for email lookups
 CREATE INDEX IF NOT EXISTS idx_users_email ON users(email);
+
+-- Alert snapshots are stored in the content-addressed blob store; rows keep
+-- only the SHA-256 of the snapshot and its thumbnail, its size and dimensions
+ALTER TABLE alerts ADD COLUMN IF NOT EXISTS image_hash VARCHAR(64);
+ALTER TABLE alerts ADD COLUMN IF NOT EXISTS image_size INTEGER;
+ALTER TABLE alerts ADD COLUMN IF NOT EXISTS image_width INTEGER;
+ALTER TABLE alerts ADD COLUMN IF NOT EXISTS image_height INTEGER;
+ALTER TABLE alerts ADD COLUMN IF NOT EXISTS image_thumbnail_hash VARCHAR(64);
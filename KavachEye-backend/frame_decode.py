@@ -0,0 +1,46 @@
+import os
+import cv2
+import numpy as np
+
+# Upload decoding for the prediction endpoints, kept out of app.py so the JPEG
+# header parser can be used (and tested) without the Flask app and Supabase.
+
+# Uploads are decoded at reduced size (JPEG DCT scaling, much cheaper than a
+# full decode plus resize) when they are at least twice ANALYSIS_WIDTH wide.
+# ANALYSIS_WIDTH=0 always decodes at full size.
+ANALYSIS_WIDTH = int(os.environ.get('ANALYSIS_WIDTH', 640))
+REDUCED_READ_FLAGS = [(8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4), (2, cv2.IMREAD_REDUCED_COLOR_2)]
+
+def jpeg_dimensions(image_bytes):
+    """(width, height) from the JPEG frame header without decoding, or None if not a JPEG"""
+    if image_bytes[:2] != b'\xff\xd8':
+        return None
+    i = 2
+    while i + 9 < len(image_bytes):
+        if image_bytes[i] != 0xFF:
+            return None
+        marker = image_bytes[i + 1]
+        if marker == 0xFF:
+            i += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD8:
+            i += 2
+            continue
+        # SOF0-SOF15 carry the frame size (C4, C8 and CC are other segments)
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            height = int.from_bytes(image_bytes[i + 5:i + 7], 'big')
+            width = int.from_bytes(image_bytes[i + 7:i + 9], 'big')
+            return width, height
+        i += 2 + int.from_bytes(image_bytes[i + 2:i + 4], 'big')
+    return None
+
+def decode_frame(image_bytes):
+    """Decode an uploaded image, at 1/2, 1/4 or 1/8 scale when that still covers ANALYSIS_WIDTH"""
+    flag = cv2.IMREAD_COLOR
+    size = jpeg_dimensions(image_bytes)
+    if size and ANALYSIS_WIDTH:
+        for factor, reduced_flag in REDUCED_READ_FLAGS:
+            if size[0] // factor >= ANALYSIS_WIDTH:
+                flag = reduced_flag
+                break
+    return cv2.imdecode(np.frombuffer(image_bytes, np.uint8), flag)
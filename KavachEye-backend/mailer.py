@@ -0,0 +1,534 @@
+import os
+import time
+import uuid
+import queue
+import smtplib
+import threading
+from string import Template
+from collections import OrderedDict
+from datetime import datetime
+from email.mime.text import MIMEText
+from email.mime.multipart import MIMEMultipart
+
+# Mailer for alert emails.
+# A small pool of long-lived, authenticated SMTP connections is shared by the
+# send workers (a connection idle for a while is checked with NOOP before use
+# and reopened if the server dropped it), the HTML template is compiled once at
+# import and rendered once per alert, recipients are sent in batches of one
+# message each (a lone recipient sees their own address in To:, larger batches
+# get `undisclosed-recipients:;` so they do not see each other), and alerts go
+# through an in-process queue so the request thread only enqueues them. The
+# send workers start with the first queued alert, not at import.
+#
+# Serverless platforms (Vercel) may freeze or kill a function once its
+# response is sent, so queued mail would be lost. With synchronous=True (the
+# default when VERCEL is set, or MAIL_SYNC_DELIVERY=1) submit() sends every
+# batch in the calling thread and returns when they are done.
+#
+# The SMTP server is configured from the environment, so it can point at a
+# local debugging server, e.g. `python -m aiosmtpd -n -l localhost:1025` with
+# SMTP_HOST=localhost SMTP_PORT=1025 SMTP_SECURITY=none.
+
+ALERT_EMAIL_TEMPLATE = Template("""
+<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>SECURITY ALERT - KavachEye System</title>
+    <style>
+        body {
+            font-family: Arial, sans-serif;
+            margin: 0;
+            padding: 20px;
+            background-color: #f4f4f4;
+            color: #333;
+            line-height: 1.6;
+        }
+        .container {
+            max-width: 600px;
+            margin: 0 auto;
+            background-color: #ffffff;
+            border-radius: 12px;
+            box-shadow: 0 4px 20px rgba(0, 0, 0, 0.1);
+            overflow: hidden;
+        }
+        .header {
+            background: linear-gradient(135deg, #d32f2f 0%, #b71c1c 100%);
+            color: white;
+            padding: 30px;
+            text-align: center;
+        }
+        .header h1 {
+            margin: 0;
+            font-size: 24px;
+            font-weight: bold;
+            text-transform: uppercase;
+            letter-spacing: 1px;
+        }
+        .header p {
+            margin: 8px 0 0 0;
+            font-size: 14px;
+            opacity: 0.9;
+        }
+        .content {
+            padding: 30px;
+        }
+        .main-alert-box {
+            background: linear-gradient(135deg, #fff5f5 0%, #ffebee 100%);
+            border: 2px solid #f44336;
+            border-radius: 12px;
+            padding: 25px;
+            margin-bottom: 25px;
+            box-shadow: 0 2px 10px rgba(244, 67, 54, 0.1);
+        }
+        .alert-title {
+            color: #d32f2f;
+            font-weight: bold;
+            font-size: 18px;
+            margin-bottom: 15px;
+            text-transform: uppercase;
+            display: flex;
+            align-items: center;
+            gap: 10px;
+        }
+        .alert-message {
+            color: #333;
+            margin: 0 0 20px 0;
+            font-size: 15px;
+            line-height: 1.6;
+        }
+        .alert-details {
+            background-color: rgba(255, 255, 255, 0.7);
+            border-radius: 8px;
+            padding: 20px;
+            margin: 20px 0;
+        }
+        .detail-row {
+            display: flex;
+            justify-content: space-between;
+            align-items: center;
+            padding: 8px 0;
+            border-bottom: 1px solid #eee;
+        }
+        .detail-row:last-child {
+            border-bottom: none;
+        }
+        .detail-label {
+            font-weight: bold;
+            color: #555;
+            font-size: 13px;
+        }
+        .detail-value {
+            color: #333;
+            font-size: 13px;
+        }
+        .priority-high {
+            background-color: #ffebee;
+            color: #d32f2f;
+            font-weight: bold;
+            padding: 4px 8px;
+            border-radius: 4px;
+        }
+        .status-active {
+            background-color: #e8f5e8;
+            color: #2e7d32;
+            font-weight: bold;
+            padding: 4px 8px;
+            border-radius: 4px;
+        }
+        .action-buttons {
+            display: flex;
+            gap: 15px;
+            justify-content: center;
+            margin-top: 25px;
+        }
+        .btn {
+            display: inline-block;
+            padding: 12px 24px;
+            text-decoration: none;
+            border-radius: 8px;
+            font-weight: bold;
+            font-size: 14px;
+            text-align: center;
+            transition: all 0.3s ease;
+            border: none;
+            cursor: pointer;
+        }
+        .btn-primary {
+            background: linear-gradient(135deg, #1976d2 0%, #1565c0 100%);
+            color: white;
+            box-shadow: 0 2px 8px rgba(25, 118, 210, 0.3);
+        }
+        .btn-primary:hover {
+            transform: translateY(-2px);
+            box-shadow: 0 4px 12px rgba(25, 118, 210, 0.4);
+        }
+        .btn-secondary {
+            background: linear-gradient(135deg, #388e3c 0%, #2e7d32 100%);
+            color: white;
+            box-shadow: 0 2px 8px rgba(56, 142, 60, 0.3);
+        }
+        .btn-secondary:hover {
+            transform: translateY(-2px);
+            box-shadow: 0 4px 12px rgba(56, 142, 60, 0.4);
+        }
+        .timestamp {
+            text-align: center;
+            padding: 15px;
+            background-color: #f8f9fa;
+            border-top: 1px solid #eee;
+            font-size: 12px;
+            color: #666;
+        }
+        .footer {
+            background-color: #f5f5f5;
+            padding: 20px;
+            text-align: center;
+            border-top: 1px solid #eee;
+            font-size: 12px;
+            color: #666;
+        }
+        .logo {
+            font-size: 32px;
+            margin-bottom: 15px;
+        }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <div class="header">
+            <div class="logo">🚨</div>
+            <h1>SECURITY ALERT</h1>
+            <p>KavachEye Security Monitoring System</p>
+        </div>
+
+        <div class="content">
+            <div class="main-alert-box">
+                <div class="alert-title">
+                    ⚠️ SECURITY INCIDENT DETECTED
+                </div>
+                <div class="alert-message">$message</div>
+
+                <div class="alert-details">
+                    <div class="detail-row">
+                        <span class="detail-label">Alert ID:</span>
+                        <span class="detail-value">$alert_id</span>
+                    </div>
+                    <div class="detail-row">
+                        <span class="detail-label">Alert Type:</span>
+                        <span class="detail-value priority-high">Security Incident</span>
+                    </div>
+                    <div class="detail-row">
+                        <span class="detail-label">Severity Level:</span>
+                        <span class="detail-value priority-high">HIGH PRIORITY</span>
+                    </div>
+                    <div class="detail-row">
+                        <span class="detail-label">Location:</span>
+                        <span class="detail-value">Camera Feed Zone</span>
+                    </div>
+                    <div class="detail-row">
+                        <span class="detail-label">Detection Time:</span>
+                        <span class="detail-value">$detection_time</span>
+                    </div>
+                    <div class="detail-row">
+                        <span class="detail-label">System Status:</span>
+                        <span class="detail-value status-active">ACTIVE MONITORING</span>
+                    </div>
+                    <div class="detail-row">
+                        <span class="detail-label">Response Status:</span>
+                        <span class="detail-value status-active">AUTHORITIES NOTIFIED</span>
+                    </div>
+                </div>
+
+                <div class="action-buttons">
+                    <a href="https://kavacheye-frontend.vercel.app" class="btn btn-primary">📊 View Dashboard</a>
+                    <a href="#" class="btn btn-secondary">✅ Mark as Resolved</a>
+                </div>
+            </div>
+        </div>
+
+        <div class="timestamp">
+            Alert generated: $generated_at UTC
+        </div>
+
+        <div class="footer">
+            <p><strong>This is an automated security alert from KavachEye Security System.</strong></p>
+            <p>For immediate assistance, contact your security administrator or call emergency services.</p>
+            <p>Do not reply to this email. This is a system-generated notification.</p>
+        </div>
+    </div>
+</body>
+</html>
+""")
+
+def render_alert_email(message, now=None):
+    now = now or datetime.now()
+    return ALERT_EMAIL_TEMPLATE.substitute(
+        message=message,
+        alert_id=f"ALERT-{now.strftime('%Y%m%d%H%M%S')}",
+        detection_time=now.strftime('%Y-%m-%d %H:%M:%S'),
+        generated_at=now.strftime('%B %d, %Y at %I:%M:%S %p')
+    )
+
+def build_alert_message(sender, subject, message, now=None):
+    """One MIME message per alert, with both plain text and HTML versions (To: is set per batch)"""
+    msg = MIMEMultipart('alternative')
+    msg['From'] = sender
+    msg['To'] = sender
+    msg['Subject'] = subject
+    msg.attach(MIMEText(message, 'plain'))
+    msg.attach(MIMEText(render_alert_email(message, now), 'html'))
+    return msg
+
+def batch_message(msg, batch):
+    """The alert as sent to one batch: a single recipient is addressed directly,
+    a larger batch only through the envelope so nobody sees the other addresses"""
+    msg.replace_header('To', batch[0] if len(batch) == 1 else 'undisclosed-recipients:;')
+    return msg.as_string()
+
+class SMTPPool:
+    def __init__(self, host, port, username=None, password=None, security='starttls', size=2,
+                 timeout=10.0, health_check_after=30.0):
+        if security not in ('starttls', 'ssl', 'none'):
+            raise ValueError(f"Unknown SMTP security mode: {security}")
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.security = security
+        self.size = size
+        self.timeout = timeout
+        self.health_check_after = health_check_after
+        # Most recently used connection first, so idle ones age out at the bottom
+        self.idle = queue.LifoQueue()
+        self.slots = threading.BoundedSemaphore(size)
+        self.lock = threading.Lock()
+        self.connects = 0
+        self.health_checks = 0
+        self.reconnects = 0
+
+    def _connect(self):
+        if self.security == 'ssl':
+            server = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout)
+        else:
+            server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            if self.security == 'starttls':
+                server.starttls()
+        if self.username:
+            server.login(self.username, self.password)
+        with self.lock:
+            self.connects += 1
+        return server
+
+    def _healthy(self, server):
+        with self.lock:
+            self.health_checks += 1
+        try:
+            return server.noop()[0] == 250
+        except smtplib.SMTPException:
+            return False
+        except OSError:
+            return False
+
+    def acquire(self):
+        """A live connection from the pool (opened or re-opened if needed)"""
+        self.slots.acquire()
+        try:
+            try:
+                server, last_used = self.idle.get_nowait()
+            except queue.Empty:
+                return self._connect()
+            if time.monotonic() - last_used > self.health_check_after and not self._healthy(server):
+                self.discard(server, release=False)
+                with self.lock:
+                    self.reconnects += 1
+                return self._connect()
+            return server
+        except Exception:
+            self.slots.release()
+            raise
+
+    def release(self, server):
+        self.idle.put((server, time.monotonic()))
+        self.slots.release()
+
+    def discard(self, server, release=True):
+        try:
+            server.quit()
+        except Exception:
+            pass
+        if release:
+            self.slots.release()
+
+    def close(self):
+        while True:
+            try:
+                server, _ = self.idle.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                server.quit()
+            except Exception:
+                pass
+
+    def stats(self):
+        with self.lock:
+            return {
+                'size': self.size,
+                'idle': self.idle.qsize(),
+                'connects': self.connects,
+                'health_checks': self.health_checks,
+                'reconnects': self.reconnects
+            }
+
+class Mailer:
+    def __init__(self, pool, sender, batch_size=50, workers=None, history=500, synchronous=False):
+        self.pool = pool
+        self.sender = sender
+        self.batch_size = batch_size
+        self.history = history
+        self.synchronous = synchronous
+        self.workers = workers or pool.size
+        self.workers_started = False
+        self.jobs = queue.Queue()
+        self.lock = threading.Lock()
+        self.deliveries = OrderedDict()
+        self.sent = 0
+        self.failed = 0
+
+    def _start_workers(self):
+        with self.lock:
+            if self.workers_started:
+                return
+            self.workers_started = True
+        for i in range(self.workers):
+            threading.Thread(target=self._worker, name=f'mailer-{i}', daemon=True).start()
+
+    @classmethod
+    def from_env(cls):
+        sender = os.environ.get('MAIL_FROM') or os.environ.get('GMAIL_EMAIL')
+        pool = SMTPPool(
+            os.environ.get('SMTP_HOST', 'smtp.gmail.com'),
+            int(os.environ.get('SMTP_PORT', 587)),
+            username=os.environ.get('SMTP_USERNAME', os.environ.get('GMAIL_EMAIL')),
+            password=os.environ.get('SMTP_PASSWORD', os.environ.get('GMAIL_APP_PASSWORD')),
+            security=os.environ.get('SMTP_SECURITY', 'starttls'),
+            size=int(os.environ.get('SMTP_POOL_SIZE', 2))
+        )
+        return cls(pool, sender, batch_size=int(os.environ.get('MAIL_BATCH_SIZE', 50)),
+                   synchronous=os.environ.get('MAIL_SYNC_DELIVERY', '1' if os.environ.get('VERCEL') else '0') == '1')
+
+    def submit(self, subject, message, recipients):
+        """Queue one alert for all recipients; returns the delivery id (after sending, in synchronous mode)"""
+        # An address listed twice gets the alert once
+        recipients = list(dict.fromkeys(recipients))
+        delivery_id = uuid.uuid4().hex
+        batches = [recipients[i:i + self.batch_size] for i in range(0, len(recipients), self.batch_size)]
+        delivery = {
+            'id': delivery_id,
+            'status': 'queued',
+            'created_at': time.time(),
+            'finished_at': None,
+            'batches_left': len(batches),
+            'recipients': {recipient: {'status': 'queued', 'error': None} for recipient in recipients}
+        }
+        with self.lock:
+            self.deliveries[delivery_id] = delivery
+            while len(self.deliveries) > self.history:
+                self.deliveries.popitem(last=False)
+        # The alert is rendered once; only the To: header differs between batches
+        msg = build_alert_message(self.sender, subject, message)
+        jobs = [(batch, batch_message(msg, batch)) for batch in batches]
+        if self.synchronous:
+            for batch, text in jobs:
+                self._finish(delivery, self._send_batch(batch, text))
+            return delivery_id
+        self._start_workers()
+        for batch, text in jobs:
+            self.jobs.put((delivery, batch, text))
+        return delivery_id
+
+    def _worker(self):
+        while True:
+            delivery, batch, text = self.jobs.get()
+            with self.lock:
+                delivery['status'] = 'sending'
+            results = self._send_batch(batch, text)
+            self._finish(delivery, results)
+
+    def _send_batch(self, batch, text, attempts=2):
+        """Send one message to a batch; returns {recipient: error or None}"""
+        error = None
+        for _ in range(attempts):
+            try:
+                server = self.pool.acquire()
+            except Exception as e:
+                error = str(e)
+                continue
+            try:
+                refused = server.sendmail(self.sender, batch, text)
+            except smtplib.SMTPRecipientsRefused as e:
+                self.pool.release(server)
+                return {recipient: str(e.recipients.get(recipient, 'refused')) for recipient in batch}
+            except smtplib.SMTPServerDisconnected as e:
+                # Connection went bad between the health check and the send: retry on a fresh one
+                self.pool.discard(server)
+                error = str(e)
+                continue
+            except smtplib.SMTPException as e:
+                # The server answered (sender refused, data rejected, ...): the
+                # connection is fine and a retry would fail the same way
+                self.pool.release(server)
+                return {recipient: str(e) for recipient in batch}
+            except OSError as e:
+                # SMTPException is an OSError too, so socket errors are caught last
+                self.pool.discard(server)
+                error = str(e)
+                continue
+            self.pool.release(server)
+            return {recipient: str(refused[recipient]) if recipient in refused else None for recipient in batch}
+        return {recipient: error for recipient in batch}
+
+    def _finish(self, delivery, results):
+        with self.lock:
+            for recipient, error in results.items():
+                result = delivery['recipients'][recipient]
+                result['status'], result['error'] = ('failed', error) if error else ('sent', None)
+                if error:
+                    self.failed += 1
+                else:
+                    self.sent += 1
+            delivery['batches_left'] -= 1
+            if delivery['batches_left'] == 0:
+                delivery['finished_at'] = time.time()
+                statuses = [result['status'] for result in delivery['recipients'].values()]
+                if all(status == 'sent' for status in statuses):
+                    delivery['status'] = 'delivered'
+                elif 'sent' in statuses:
+                    delivery['status'] = 'partial'
+                else:
+                    delivery['status'] = 'failed'
+        # Logged outside the lock so slow stdout never holds up other workers
+        for recipient, error in results.items():
+            if error:
+                print(f"Failed to send email to {recipient}: {error}")
+            else:
+                print(f"Email Alert sent successfully to: {recipient}")
+
+    def status(self, delivery_id):
+        with self.lock:
+            delivery = self.deliveries.get(delivery_id)
+            if delivery is None:
+                return None
+            recipients = {recipient: dict(result) for recipient, result in delivery['recipients'].items()}
+            status = dict(delivery, recipients=recipients)
+        status['successful_sends'] = sum(1 for result in recipients.values() if result['status'] == 'sent')
+        status['failed_count'] = sum(1 for result in recipients.values() if result['status'] == 'failed')
+        return status
+
+    def stats(self):
+        with self.lock:
+            totals = {'sent': self.sent, 'failed': self.failed, 'queued_batches': self.jobs.qsize()}
+        totals['pool'] = self.pool.stats()
+        return totals
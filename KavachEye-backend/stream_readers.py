@@ -0,0 +1,139 @@
+import time
+import threading
+import cv2
+
+# Long-lived background readers for camera streams.
+# Opening an RTSP stream costs a full connect plus a wait for the next keyframe,
+# so instead of opening a cv2.VideoCapture per HTTP request each started stream
+# keeps one reader thread that always holds the latest decoded frame. Readers
+# that nobody has asked for a frame within `idle_timeout` seconds are reaped.
+# A frame older than `max_frame_age` seconds, or held while the reader is
+# failing, is reported as an error instead of being served as live.
+# Requires a long-running server process (not a per-request serverless worker).
+
+class StreamReader:
+    def __init__(self, url, reconnect_delay=2.0, max_frame_age=5.0):
+        self.url = url
+        self.reconnect_delay = reconnect_delay
+        self.max_frame_age = max_frame_age
+        self.lock = threading.Lock()
+        self.first_frame = threading.Event()
+        self.frame = None
+        self.frame_time = None
+        self.last_access = time.time()
+        self.error = None
+        self.frames_read = 0
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._read_loop, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        # Only signals the thread: it exits after its current read or reconnect
+        # wait, so a request handler stopping a stream never blocks on it
+        self.running = False
+
+    def _read_loop(self):
+        while self.running:
+            cap = cv2.VideoCapture(self.url)
+            if not cap.isOpened():
+                self.error = 'Cannot open video stream'
+                cap.release()
+                time.sleep(self.reconnect_delay)
+                continue
+            self.error = None
+            while self.running:
+                ret, frame = cap.read()
+                if not ret:
+                    self.error = 'Cannot read frame'
+                    break
+                with self.lock:
+                    self.frame = frame
+                    self.frame_time = time.time()
+                    self.frames_read += 1
+                self.first_frame.set()
+            cap.release()
+            if self.running:
+                time.sleep(self.reconnect_delay)
+
+    def latest(self, timeout=5.0):
+        """
+        Latest decoded frame, its capture time and an error; waits up to `timeout`
+        for the first frame. The frame is None (with the error set) while the
+        reader is failing or when the newest frame is older than max_frame_age.
+        """
+        self.last_access = time.time()
+        self.first_frame.wait(timeout)
+        with self.lock:
+            frame, frame_time = self.frame, self.frame_time
+        error = self.error
+        if frame is not None and error is None and time.time() - frame_time > self.max_frame_age:
+            error = f'Stream stalled: last frame is {time.time() - frame_time:.1f}s old'
+        if error is not None:
+            return None, frame_time, error
+        return frame, frame_time, None
+
+    def stats(self):
+        with self.lock:
+            frame_time = self.frame_time
+        return {
+            'running': self.running,
+            'frames_read': self.frames_read,
+            'frame_age_ms': round((time.time() - frame_time) * 1000, 1) if frame_time else None,
+            'idle_seconds': round(time.time() - self.last_access, 1),
+            'error': self.error
+        }
+
+class StreamReaderRegistry:
+    def __init__(self, idle_timeout=300, reap_interval=30, max_frame_age=5.0):
+        self.idle_timeout = idle_timeout
+        self.reap_interval = reap_interval
+        self.max_frame_age = max_frame_age
+        self.readers = {}
+        self.lock = threading.Lock()
+        self.reaper = threading.Thread(target=self._reap_loop, daemon=True)
+        self.reaper.start()
+
+    def start(self, stream_id, url):
+        """Start (or restart, if the URL changed) the reader for a stream"""
+        with self.lock:
+            reader = self.readers.get(stream_id)
+            if reader is not None and reader.url == url and reader.running:
+                return reader
+            old_reader = reader
+            reader = StreamReader(url, max_frame_age=self.max_frame_age)
+            self.readers[stream_id] = reader
+        if old_reader is not None:
+            old_reader.stop()
+        reader.start()
+        return reader
+
+    def get(self, stream_id):
+        with self.lock:
+            return self.readers.get(stream_id)
+
+    def stop(self, stream_id):
+        with self.lock:
+            reader = self.readers.pop(stream_id, None)
+        if reader is not None:
+            reader.stop()
+
+    def _reap_loop(self):
+        while True:
+            time.sleep(self.reap_interval)
+            now = time.time()
+            with self.lock:
+                idle = [stream_id for stream_id, reader in self.readers.items() if now - reader.last_access > self.idle_timeout]
+            for stream_id in idle:
+                print(f"Stopping idle stream reader: {stream_id}")
+                self.stop(stream_id)
+
+    def stats(self):
+        with self.lock:
+            readers = dict(self.readers)
+        return {stream_id: reader.stats() for stream_id, reader in readers.items()}
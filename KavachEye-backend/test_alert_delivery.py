@@ -0,0 +1,24 @@
+import time
+import pytest
+from alert_delivery import TokenBucket
+
+def test_burst_up_to_capacity_then_waits():
+    bucket = TokenBucket(rate=20.0, capacity=5)
+    start = time.monotonic()
+    for _ in range(5):
+        bucket.acquire()
+    assert time.monotonic() - start < 0.05
+    # The next five tokens refill at 20 per second
+    for _ in range(5):
+        bucket.acquire()
+    assert time.monotonic() - start == pytest.approx(0.25, abs=0.1)
+
+def test_capacity_defaults_to_rate():
+    bucket = TokenBucket(rate=3.0)
+    assert bucket.capacity == 3.0 and bucket.tokens == 3.0
+
+def test_refill_is_capped_at_capacity():
+    bucket = TokenBucket(rate=100.0, capacity=2)
+    bucket.updated -= 10  # long idle
+    bucket.acquire()
+    assert bucket.tokens == pytest.approx(1.0, abs=0.01)
@@ -0,0 +1,53 @@
+import time
+from datetime import datetime
+import pytest
+from alert_index import AlertCooldownIndex
+
+def test_claim_blocks_location_until_released():
+    index = AlertCooldownIndex(cooldown=60)
+    assert index.claim('gate', 'a1') == 0.0
+    assert index.claim('gate', 'a2') == pytest.approx(60, abs=1)
+    # Other locations are independent
+    assert index.claim('lobby', 'b1') == 0.0
+    index.release('a1')
+    assert index.remaining('gate') == 0.0
+    assert index.claim('gate', 'a2') == 0.0
+
+def test_entries_expire_after_cooldown():
+    index = AlertCooldownIndex(cooldown=60)
+    index.claim('gate', 'old', raised_at=time.time() - 61)
+    assert index.remaining('gate') == 0.0
+    assert 'old' not in index.alert_locations
+
+def test_warm_and_reset():
+    index = AlertCooldownIndex(cooldown=60)
+    raised = datetime.fromtimestamp(time.time() - 30).isoformat()
+    assert index.warm([{'id': 'a1', 'location': 'gate', 'timestamp': raised}]) == 1
+    assert index.remaining('gate') == pytest.approx(30, abs=1)
+    index.reset('gate')
+    assert index.remaining('gate') == 0.0
+
+def test_read_through_reloads_stale_locations():
+    calls = []
+    raised = datetime.fromtimestamp(time.time() - 10).isoformat()
+    def loader(location, since):
+        calls.append(location)
+        return [{'id': 'remote', 'timestamp': raised}]
+    index = AlertCooldownIndex(cooldown=60, mode='read-through', loader=loader, max_staleness=5)
+    assert index.claim('gate', 'local') == pytest.approx(50, abs=1)
+    assert index.remaining('gate') == pytest.approx(50, abs=1)
+    # The second lookup is within max_staleness and served from the index
+    assert calls == ['gate']
+
+def test_read_through_needs_loader():
+    with pytest.raises(ValueError):
+        AlertCooldownIndex(mode='read-through')
+
+def test_from_env_defaults_to_read_through_on_vercel(monkeypatch):
+    monkeypatch.delenv('ALERT_INDEX_MODE', raising=False)
+    monkeypatch.delenv('ALERT_INDEX_MAX_STALENESS', raising=False)
+    monkeypatch.delenv('VERCEL', raising=False)
+    assert AlertCooldownIndex.from_env(loader=lambda location, since: []).mode == 'local'
+    monkeypatch.setenv('VERCEL', '1')
+    index = AlertCooldownIndex.from_env(loader=lambda location, since: [])
+    assert (index.mode, index.max_staleness) == ('read-through', 1.0)
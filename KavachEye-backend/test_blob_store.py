@@ -0,0 +1,52 @@
+import hashlib
+import os
+import cv2
+import numpy as np
+import pytest
+from blob_store import BlobStore, BlobStoreUnavailable, sniff_content_type
+
+def test_put_is_content_addressed(tmp_path):
+    store = BlobStore(str(tmp_path / 'blobs'))
+    data = b'snapshot bytes'
+    digest = store.put(data)
+    assert digest == hashlib.sha256(data).hexdigest()
+    assert store.path(digest) == os.path.join(str(tmp_path / 'blobs'), digest[:2], digest[2:4], digest)
+    assert store.get(digest) == data
+    # The same bytes map to the same blob and are not rewritten
+    mtime = os.stat(store.path(digest)).st_mtime_ns
+    assert store.put(data) == digest
+    assert os.stat(store.path(digest)).st_mtime_ns == mtime
+
+def test_unknown_and_invalid_digests(tmp_path):
+    store = BlobStore(str(tmp_path))
+    assert store.get('0' * 64) is None
+    assert not store.exists('0' * 64)
+    with pytest.raises(ValueError):
+        store.path('../../etc/passwd')
+
+def test_put_image_stores_thumbnail(tmp_path):
+    store = BlobStore(str(tmp_path), thumbnail_width=64)
+    image = np.full((120, 160, 3), 128, np.uint8)
+    data = cv2.imencode('.jpg', image)[1].tobytes()
+    info = store.put_image(data)
+    assert (info['width'], info['height'], info['size']) == (160, 120, len(data))
+    thumbnail = cv2.imdecode(np.frombuffer(store.get(info['thumbnail_hash']), np.uint8), cv2.IMREAD_COLOR)
+    assert thumbnail.shape[:2] == (48, 64)
+    assert sniff_content_type(store.get(info['hash'])) == 'image/jpeg'
+
+def test_put_image_keeps_undecodable_bytes(tmp_path):
+    info = BlobStore(str(tmp_path)).put_image(b'not an image')
+    assert info['hash'] and info['width'] is None and info['thumbnail_hash'] is None
+
+def test_unwritable_root_raises_unavailable(tmp_path):
+    blocker = tmp_path / 'file'
+    blocker.write_bytes(b'')
+    with pytest.raises(BlobStoreUnavailable):
+        BlobStore(str(blocker / 'blobs')).put(b'data')
+
+def test_only_a_configured_directory_is_durable(tmp_path, monkeypatch):
+    monkeypatch.delenv('BLOB_STORE_DIR', raising=False)
+    assert not BlobStore.from_env().durable
+    monkeypatch.setenv('BLOB_STORE_DIR', str(tmp_path))
+    store = BlobStore.from_env()
+    assert store.durable and store.root == str(tmp_path)
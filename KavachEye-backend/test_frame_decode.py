@@ -0,0 +1,27 @@
+import cv2
+import numpy as np
+from frame_decode import jpeg_dimensions
+
+def encode(width, height, params=()):
+    return cv2.imencode('.jpg', np.zeros((height, width, 3), np.uint8), list(params))[1].tobytes()
+
+def test_baseline_jpeg():
+    assert jpeg_dimensions(encode(640, 480)) == (640, 480)
+
+def test_progressive_jpeg():
+    # Progressive files carry the size in SOF2
+    data = encode(321, 123, [cv2.IMWRITE_JPEG_PROGRESSIVE, 1])
+    assert b'\xff\xc2' in data
+    assert jpeg_dimensions(data) == (321, 123)
+
+def test_skips_segments_before_the_frame_header():
+    data = encode(64, 32)
+    comment = b'\xff\xfe' + (2 + 6).to_bytes(2, 'big') + b'\xff\xc0hello'[:6]
+    # A comment containing SOF-like bytes must be skipped by its length
+    assert jpeg_dimensions(data[:2] + comment + data[2:]) == (64, 32)
+
+def test_not_a_jpeg():
+    png = cv2.imencode('.png', np.zeros((8, 8, 3), np.uint8))[1].tobytes()
+    assert jpeg_dimensions(png) is None
+    assert jpeg_dimensions(b'\xff\xd8') is None
+    assert jpeg_dimensions(b'\xff\xd8\x00\x00' + b'\x00' * 16) is None
@@ -0,0 +1,94 @@
+import smtplib
+import pytest
+import mailer
+from mailer import Mailer, SMTPPool
+
+class FakeSMTP:
+    """Stands in for smtplib.SMTP; `failures` holds exceptions for the next sendmail calls"""
+    instances = []
+    failures = []
+
+    def __init__(self, host, port, timeout=None):
+        self.sent = []
+        self.closed = False
+        FakeSMTP.instances.append(self)
+
+    def login(self, username, password):
+        pass
+
+    def noop(self):
+        return (250, b'OK')
+
+    def sendmail(self, sender, recipients, text):
+        if FakeSMTP.failures:
+            raise FakeSMTP.failures.pop(0)
+        self.sent.append((sender, list(recipients), text))
+        return {}
+
+    def quit(self):
+        self.closed = True
+
+@pytest.fixture
+def fake_smtp(monkeypatch):
+    FakeSMTP.instances = []
+    FakeSMTP.failures = []
+    monkeypatch.setattr(mailer.smtplib, 'SMTP', FakeSMTP)
+    return FakeSMTP
+
+def make_mailer(batch_size=50):
+    pool = SMTPPool('localhost', 1025, security='none', size=1)
+    return Mailer(pool, 'alerts@example.com', batch_size=batch_size, synchronous=True)
+
+def sent_messages(fake_smtp):
+    return [message for server in fake_smtp.instances for message in server.sent]
+
+def test_connection_is_pooled_across_alerts(fake_smtp):
+    m = make_mailer()
+    for _ in range(3):
+        m.submit('Alert', 'Intruder', ['a@example.com'])
+    assert len(fake_smtp.instances) == 1
+    assert len(sent_messages(fake_smtp)) == 3
+    assert m.stats()['pool']['connects'] == 1
+
+def test_recipients_are_deduplicated_and_batched(fake_smtp):
+    m = make_mailer(batch_size=2)
+    delivery_id = m.submit('Alert', 'Intruder', ['a@x.com', 'b@x.com', 'a@x.com', 'c@x.com'])
+    messages = sent_messages(fake_smtp)
+    assert [recipients for _, recipients, _ in messages] == [['a@x.com', 'b@x.com'], ['c@x.com']]
+    # A batch hides its addresses; a lone recipient is addressed directly
+    assert 'To: undisclosed-recipients:;' in messages[0][2]
+    assert 'To: c@x.com' in messages[1][2]
+    status = m.status(delivery_id)
+    assert status['status'] == 'delivered' and status['successful_sends'] == 3
+
+def test_permanent_error_keeps_connection_and_fails_batch(fake_smtp):
+    m = make_mailer()
+    fake_smtp.failures = [smtplib.SMTPDataError(554, b'rejected')]
+    delivery_id = m.submit('Alert', 'Intruder', ['a@x.com'])
+    assert m.status(delivery_id)['status'] == 'failed'
+    # No retry and no reconnect: the pooled connection is reused for the next alert
+    m.submit('Alert', 'Intruder', ['a@x.com'])
+    assert len(fake_smtp.instances) == 1 and not fake_smtp.instances[0].closed
+    assert len(sent_messages(fake_smtp)) == 1
+
+def test_refused_recipients_fail_individually(fake_smtp):
+    m = make_mailer()
+    fake_smtp.failures = [smtplib.SMTPRecipientsRefused({'b@x.com': (550, b'no such user')})]
+    status = m.status(m.submit('Alert', 'Intruder', ['b@x.com']))
+    assert status['recipients']['b@x.com']['status'] == 'failed'
+    assert len(fake_smtp.instances) == 1
+
+@pytest.mark.parametrize('failure', [smtplib.SMTPServerDisconnected('gone'), ConnectionResetError('reset')])
+def test_dropped_connection_is_retried_on_a_fresh_one(fake_smtp, failure):
+    m = make_mailer()
+    fake_smtp.failures = [failure]
+    status = m.status(m.submit('Alert', 'Intruder', ['a@x.com']))
+    assert status['status'] == 'delivered'
+    assert len(fake_smtp.instances) == 2 and fake_smtp.instances[0].closed
+
+def test_gives_up_after_repeated_disconnects(fake_smtp):
+    m = make_mailer()
+    fake_smtp.failures = [smtplib.SMTPServerDisconnected('gone')] * 2
+    status = m.status(m.submit('Alert', 'Intruder', ['a@x.com']))
+    assert status['status'] == 'failed'
+    assert status['recipients']['a@x.com']['error'] == 'gone'
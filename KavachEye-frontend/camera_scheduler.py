@@ -0,0 +1,366 @@
+import os
+import sys
+import time
+import argparse
+import importlib
+import threading
+import multiprocessing
+from collections import deque
+from camera_stream import CameraManager
+from shared_frames import FrameRing
+
+# Multi-camera inference scheduler.
+# Cameras are captured by CameraManager in process mode, one capture process per
+# camera writing into a shared-memory ring. A pool of M inference worker
+# processes runs the analyzer; the scheduler only sends each worker a tiny job
+# (camera id and ring name) and the worker reads the frame straight from the
+# ring, so frames never travel through a pipe.
+#
+# Each camera is pinned to one worker so that per-camera state in the analyzer
+# (violence smoothing, face tracks) stays in one process. A worker runs one job
+# at a time (by default); when it is free it gets the due camera with the earliest deadline,
+# deadlines advancing by 1 / target_fps per dispatch. With spare capacity every
+# camera runs at its target; when overloaded the cameras of a worker are served
+# round-robin in proportion to their targets and nobody starves.
+#
+# With concurrency > 1 a worker analyzes several of its cameras at once in
+# threads (never the same camera twice), which lets an analyzer that batches
+# across cameras (frame_analyzer.py with BATCH_INFERENCE=1) merge their frames.
+#
+# When a camera is removed its worker is told to forget it: the worker closes
+# its view of the camera's ring and calls the analyzer module's
+# forget_camera(camera_id), if it has one, to drop the per-camera state.
+
+DEFAULT_ANALYZER = 'frame_analyzer:analyze_frame'
+FPS_WINDOW = 5.0
+
+def load_analyzer(spec, model_dir=None):
+    """Import 'module:function'; model_dir is put on sys.path first"""
+    if model_dir:
+        sys.path.insert(0, os.path.abspath(model_dir))
+    module_name, _, function_name = spec.partition(':')
+    return getattr(importlib.import_module(module_name), function_name or 'analyze_frame')
+
+def _worker_main(worker_id, analyzer_spec, model_dir, jobs, results, concurrency=1):
+    analyze = load_analyzer(analyzer_spec, model_dir)
+    forget = getattr(sys.modules[analyze.__module__], 'forget_camera', None)
+    rings = {}
+    rings_lock = threading.Lock()
+    threads = [
+        threading.Thread(target=_worker_loop, args=(worker_id, analyze, rings, rings_lock, jobs, results, forget), daemon=True)
+        for _ in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    results.put(('ready', worker_id, None))
+    for thread in threads:
+        thread.join()
+    for ring in rings.values():
+        ring.close()
+
+def _worker_loop(worker_id, analyze, rings, rings_lock, jobs, results, forget=None):
+    while True:
+        job = jobs.get()
+        if job is None:
+            break
+        kind, camera_id, ring_name, after = job
+        if kind == 'forget':
+            with rings_lock:
+                ring = rings.pop(ring_name, None)
+            if ring is not None:
+                try:
+                    ring.close()
+                except BufferError:
+                    # Another thread still holds a view; the mapping goes with the process
+                    pass
+            if forget is not None:
+                forget(camera_id)
+            continue
+        with rings_lock:
+            if ring_name not in rings:
+                rings[ring_name] = FrameRing.attach(ring_name)
+            ring = rings[ring_name]
+        ref = ring.latest(after)
+        frame = ref.copy() if ref is not None else None
+        if frame is None:
+            # No new frame yet (or the slot was overwritten while copying)
+            results.put(('skipped', worker_id, {'camera_id': camera_id}))
+            continue
+        # The frame is copied out of the ring inside this process: inference
+        # takes longer than the ring holds a slot, and a torn frame would be worse
+        # than a memcpy
+        start = time.time()
+        try:
+            result = analyze(frame, camera_id)
+            error = None
+        except Exception as e:
+            result, error = None, str(e)
+        results.put(('done', worker_id, {
+            'camera_id': camera_id,
+            'index': ref.index,
+            'frame_time': ref.timestamp,
+            'inference_ms': (time.time() - start) * 1000,
+            'result': result,
+            'error': error
+        }))
+
+class ScheduledCamera:
+    def __init__(self, camera_id, target_fps, worker):
+        self.camera_id = camera_id
+        self.target_fps = target_fps
+        self.interval = 1.0 / target_fps
+        self.worker = worker
+        self.in_flight = False
+        self.next_due = time.time()
+        self.last_index = None
+        self.completions = deque()
+        self.analyzed = 0
+        self.skipped = 0
+        self.errors = 0
+        self.inference_ms = 0.0
+        self.latency_ms = 0.0
+        self.last_result = None
+
+    def achieved_fps(self, now):
+        while self.completions and now - self.completions[0] > FPS_WINDOW:
+            self.completions.popleft()
+        return len(self.completions) / FPS_WINDOW
+
+class Worker:
+    def __init__(self, worker_id, process, jobs):
+        self.id = worker_id
+        self.process = process
+        self.jobs = jobs
+        self.ready = False
+        self.busy = {}
+        self.busy_time = 0.0
+
+class CameraScheduler:
+    def __init__(self, workers=None, analyzer=DEFAULT_ANALYZER, model_dir=None, camera_manager=None, on_result=None, concurrency=1):
+        self.worker_count = workers or os.cpu_count() or 1
+        self.concurrency = concurrency
+        self.analyzer = analyzer
+        self.model_dir = model_dir
+        self.camera_manager = camera_manager or CameraManager(mode='process')
+        if self.camera_manager.mode != 'process':
+            raise ValueError("CameraScheduler needs a CameraManager in process mode")
+        self.on_result = on_result
+        # Workers are spawned (not forked) so they start without the parent's threads
+        self.context = multiprocessing.get_context('spawn')
+        self.results = self.context.Queue()
+        self.workers = []
+        self.cameras = {}
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.running = False
+        self.started_at = None
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.started_at = time.time()
+        for worker_id in range(self.worker_count):
+            jobs = self.context.Queue()
+            process = self.context.Process(
+                target=_worker_main,
+                args=(worker_id, self.analyzer, self.model_dir, jobs, self.results, self.concurrency),
+                daemon=True
+            )
+            process.start()
+            self.workers.append(Worker(worker_id, process, jobs))
+        threading.Thread(target=self._dispatch_loop, daemon=True).start()
+        threading.Thread(target=self._result_loop, daemon=True).start()
+
+    def stop(self):
+        self.running = False
+        self.wakeup.set()
+        for worker in self.workers:
+            for _ in range(self.concurrency):
+                worker.jobs.put(None)
+        for worker in self.workers:
+            worker.process.join(timeout=10)
+            if worker.process.is_alive():
+                worker.process.terminate()
+        self.workers = []
+        self.camera_manager.stop_all()
+
+    def add_camera(self, camera_id, rtsp_url, target_fps=5, capture_fps=None):
+        """Start capturing a camera and assign it to the worker with the least target load"""
+        self.camera_manager.add_camera(camera_id, rtsp_url, capture_fps or max(target_fps, 15))
+        with self.lock:
+            load = [0.0] * self.worker_count
+            for camera in self.cameras.values():
+                if camera.camera_id != camera_id:
+                    load[camera.worker] += camera.target_fps
+            worker = min(range(self.worker_count), key=lambda i: load[i])
+            previous = self.cameras.get(camera_id)
+            if previous is not None and previous.worker != worker:
+                self._forget(previous, None)
+            self.cameras[camera_id] = ScheduledCamera(camera_id, target_fps, worker)
+        self.wakeup.set()
+
+    def remove_camera(self, camera_id):
+        with self.lock:
+            camera = self.cameras.pop(camera_id, None)
+            if camera is not None:
+                self._forget(camera, self.camera_manager.get_ring_name(camera_id))
+        self.camera_manager.remove_camera(camera_id)
+
+    def _forget(self, camera, ring_name):
+        """Have the camera's worker drop its state and ring view (called with the lock held)"""
+        if camera.worker < len(self.workers):
+            self.workers[camera.worker].jobs.put(('forget', camera.camera_id, ring_name, None))
+
+    def _next_job(self, worker, now):
+        """Earliest-deadline due camera of this worker that has a new frame in its ring"""
+        best = None
+        for camera in self.cameras.values():
+            if camera.worker != worker.id or camera.in_flight or camera.next_due > now:
+                continue
+            ring = self.camera_manager.cameras.get(camera.camera_id)
+            if ring is None:
+                continue
+            written = ring.ring.frames_written()
+            if written == 0 or (camera.last_index is not None and written - 1 <= camera.last_index):
+                continue
+            if best is None or camera.next_due < best.next_due:
+                best = camera
+        return best
+
+    def _dispatch_loop(self):
+        while self.running:
+            now = time.time()
+            wait = 0.05
+            with self.lock:
+                for worker in self.workers:
+                    while worker.ready and len(worker.busy) < self.concurrency:
+                        camera = self._next_job(worker, now)
+                        if camera is None:
+                            break
+                        worker.busy[camera.camera_id] = now
+                        camera.in_flight = True
+                        # Deadlines advance by one interval per dispatch; a camera may
+                        # bank at most one interval of backlog so it cannot burst later
+                        camera.next_due = max(camera.next_due + camera.interval, now - camera.interval)
+                        ring_name = self.camera_manager.get_ring_name(camera.camera_id)
+                        worker.jobs.put(('analyze', camera.camera_id, ring_name, camera.last_index))
+                due = [c.next_due - now for c in self.cameras.values() if c.next_due > now]
+                if due:
+                    wait = min(wait, min(due))
+            self.wakeup.wait(max(wait, 0.001))
+            self.wakeup.clear()
+
+    def _result_loop(self):
+        while self.running:
+            try:
+                kind, worker_id, payload = self.results.get(timeout=0.5)
+            except Exception:
+                continue
+            now = time.time()
+            callback = None
+            with self.lock:
+                worker = self.workers[worker_id]
+                if kind == 'ready':
+                    worker.ready = True
+                else:
+                    worker.busy_time += now - worker.busy.pop(payload['camera_id'], now)
+                    camera = self.cameras.get(payload['camera_id'])
+                    if camera is not None:
+                        camera.in_flight = False
+                    if camera is not None and kind == 'skipped':
+                        camera.skipped += 1
+                    elif camera is not None:
+                        camera.last_index = payload['index']
+                        camera.analyzed += 1
+                        camera.completions.append(now)
+                        camera.inference_ms = payload['inference_ms'] if not camera.inference_ms else 0.9 * camera.inference_ms + 0.1 * payload['inference_ms']
+                        latency_ms = (now - payload['frame_time']) * 1000
+                        camera.latency_ms = latency_ms if not camera.latency_ms else 0.9 * camera.latency_ms + 0.1 * latency_ms
+                        if payload['error']:
+                            camera.errors += 1
+                            print(f"Analyzer error on {camera.camera_id}: {payload['error']}")
+                        else:
+                            camera.last_result = payload['result']
+                            callback = self.on_result
+            self.wakeup.set()
+            if callback is not None:
+                callback(payload['camera_id'], payload['result'])
+
+    def get_result(self, camera_id):
+        with self.lock:
+            camera = self.cameras.get(camera_id)
+            return camera.last_result if camera else None
+
+    def stats(self):
+        """Achieved vs target analysis FPS per camera, plus worker utilisation"""
+        now = time.time()
+        elapsed = max(now - (self.started_at or now), 1e-6)
+        with self.lock:
+            cameras = {
+                camera.camera_id: {
+                    'worker': camera.worker,
+                    'target_fps': camera.target_fps,
+                    'achieved_fps': round(camera.achieved_fps(now), 2),
+                    'analyzed': camera.analyzed,
+                    'skipped_no_new_frame': camera.skipped,
+                    'errors': camera.errors,
+                    'inference_ms': round(camera.inference_ms, 1),
+                    'latency_ms': round(camera.latency_ms, 1)
+                }
+                for camera in self.cameras.values()
+            }
+            workers = [
+                {
+                    'id': worker.id,
+                    'alive': worker.process.is_alive(),
+                    'ready': worker.ready,
+                    'busy_with': list(worker.busy),
+                    'utilisation': round(min(worker.busy_time / (elapsed * self.concurrency), 1.0), 3),
+                    'target_fps': sum(c.target_fps for c in self.cameras.values() if c.worker == worker.id)
+                }
+                for worker in self.workers
+            ]
+        for camera_id, camera_stats in cameras.items():
+            camera_stats['capture'] = self.camera_manager.get_stats(camera_id)
+        return {'cameras': cameras, 'workers': workers}
+
+def print_stats(stats):
+    print(f"{'camera':<16}{'worker':>7}{'target':>8}{'achieved':>10}{'infer ms':>10}{'latency ms':>12}")
+    for camera_id, camera in stats['cameras'].items():
+        print(f"{camera_id:<16}{camera['worker']:>7}{camera['target_fps']:>8.1f}{camera['achieved_fps']:>10.2f}"
+              f"{camera['inference_ms']:>10.1f}{camera['latency_ms']:>12.1f}")
+    for worker in stats['workers']:
+        print(f"worker {worker['id']}: utilisation {worker['utilisation'] * 100:.0f}%, target load {worker['target_fps']:.1f} fps")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run analysis for many cameras on a pool of worker processes")
+    parser.add_argument('--camera', nargs='+', action='append', required=True, metavar='ID URL [FPS]',
+                        help="camera id, RTSP URL (or device index) and optional target analysis FPS; repeat per camera")
+    parser.add_argument('--target-fps', type=float, default=5.0, help="default target analysis FPS per camera")
+    parser.add_argument('--workers', type=int, default=None, help="inference worker processes (default: CPU count)")
+    parser.add_argument('--concurrency', type=int, default=1,
+                        help="cameras analyzed at once per worker (use with BATCH_INFERENCE=1 to batch across cameras)")
+    parser.add_argument('--analyzer', default=DEFAULT_ANALYZER, help="module:function called as fn(frame, camera_id)")
+    parser.add_argument('--model-dir', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'model'),
+                        help="directory holding the analyzer module")
+    parser.add_argument('--report-interval', type=float, default=5.0)
+    args = parser.parse_args()
+
+    scheduler = CameraScheduler(workers=args.workers, analyzer=args.analyzer, model_dir=args.model_dir,
+                                concurrency=args.concurrency)
+    scheduler.start()
+    for camera in args.camera:
+        if len(camera) not in (2, 3):
+            parser.error("--camera takes ID URL [FPS]")
+        url = int(camera[1]) if camera[1].isdigit() else camera[1]
+        target_fps = float(camera[2]) if len(camera) == 3 else args.target_fps
+        scheduler.add_camera(camera[0], url, target_fps)
+    try:
+        while True:
+            time.sleep(args.report_interval)
+            print_stats(scheduler.stats())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        scheduler.stop()
@@ -2,55 +2,138 @@
 import cv2
 import threading
 import time
+import random
+import multiprocessing
 from queue import Queue
 import numpy as np
+from shared_frames import FrameRing
 
 class RTSPCamera:
-    def __init__(self, rtsp_url):
+    def __init__(self, rtsp_url, target_fps=30, max_backoff=30.0, sink=None):
         self.rtsp_url = rtsp_url
+        # Optional FrameRing that receives frames instead of the in-process queue
+        self.sink = sink
         self.cap = None
         self.frame_queue = Queue(maxsize=2)
         self.is_running = False
         self.thread = None
+        # Frames are grabbed as fast as the camera delivers them (keeps the
+        # decoder queue at live) but only decoded at up to target_fps
+        self.frame_interval = 1.0 / target_fps if target_fps else 0.0
+        self.max_backoff = max_backoff
+        self.stats_lock = threading.Lock()
+        self.grabbed_frames = 0
+        self.retrieved_frames = 0
+        # skipped: not decoded because the target rate did not need them;
+        # dropped: decoded frames lost (failed retrieve or overwritten in the queue)
+        self.skipped_frames = 0
+        self.dropped_frames = 0
+        self.reconnects = 0
+        self.reconnect_attempts = 0
+        self.fps = 0.0
+        self.decode_ms = 0.0
+        self.last_error = None
 
     def start(self):
         if self.is_running:
             return
-        
-        self.is_running = True
+
         self.cap = cv2.VideoCapture(self.rtsp_url)
-        
+
         if not self.cap.isOpened():
             raise Exception("Failed to connect to camera")
-        
+
+        self.is_running = True
         self.thread = threading.Thread(target=self._capture_loop)
         self.thread.daemon = True
         self.thread.start()
 
     def stop(self):
         self.is_running = False
-        if self.cap:
-            self.cap.release()
         if self.thread:
             self.thread.join()
+        # Release only after the loop exits so grab()/retrieve() never race a release
+        if self.cap:
+            self.cap.release()
+
+    def _reconnect(self):
+        """Reopen the capture with exponential backoff and jitter until it succeeds or the camera stops"""
+        attempt = 0
+        while self.is_running:
+            if self.cap:
+                self.cap.release()
+            delay = min(self.max_backoff, 2 ** attempt) * random.uniform(0.5, 1.0)
+            print(f"Reconnecting to camera in {delay:.1f}s (attempt {attempt + 1})")
+            time.sleep(delay)
+            self.cap = cv2.VideoCapture(self.rtsp_url)
+            with self.stats_lock:
+                self.reconnect_attempts += 1
+            if self.cap.isOpened():
+                with self.stats_lock:
+                    self.reconnects += 1
+                self.last_error = None
+                return True
+            attempt += 1
+        return False
 
     def _capture_loop(self):
+        last_retrieve = 0.0
+        # Decode deadline advanced by one interval per decoded frame. Frames that
+        # arrive up to a quarter interval early still count, so arrival jitter on
+        # a camera already at the target rate does not skip every other frame.
+        next_due = 0.0
+        tolerance = self.frame_interval * 0.25
         while self.is_running:
-            ret, frame = self.cap.read()
+            if not self.cap.grab():
+                self.last_error = "Failed to grab frame"
+                print(self.last_error)
+                if not self._reconnect():
+                    break
+                continue
+
+            now = time.time()
+            with self.stats_lock:
+                self.grabbed_frames += 1
+            if now < next_due - tolerance:
+                # Not needed at the target rate: skip the decode
+                with self.stats_lock:
+                    self.skipped_frames += 1
+                continue
+
+            start = time.time()
+            ret, frame = self.cap.retrieve()
             if not ret:
-                print("Failed to read frame")
-                time.sleep(1)
+                with self.stats_lock:
+                    self.dropped_frames += 1
                 continue
+            decode_ms = (time.time() - start) * 1000
+            # After a stall, restart the schedule from now instead of decoding a burst
+            next_due = next_due + self.frame_interval if now - next_due < self.frame_interval else now + self.frame_interval
+
+            if self.sink is not None:
+                self.sink.write(frame, now)
+            else:
+                self._enqueue(frame)
 
-            # Clear queue if full
-            if self.frame_queue.full():
-                try:
-                    self.frame_queue.get_nowait()
-                except:
-                    pass
+            with self.stats_lock:
+                self.retrieved_frames += 1
+                self.decode_ms = decode_ms if not self.decode_ms else 0.9 * self.decode_ms + 0.1 * decode_ms
+                if last_retrieve:
+                    instant_fps = 1.0 / max(now - last_retrieve, 1e-6)
+                    self.fps = instant_fps if not self.fps else 0.9 * self.fps + 0.1 * instant_fps
+            last_retrieve = now
 
-            self.frame_queue.put(frame)
-            time.sleep(0.03)  # Limit to ~30 FPS
+    def _enqueue(self, frame):
+        # Clear queue if full (the consumer always gets the newest frame)
+        if self.frame_queue.full():
+            try:
+                self.frame_queue.get_nowait()
+                with self.stats_lock:
+                    self.dropped_frames += 1
+            except:
+                pass
+
+        self.frame_queue.put(frame)
 
     def get_frame(self):
         try:
@@ -58,15 +141,109 @@ class RTSPCamera:
         except:
             return None
 
+    def get_stats(self):
+        with self.stats_lock:
+            return {
+                'connected': self.is_running and self.last_error is None,
+                'fps': round(self.fps, 2),
+                'decode_ms': round(self.decode_ms, 2),
+                'grabbed_frames': self.grabbed_frames,
+                'retrieved_frames': self.retrieved_frames,
+                'skipped_frames': self.skipped_frames,
+                'dropped_frames': self.dropped_frames,
+                'reconnects': self.reconnects,
+                'reconnect_attempts': self.reconnect_attempts,
+                'last_error': self.last_error
+            }
+
+STAT_FIELDS = ['fps', 'decode_ms', 'grabbed_frames', 'retrieved_frames', 'skipped_frames', 'dropped_frames',
+               'reconnects', 'reconnect_attempts', 'connected']
+
+def _capture_process(rtsp_url, target_fps, ring_name, stats, stop_event):
+    """Capture process body: decode one camera into its shared-memory ring until told to stop"""
+    ring = FrameRing.attach(ring_name)
+    camera = RTSPCamera(rtsp_url, target_fps=target_fps, sink=ring)
+    delay = 1.0
+    while not stop_event.is_set():
+        try:
+            camera.start()
+            break
+        except Exception as e:
+            print(f"Camera process for {rtsp_url}: {e}, retrying in {delay:.0f}s")
+            stop_event.wait(delay)
+            delay = min(camera.max_backoff, delay * 2)
+    # Publish capture stats for the parent once a second
+    while not stop_event.wait(1.0):
+        camera_stats = camera.get_stats()
+        stats[:] = [float(camera_stats[field]) for field in STAT_FIELDS]
+    camera.stop()
+    ring.close()
+
+class CameraProcess:
+    """A camera captured in its own process, with frames delivered through a FrameRing"""
+    def __init__(self, rtsp_url, target_fps=30, slots=4, max_shape=(720, 1280, 3)):
+        self.rtsp_url = rtsp_url
+        self.ring = FrameRing.create(slots, max_shape)
+        self.stats = multiprocessing.Array('d', len(STAT_FIELDS))
+        self.stop_event = multiprocessing.Event()
+        self.process = multiprocessing.Process(
+            target=_capture_process,
+            args=(rtsp_url, target_fps, self.ring.name, self.stats, self.stop_event),
+            daemon=True
+        )
+
+    @property
+    def ring_name(self):
+        return self.ring.name
+
+    def start(self):
+        self.process.start()
+
+    def stop(self):
+        self.stop_event.set()
+        self.process.join(timeout=10)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.ring.close()
+        self.ring.unlink()
+
+    def get_frame_ref(self, after=None):
+        return self.ring.latest(after)
+
+    def get_frame(self):
+        # Callers of the thread-mode API get a private copy; inference processes
+        # should attach to ring_name and read views instead
+        ref = self.ring.latest()
+        return ref.copy() if ref is not None else None
+
+    def get_stats(self):
+        stats = dict(zip(STAT_FIELDS, self.stats[:]))
+        for field in ('grabbed_frames', 'retrieved_frames', 'skipped_frames', 'dropped_frames', 'reconnects', 'reconnect_attempts'):
+            stats[field] = int(stats[field])
+        stats['connected'] = bool(stats['connected']) and self.process.is_alive()
+        stats['frames_in_ring'] = self.ring.frames_written()
+        stats['ring'] = self.ring.name
+        return stats
+
 class CameraManager:
-    def __init__(self):
+    def __init__(self, mode='thread', ring_slots=4, max_shape=(720, 1280, 3)):
+        # 'thread': capture threads in this process feeding in-process queues
+        # 'process': one capture process per camera writing into a shared-memory ring
+        if mode not in ('thread', 'process'):
+            raise ValueError(f"Unknown camera mode: {mode}")
+        self.mode = mode
+        self.ring_slots = ring_slots
+        self.max_shape = max_shape
         self.cameras = {}
 
-    def add_camera(self, camera_id, rtsp_url):
+    def add_camera(self, camera_id, rtsp_url, target_fps=30):
         if camera_id in self.cameras:
             self.cameras[camera_id].stop()
-        
-        camera = RTSPCamera(rtsp_url)
+
+        if self.mode == 'process':
+            camera = CameraProcess(rtsp_url, target_fps, self.ring_slots, self.max_shape)
+        else:
+            camera = RTSPCamera(rtsp_url, target_fps=target_fps)
         camera.start()
         self.cameras[camera_id] = camera
 
@@ -80,10 +257,22 @@ class CameraManager:
             return self.cameras[camera_id].get_frame()
         return None
 
+    def get_ring_name(self, camera_id):
+        """Shared-memory name inference processes pass to FrameRing.attach (process mode only)"""
+        camera = self.cameras.get(camera_id)
+        return camera.ring_name if isinstance(camera, CameraProcess) else None
+
+    def get_stats(self, camera_id=None):
+        """Per-camera capture stats (FPS, decode time, skipped and dropped frames, reconnects)"""
+        if camera_id is not None:
+            camera = self.cameras.get(camera_id)
+            return camera.get_stats() if camera else None
+        return {camera_id: camera.get_stats() for camera_id, camera in self.cameras.items()}
+
     def stop_all(self):
         for camera in self.cameras.values():
             camera.stop()
         self.cameras.clear()
 
 # Global camera manager instance
-camera_manager = CameraManager() 
\ No newline at end of file
+camera_manager = CameraManager()
@@ -1,5 +1,9 @@
 // Hybrid Camera Implementation for KavachEye
-// This replaces WebSocket streaming with HTTP POST requests to Vercel AI service
+// Frames go to the backend's persistent Socket.IO /analysis channel when an
+// analysis server is configured (window.KAVACHEYE_ANALYSIS_URL), with
+// credit-based flow control: a frame is only sent when the server has granted
+// a credit, so the frame rate follows the server's capacity. Without one it
+// falls back to the fixed-rate loop with simulated AI results.
 
 class HybridCameraManager {
     constructor() {
@@ -8,6 +12,8 @@ class HybridCameraManager {
         this.aiServiceUrl = 'https://kavacheye-3opoi05a0-shreyas162004s-projects.vercel.app/predict'; // Updated to new model service URL with CORS fixes
         this.processingInterval = null;
         this.frameRate = 2; // Frames per second to send to AI service
+        this.analysisSocketUrl = window.KAVACHEYE_ANALYSIS_URL || null; // e.g. 'http://localhost:5000'
+        this.maxSocketFrameRate = 15; // Upper bound even when the server has spare credits
         this.analyticsData = {
             maleCount: 0,
             femaleCount: 0,
@@ -68,6 +74,11 @@ class HybridCameraManager {
         // Reset analytics data when starting new stream
         this.resetAnalyticsData();
 
+        if (this.analysisSocketUrl && typeof io !== 'undefined') {
+            this.startSocketStream(cameraId);
+            return;
+        }
+
         this.activeStreams.set(cameraId, true);
         console.log(`Starting hybrid stream for camera ${cameraId}`);
 
@@ -84,6 +95,109 @@ class HybridCameraManager {
         this.updateConnectionStatus('connected', 'Processing with AI');
     }
 
+    // Start a persistent analysis channel for this camera
+    startSocketStream(cameraId) {
+        const socket = io(`${this.analysisSocketUrl}/analysis`, {
+            // Start on long-polling and upgrade to a websocket when the server
+            // supports it (the 4.0 client does not fall back from websocket-first)
+            transports: ['polling', 'websocket'],
+            query: { stream_id: `camera_${cameraId}` }
+        });
+        const channel = { socket: socket, credits: 0, seq: 0, capturing: false, lastSent: 0, timer: null, frameUrl: null };
+        this.activeStreams.set(cameraId, channel);
+        console.log(`Starting analysis channel for camera ${cameraId}`);
+
+        socket.on('ready', (message) => {
+            channel.credits = message.credits;
+            this.updateCameraStatus(cameraId, true);
+            this.updateConnectionStatus('connected', 'Processing with AI');
+            this.pumpFrames(cameraId);
+        });
+
+        socket.on('result', (message) => {
+            channel.credits += message.credits;
+            if (message.status === 'success') {
+                this.processAIResults(this.analysisToResults(message));
+            } else {
+                console.error(`Analysis error for camera ${cameraId}:`, message.error);
+            }
+            this.pumpFrames(cameraId);
+        });
+
+        socket.on('disconnect', () => {
+            channel.credits = 0;
+            this.updateConnectionStatus('disconnected', 'Analysis channel disconnected');
+        });
+    }
+
+    // Send frames while credits are available, capped at maxSocketFrameRate
+    async pumpFrames(cameraId) {
+        const channel = this.activeStreams.get(cameraId);
+        const camera = this.cameras.get(cameraId);
+        if (!channel || !channel.socket || !camera || channel.capturing || channel.credits <= 0) {
+            return;
+        }
+
+        const wait = channel.lastSent + 1000 / this.maxSocketFrameRate - Date.now();
+        if (wait > 0) {
+            if (!channel.timer) {
+                channel.timer = setTimeout(() => {
+                    channel.timer = null;
+                    this.pumpFrames(cameraId);
+                }, wait);
+            }
+            return;
+        }
+
+        channel.capturing = true;
+        try {
+            camera.context.drawImage(camera.video, 0, 0, camera.canvas.width, camera.canvas.height);
+            const blob = await new Promise(resolve => camera.canvas.toBlob(resolve, 'image/jpeg', 0.8));
+            if (!blob || this.activeStreams.get(cameraId) !== channel) {
+                return;
+            }
+
+            // Binary attachment, no base64 and no echo of the frame
+            channel.credits--;
+            channel.lastSent = Date.now();
+            channel.socket.emit('frame', { seq: ++channel.seq, image: await blob.arrayBuffer() });
+
+            // Show the frame we just sent
+            if (channel.frameUrl) {
+                URL.revokeObjectURL(channel.frameUrl);
+            }
+            channel.frameUrl = URL.createObjectURL(blob);
+            this.updateVideoDisplay(cameraId, channel.frameUrl);
+        } catch (error) {
+            console.error(`Error sending frame for camera ${cameraId}:`, error);
+        } finally {
+            channel.capturing = false;
+        }
+
+        this.pumpFrames(cameraId);
+    }
+
+    // Map backend analytics to the results format used by processAIResults
+    analysisToResults(message) {
+        const analytics = message.analytics;
+        const people = analytics.maleCount + analytics.femaleCount;
+        const violenceDetected = analytics.violenceCount > 0;
+        return {
+            pose_detection: { detected: analytics.poseDetected, confidence: analytics.poseDetected ? 1.0 : 0.0 },
+            gender_detection: {
+                detected: people > 0,
+                gender: analytics.femaleCount > analytics.maleCount ? 'Female' : 'Male',
+                confidence: people > 0 ? 1.0 : 0.0
+            },
+            violence_detection: {
+                detected: violenceDetected,
+                classification: violenceDetected ? 'Violence' : 'Normal',
+                confidence: violenceDetected ? 1.0 : 0.0
+            },
+            face_detection: { detected: message.detections.people > 0, faces_count: message.detections.people }
+        };
+    }
+
     // Reset analytics data
     resetAnalyticsData() {
         this.analyticsData = {
@@ -103,8 +217,17 @@ class HybridCameraManager {
             return;
         }
 
-        // Stop the processing interval for this camera
-        clearInterval(intervalId);
+        if (intervalId.socket) {
+            // Close the analysis channel for this camera
+            clearTimeout(intervalId.timer);
+            intervalId.socket.disconnect();
+            if (intervalId.frameUrl) {
+                URL.revokeObjectURL(intervalId.frameUrl);
+            }
+        } else {
+            // Stop the processing interval for this camera
+            clearInterval(intervalId);
+        }
 
         // Stop the camera stream
         const camera = this.cameras.get(cameraId);
@@ -0,0 +1,170 @@
+import time
+import weakref
+import cv2
+import numpy as np
+from multiprocessing import shared_memory
+
+# Fixed-size frame rings in shared memory.
+# One capture process writes each camera's frames into a ring of slots; any
+# number of inference processes attach to the ring by name and read the newest
+# frame as a NumPy view straight onto the shared buffer, so frames are never
+# pickled or copied across the process boundary.
+#
+# Layout: a ring header (slots, max height/width/channels, frames written)
+# followed by the slots. Every slot has its own header of sequence number,
+# frame shape, timestamp and frame index and works as a seqlock: the writer
+# bumps the sequence to an odd value before touching the pixels and to the
+# next even value once the frame is complete. A reader keeps the sequence it saw and
+# calls FrameRef.valid() after using the view; if the writer has come round to
+# the slot again in the meantime the result must be thrown away (or the frame
+# copied first). The frame index in the slot header tells a reader which frame
+# it actually got when the writer lapped the ring while it was looking.
+#
+# A ring's shared memory can only be closed once no NumPy view onto it is
+# alive. close() releases the FrameRefs the ring handed out; callers must not
+# keep their own references to ref.frame past that point.
+
+RING_FIELDS = 8
+SLOTS, MAX_HEIGHT, MAX_WIDTH, CHANNELS, WRITTEN = range(5)
+SLOT_FIELDS = 8
+SEQ, HEIGHT, WIDTH, DEPTH, TIMESTAMP_NS, FRAME_INDEX = range(6)
+ALIGN = 64
+
+def _aligned(size):
+    return (size + ALIGN - 1) // ALIGN * ALIGN
+
+class FrameRef:
+    """Zero-copy view of one ring slot, valid while the writer has not reused the slot"""
+    def __init__(self, ring, slot, seq, index, timestamp, frame):
+        self.ring = ring
+        self.slot = slot
+        self.seq = seq
+        self.index = index
+        self.timestamp = timestamp
+        self.frame = frame
+
+    def valid(self):
+        return self.frame is not None and int(self.ring.slot_headers[self.slot, SEQ]) == self.seq
+
+    def copy(self):
+        """Private copy of the frame, or None if the slot was overwritten while copying"""
+        if self.frame is None:
+            return None
+        frame = self.frame.copy()
+        return frame if self.valid() else None
+
+    def release(self):
+        """Drop the view onto shared memory (the ref is invalid afterwards)"""
+        self.frame = None
+
+class FrameRing:
+    def __init__(self, shm, owner):
+        self.shm = shm
+        self.owner = owner
+        self.header = np.ndarray((RING_FIELDS,), dtype=np.int64, buffer=shm.buf)
+        self.slots = int(self.header[SLOTS])
+        self.max_shape = (int(self.header[MAX_HEIGHT]), int(self.header[MAX_WIDTH]), int(self.header[CHANNELS]))
+        self.slot_headers = np.ndarray((self.slots, SLOT_FIELDS), dtype=np.int64, buffer=shm.buf, offset=RING_FIELDS * 8)
+        data_offset = _aligned((RING_FIELDS + self.slots * SLOT_FIELDS) * 8)
+        self.slot_size = _aligned(int(np.prod(self.max_shape)))
+        self.data = np.ndarray((self.slots, self.slot_size), dtype=np.uint8, buffer=shm.buf, offset=data_offset)
+        self.resized_frames = 0
+        # Handed-out refs, released on close so their views do not pin the mapping
+        self.refs = weakref.WeakSet()
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    @staticmethod
+    def size_for(slots, max_shape):
+        return _aligned((RING_FIELDS + slots * SLOT_FIELDS) * 8) + slots * _aligned(int(np.prod(max_shape)))
+
+    @classmethod
+    def create(cls, slots=4, max_shape=(720, 1280, 3), name=None):
+        shm = shared_memory.SharedMemory(name=name, create=True, size=cls.size_for(slots, max_shape))
+        header = np.ndarray((RING_FIELDS,), dtype=np.int64, buffer=shm.buf)
+        header[:] = 0
+        header[SLOTS] = slots
+        header[MAX_HEIGHT], header[MAX_WIDTH], header[CHANNELS] = max_shape
+        ring = cls(shm, owner=True)
+        ring.slot_headers[:] = 0
+        return ring
+
+    @classmethod
+    def attach(cls, name):
+        return cls(shared_memory.SharedMemory(name=name), owner=False)
+
+    def write(self, frame, timestamp=None):
+        """Copy one frame into the next slot (the only copy between capture and inference)"""
+        max_height, max_width, channels = self.max_shape
+        if frame.ndim == 2:
+            frame = frame[:, :, np.newaxis]
+        height, width = frame.shape[:2]
+        if frame.shape[2] != channels:
+            raise ValueError(f"Expected {channels} channels, got {frame.shape[2]}")
+        if height > max_height or width > max_width:
+            # Frames larger than the ring was sized for are downscaled to fit
+            scale = min(max_height / height, max_width / width)
+            frame = cv2.resize(frame, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA)
+            frame = frame.reshape(frame.shape[0], frame.shape[1], channels)
+            height, width = frame.shape[:2]
+            self.resized_frames += 1
+
+        written = int(self.header[WRITTEN])
+        slot = written % self.slots
+        slot_header = self.slot_headers[slot]
+        slot_header[SEQ] += 1  # odd: write in progress
+        target = self.data[slot, :height * width * channels].reshape(height, width, channels)
+        np.copyto(target, frame)
+        slot_header[HEIGHT], slot_header[WIDTH], slot_header[DEPTH] = height, width, channels
+        slot_header[TIMESTAMP_NS] = int((timestamp if timestamp is not None else time.time()) * 1e9)
+        slot_header[FRAME_INDEX] = written
+        slot_header[SEQ] += 1  # even: frame complete
+        self.header[WRITTEN] = written + 1
+        return written
+
+    def frames_written(self):
+        return int(self.header[WRITTEN])
+
+    def latest(self, after=None):
+        """
+        Newest complete frame as a FrameRef, or None if nothing has been written
+        (or nothing newer than frame index `after`).
+        """
+        written = int(self.header[WRITTEN])
+        # Walk back from the newest slot in case the writer is mid-way through it
+        for index in range(written - 1, max(written - 1 - self.slots, -1), -1):
+            if after is not None and index <= after:
+                return None
+            slot = index % self.slots
+            slot_header = self.slot_headers[slot]
+            seq = int(slot_header[SEQ])
+            if seq % 2:
+                continue
+            height, width, channels = (int(v) for v in slot_header[HEIGHT:DEPTH + 1])
+            timestamp = slot_header[TIMESTAMP_NS] / 1e9
+            frame_index = int(slot_header[FRAME_INDEX])
+            frame = self.data[slot, :height * width * channels].reshape(height, width, channels)
+            if int(slot_header[SEQ]) != seq:
+                continue
+            # If the writer lapped the ring since WRITTEN was read, the slot holds a
+            # newer frame than `index`: report the index the slot really holds
+            if after is not None and frame_index <= after:
+                return None
+            ref = FrameRef(self, slot, seq, frame_index, timestamp, frame)
+            self.refs.add(ref)
+            return ref
+        return None
+
+    def close(self):
+        # Views must be dropped before the mapping can be closed; frames a caller
+        # still references through ref.frame elsewhere raise BufferError here
+        for ref in list(self.refs):
+            ref.release()
+        self.header = self.slot_headers = self.data = None
+        self.shm.close()
+
+    def unlink(self):
+        if self.owner:
+            self.shm.unlink()
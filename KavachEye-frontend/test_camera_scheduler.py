@@ -0,0 +1,34 @@
+import queue
+import threading
+import numpy as np
+from camera_scheduler import _worker_loop
+from shared_frames import FrameRing
+
+def run_worker(job_list, analyze, forget):
+    jobs, results = queue.Queue(), queue.Queue()
+    for job in job_list + [None]:
+        jobs.put(job)
+    rings = {}
+    _worker_loop(0, analyze, rings, threading.Lock(), jobs, results, forget)
+    return rings, [results.get_nowait() for _ in range(results.qsize())]
+
+def test_forget_drops_state_and_ring_view():
+    ring = FrameRing.create(slots=2, max_shape=(8, 8, 3))
+    try:
+        ring.write(np.zeros((8, 8, 3), np.uint8))
+        forgotten = []
+        rings, results = run_worker([
+            ('analyze', 'cam1', ring.name, None),
+            ('forget', 'cam1', ring.name, None)
+        ], analyze=lambda frame, camera_id: {'camera': camera_id}, forget=forgotten.append)
+        assert [kind for kind, _, _ in results] == ['done']
+        assert results[0][2]['result'] == {'camera': 'cam1'}
+        assert forgotten == ['cam1']
+        assert rings == {}
+    finally:
+        ring.close()
+        ring.unlink()
+
+def test_forget_without_analyzer_hook():
+    rings, results = run_worker([('forget', 'cam1', None, None)], analyze=None, forget=None)
+    assert rings == {} and results == []
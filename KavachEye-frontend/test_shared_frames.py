@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+from shared_frames import FrameRing, SEQ, WRITTEN
+
+@pytest.fixture
+def ring():
+    ring = FrameRing.create(slots=3, max_shape=(48, 64, 3))
+    yield ring
+    ring.close()
+    ring.unlink()
+
+def frame(value, shape=(48, 64, 3)):
+    return np.full(shape, value, np.uint8)
+
+def test_reader_sees_newest_frame_zero_copy(ring):
+    assert ring.latest() is None
+    for value in range(5):
+        ring.write(frame(value), timestamp=100.0 + value)
+    reader = FrameRing.attach(ring.name)
+    try:
+        ref = reader.latest()
+        assert (ref.index, ref.timestamp) == (4, 104.0)
+        assert ref.frame[0, 0, 0] == 4 and ref.valid()
+        assert reader.latest(after=4) is None
+    finally:
+        reader.close()
+
+def test_ref_invalid_once_writer_laps_the_slot(ring):
+    ring.write(frame(1))
+    ref = ring.latest()
+    copy = ref.copy()
+    for value in range(3):
+        ring.write(frame(10 + value))
+    assert not ref.valid()
+    assert ref.copy() is None
+    assert copy[0, 0, 0] == 1
+
+def test_skips_slot_mid_write(ring):
+    ring.write(frame(1))
+    ring.write(frame(2))
+    # Simulate the writer stopped half-way through the newest slot
+    ring.slot_headers[1, SEQ] += 1
+    ref = ring.latest()
+    assert (ref.index, ref.frame[0, 0, 0]) == (0, 1)
+
+def test_lapped_slot_reports_its_real_index(ring):
+    for value in range(4):
+        ring.write(frame(value))
+    # Frame 3 overwrote slot 0; a reader that had only seen WRITTEN == 1 gets index 3
+    ring.header[WRITTEN] = 1
+    ref = ring.latest()
+    assert ref.index == 3 and ref.frame[0, 0, 0] == 3
+    assert ring.latest(after=3) is None
+
+def test_oversized_frames_are_downscaled(ring):
+    ring.write(frame(7, (96, 128, 3)))
+    ref = ring.latest()
+    assert ref.frame.shape == (48, 64, 3)
+    assert ring.resized_frames == 1
+
+def test_close_releases_handed_out_refs():
+    ring = FrameRing.create(slots=2, max_shape=(8, 8, 3))
+    ring.write(frame(1, (8, 8, 3)))
+    ref = ring.latest()
+    ring.close()
+    ring.unlink()
+    assert ref.frame is None and not ref.valid() and ref.copy() is None
@@ -0,0 +1,160 @@
+import os
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import multiprocessing
+import cv2
+
+# Offline analysis of recorded footage with the frame_analyzer.py detection stages.
+# Every video is split into chunks of --chunk-seconds that worker processes seek
+# to and analyze independently, so hours of footage are scanned in parallel and
+# much faster than realtime. Per-frame detections are streamed to a JSONL file
+# as chunks finish, followed by one violence event per contiguous run of frames
+# in the smoothed "violent" state.
+#
+#   python analyze_footage.py incident.mp4 --stride 5 --workers 4 --output incident.jsonl
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+_analyzer = None
+
+def _init_worker(violence_stride):
+    global _analyzer
+    # The stride over the video already thins the frames, so by default the
+    # violence model sees every analyzed frame
+    os.environ.setdefault('VIOLENCE_STRIDE', str(violence_stride))
+    sys.path.insert(0, current_dir)
+    # frame_analyzer has no app side effects (no Twilio client, no SOS thread)
+    import frame_analyzer
+    _analyzer = frame_analyzer
+
+def probe_video(path):
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise IOError(f"Cannot open video: {path}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    return fps, frames
+
+def plan_chunks(path, fps, total_frames, chunk_seconds):
+    chunk_frames = max(1, int(chunk_seconds * fps))
+    return [
+        {'video': path, 'fps': fps, 'start': start, 'end': min(start + chunk_frames, total_frames)}
+        for start in range(0, total_frames, chunk_frames)
+    ]
+
+def analyze_chunk(chunk, stride, warmup_frames):
+    """Analyze frames [start, end) of one video; returns (records, analyzed frame count)"""
+    camera_id = f"{chunk['video']}@{chunk['start']}"
+    # Start a few analyzed frames early so the smoothing and tracks are warm
+    # at the chunk boundary; warm-up frames are not reported
+    first = max(0, chunk['start'] - warmup_frames * stride)
+    cap = cv2.VideoCapture(chunk['video'])
+    cap.set(cv2.CAP_PROP_POS_FRAMES, first)
+    records = []
+    analyzed = 0
+    frame_index = first
+    try:
+        while frame_index < chunk['end']:
+            # Skipped frames are only grabbed, never decoded into an image
+            if not cap.grab():
+                break
+            if (frame_index - first) % stride == 0:
+                ret, frame = cap.retrieve()
+                if not ret:
+                    break
+                # Gate on the video's own clock so results do not depend on host speed
+                result = _analyzer.analyze_frame(frame, camera_id, timestamp=frame_index / chunk['fps'])
+                analyzed += 1
+                if frame_index >= chunk['start']:
+                    record = {'type': 'frame', 'video': chunk['video'], 'frame': frame_index,
+                              'time_s': round(frame_index / chunk['fps'], 3)}
+                    record.update(result)
+                    records.append(record)
+            frame_index += 1
+    finally:
+        cap.release()
+        _analyzer.forget_camera(camera_id)
+    return records, analyzed
+
+def violence_events(records, max_gap_s):
+    """Merge frames in the violent state into events, bridging gaps up to max_gap_s"""
+    events = []
+    for record in sorted(records, key=lambda r: r['frame']):
+        if not record.get('violent'):
+            continue
+        if events and record['time_s'] - events[-1]['end_s'] <= max_gap_s:
+            event = events[-1]
+            event['end_s'] = record['time_s']
+            event['frames'] += 1
+            event['peak_score'] = max(event['peak_score'], record['violence_score'])
+        else:
+            events.append({'type': 'violence_event', 'video': record['video'], 'start_s': record['time_s'],
+                           'end_s': record['time_s'], 'frames': 1, 'peak_score': record['violence_score']})
+    return events
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyze recorded footage faster than realtime")
+    parser.add_argument('videos', nargs='+', help="video files to analyze")
+    parser.add_argument('--output', default='footage_analysis.jsonl', help="JSONL output file")
+    parser.add_argument('--stride', type=int, default=5, help="analyze every Nth frame")
+    parser.add_argument('--chunk-seconds', type=float, default=120.0, help="video seconds per parallel chunk")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument('--warmup-frames', type=int, default=5, help="analyzed frames before each chunk used only to warm up smoothing")
+    parser.add_argument('--violence-stride', type=int, default=1, help="VIOLENCE_STRIDE for the workers unless already set")
+    args = parser.parse_args()
+    if args.stride < 1:
+        parser.error("--stride must be >= 1")
+
+    chunks = []
+    video_seconds = {}
+    for path in args.videos:
+        fps, total_frames = probe_video(path)
+        video_seconds[path] = total_frames / fps
+        chunks.extend(plan_chunks(path, fps, total_frames, args.chunk_seconds))
+    print(f"{len(args.videos)} video(s), {sum(video_seconds.values()):.0f}s of footage in {len(chunks)} chunks, {args.workers} workers")
+
+    frame_records = {path: [] for path in args.videos}
+    chunks_left = {path: sum(1 for c in chunks if c['video'] == path) for path in args.videos}
+    done_seconds = 0.0
+    start = time.time()
+    with open(args.output, 'w') as output, ProcessPoolExecutor(
+        max_workers=args.workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_init_worker,
+        initargs=(args.violence_stride,)
+    ) as executor:
+        futures = {executor.submit(analyze_chunk, chunk, args.stride, args.warmup_frames): chunk for chunk in chunks}
+        for future in as_completed(futures):
+            chunk = futures[future]
+            records, analyzed = future.result()
+            for record in records:
+                output.write(json.dumps(record) + '\n')
+            output.flush()
+            # Only the fields needed for event merging are kept in memory
+            frame_records[chunk['video']].extend(
+                {k: r.get(k) for k in ('video', 'frame', 'time_s', 'violent', 'violence_score')} for r in records
+            )
+            done_seconds += (chunk['end'] - chunk['start']) / chunk['fps']
+            elapsed = time.time() - start
+            print(f"{chunk['video']} [{chunk['start'] / chunk['fps']:.0f}s-{chunk['end'] / chunk['fps']:.0f}s]: "
+                  f"{analyzed} frames analyzed, {done_seconds / elapsed:.1f} video-s/wall-s")
+
+            chunks_left[chunk['video']] -= 1
+            if chunks_left[chunk['video']] == 0:
+                # All chunks of this video are in, so events can span chunk boundaries
+                events = violence_events(frame_records.pop(chunk['video']), max_gap_s=2 * args.stride / chunk['fps'])
+                for event in events:
+                    output.write(json.dumps(event) + '\n')
+                output.flush()
+                print(f"{chunk['video']}: {len(events)} violence event(s)")
+
+    elapsed = time.time() - start
+    print(f"Analyzed {done_seconds:.0f} video seconds in {elapsed:.0f}s: {done_seconds / elapsed:.1f} video-seconds per wall-second")
+    print(f"Results written to {args.output}")
+
+if __name__ == '__main__':
+    main()
@@ -1,21 +1,13 @@
 from flask import Flask, render_template, Response, jsonify
-from keras.models import load_model
 import cv2
 import numpy as np
-from keras.layers import DepthwiseConv2D
-
-# Custom DepthwiseConv2D layer to ignore unrecognized arguments
-class CustomDepthwiseConv2D(DepthwiseConv2D):
-    def __init__(self, *args, **kwargs):
-        if 'groups' in kwargs:
-            kwargs.pop('groups')
-        super(CustomDepthwiseConv2D, self).__init__(*args, **kwargs)
+from model_runner import get_runner
 
 # Initialize the Flask application
 app = Flask(__name__)
 
-# Load the gender detection model
-model = load_model("gender.h5", custom_objects={'DepthwiseConv2D': CustomDepthwiseConv2D}, compile=False)
+# Load the gender detection model behind a warm, shape-fixed runner
+model = get_runner('gender')
 
 # Load the labels
 class_names = open("labels_gender.txt", "r").readlines()
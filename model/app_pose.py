@@ -1,9 +1,10 @@
-from flask import Flask, render_template, Response
+from flask import Flask, render_template, Response, jsonify
 from flask_socketio import SocketIO
 import cv2
 from ultralytics import YOLO
 import base64
 import numpy as np
+from motion_gate import MotionGate
 
 app = Flask(__name__)
 socketio = SocketIO(app)
@@ -11,6 +12,9 @@ socketio = SocketIO(app)
 # Load YOLO model
 model = YOLO("yolov8n-pose.pt")
 
+# Skip pose inference while the scene is static (enable with MOTION_GATE=1)
+motion_gate = MotionGate.from_env()
+
 def generate_frames():
     cap = cv2.VideoCapture(0)  # Open webcam
 
@@ -19,11 +23,14 @@ def generate_frames():
         if not success:
             break
 
-        # Perform inference on the current frame
-        results = model(frame)
+        if motion_gate.check(frame):
+            # Perform inference on the current frame
+            results = model(frame)
 
-        # Plot the results on the frame
-        plotted_frame = results[0].plot()
+            # Plot the results on the frame
+            plotted_frame = results[0].plot()
+        else:
+            plotted_frame = frame
 
         # Encode the frame to JPEG format
         ret, buffer = cv2.imencode('.jpg', plotted_frame)
@@ -39,6 +46,10 @@ def generate_frames():
 def index():
     return render_template('index3.html')
 
+@app.route('/gate_stats')
+def gate_stats():
+    return jsonify(motion_gate.stats())
+
 @socketio.on('connect')
 def handle_connect():
     socketio.start_background_task(generate_frames)
@@ -0,0 +1,135 @@
+import time
+import threading
+from collections import deque
+from concurrent.futures import Future
+import numpy as np
+
+# Cross-camera batched inference.
+# Camera pipelines running in threads of one process submit single frames; a
+# batcher thread per model collects whatever arrives within a short window (or
+# until max_batch items are queued), runs one batched model call and scatters
+# the rows back to the waiting callers through futures. The window bounds the
+# latency batching can add, and a lone camera still gets its result after at
+# most max_wait_ms.
+
+class InferenceBatcher:
+    def __init__(self, name, run_batch, max_batch=8, max_wait_ms=20.0):
+        """run_batch(items) must return one result per item, in order"""
+        self.name = name
+        self.run_batch = run_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.pending = deque()
+        self.condition = threading.Condition()
+        self.running = True
+        self.batches = 0
+        self.items = 0
+        self.wait_ms = 0.0
+        self.run_ms = 0.0
+        self.thread = threading.Thread(target=self._batch_loop, daemon=True)
+        self.thread.start()
+
+    def submit(self, item):
+        future = Future()
+        with self.condition:
+            if not self.running:
+                raise RuntimeError(f"{self.name} batcher is closed")
+            self.pending.append((item, future, time.time()))
+            self.condition.notify()
+        return future
+
+    def __call__(self, item, timeout=None):
+        return self.submit(item).result(timeout)
+
+    def close(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        self.thread.join()
+
+    def _collect(self):
+        """Block for the first item, then gather more until the batch is full or the window closes"""
+        with self.condition:
+            self.condition.wait_for(lambda: self.pending or not self.running)
+            if not self.pending:
+                return []
+            deadline = self.pending[0][2] + self.max_wait
+            while len(self.pending) < self.max_batch and self.running:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                self.condition.wait(remaining)
+            batch = [self.pending.popleft() for _ in range(min(self.max_batch, len(self.pending)))]
+        return batch
+
+    def _batch_loop(self):
+        while True:
+            batch = self._collect()
+            if not batch:
+                if not self.running:
+                    break
+                continue
+            start = time.time()
+            try:
+                results = self.run_batch([item for item, _, _ in batch])
+                if len(results) != len(batch):
+                    raise ValueError(f"{self.name} returned {len(results)} results for {len(batch)} items")
+                for (_, future, _), result in zip(batch, results):
+                    future.set_result(result)
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+            finished = time.time()
+            self.batches += 1
+            self.items += len(batch)
+            self.wait_ms += sum(start - submitted for _, _, submitted in batch) * 1000
+            self.run_ms += (finished - start) * 1000
+
+    def stats(self):
+        return {
+            'batches': self.batches,
+            'items': self.items,
+            'avg_batch_size': round(self.items / self.batches, 2) if self.batches else 0.0,
+            'avg_queue_wait_ms': round(self.wait_ms / self.items, 2) if self.items else 0.0,
+            'avg_batch_ms': round(self.run_ms / self.batches, 2) if self.batches else 0.0,
+            'queued': len(self.pending)
+        }
+
+class BatchedModel:
+    """
+    Drop-in for a ModelRunner in single-frame callers such as ViolenceStage:
+    predict(x) with x of shape (1,) + input_shape is merged with other callers' inputs.
+    """
+    def __init__(self, runner, max_batch=8, max_wait_ms=20.0):
+        self.runner = runner
+        self.input_shape = runner.input_shape
+        self.batcher = InferenceBatcher(runner.name, self._run, max_batch, max_wait_ms)
+
+    def _run(self, inputs):
+        outputs = self.runner.predict(np.concatenate(inputs, axis=0))
+        # Scatter rows back per caller, keeping each caller's own batch dimension
+        offsets = np.cumsum([0] + [len(x) for x in inputs])
+        return [outputs[offsets[i]:offsets[i + 1]] for i in range(len(inputs))]
+
+    def predict(self, x):
+        # The input may be a view into a reused buffer; the caller blocks until
+        # the batch has been concatenated and run, so the view stays valid
+        return self.batcher(x)
+
+    def stats(self):
+        return self.batcher.stats()
+
+class BatchedPose:
+    """Drop-in for an ultralytics model called as model(frame): frames go to the model as one list"""
+    def __init__(self, model, max_batch=8, max_wait_ms=20.0):
+        self.model = model
+        self.batcher = InferenceBatcher('pose', self._run, max_batch, max_wait_ms)
+
+    def _run(self, frames):
+        return list(self.model(frames, verbose=False))
+
+    def __call__(self, frame, **kwargs):
+        return [self.batcher(frame)]
+
+    def stats(self):
+        return self.batcher.stats()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Benchmark per-face vs batched gender/emotion inference
+
+Builds synthetic frames with 1, 5, 20 and 50 faces, runs the original
+per-face path (one gender and one emotion predict per face) and the batched
+path from face_batch.py, checks that both produce the same labels and prints
+frames/sec for each.
+"""
+
+import sys
+import time
+import cv2
+import numpy as np
+from face_batch import classify_faces
+from model_runner import get_runner
+
+emotions = ["positive", "negative", "neutral"]
+confidence_threshold = 0.6
+face_counts = [1, 5, 20, 50]
+
+def make_frame(num_faces, rng, frame_size=(720, 1280), face_size=96):
+    """Random frame plus num_faces non-overlapping face-sized boxes"""
+    h, w = frame_size
+    frame = rng.integers(0, 256, size=(h, w, 3), dtype=np.uint8)
+    cols = w // face_size
+    boxes = []
+    for i in range(num_faces):
+        row, col = divmod(i, cols)
+        startX, startY = col * face_size, row * face_size
+        boxes.append((startX, startY, startX + face_size, startY + face_size))
+    faces = [frame[sY:eY, sX:eX] for (sX, sY, eX, eY) in boxes]
+    return frame, faces
+
+def classify_faces_per_face(faces, gender_model, emotion_model):
+    """Original complete.py path: two predict calls per face"""
+    genders = []
+    face_emotions = []
+    for face in faces:
+        face_preprocessed = cv2.resize(face, (150, 150)).astype('float32') / 255.0
+        face_preprocessed = np.expand_dims(face_preprocessed, axis=0)
+        predicted_gender_prob = gender_model.predict(face_preprocessed, verbose=0)[0][0]
+        if predicted_gender_prob > (1 - confidence_threshold):
+            genders.append('Female')
+        elif predicted_gender_prob < confidence_threshold:
+            genders.append('Male')
+        else:
+            genders.append('Neutral')
+
+        roi_gray = cv2.cvtColor(face, cv2.COLOR_BGR2GRAY)
+        roi_gray = cv2.resize(roi_gray, (48, 48)).astype('float32') / 255.0
+        roi_gray = roi_gray.reshape(1, 48, 48, 1)
+        emotion_prediction = emotion_model.predict(roi_gray, verbose=0)
+        face_emotions.append(emotions[np.argmax(emotion_prediction[0])])
+    return genders, face_emotions
+
+def time_fps(fn, repeats):
+    fn()  # warm-up
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return repeats / (time.perf_counter() - start)
+
+def run_benchmark(repeats=5):
+    gender_runner = get_runner('gender_best')
+    emotion_runner = get_runner('emotion')
+    # The per-face baseline uses keras.Model.predict exactly like the old code
+    gender_model = gender_runner.keras_model
+    emotion_model = emotion_runner.keras_model
+    rng = np.random.default_rng(0)
+
+    print(f"{'faces':>6} | {'per-face fps':>12} | {'batched fps':>11} | {'speedup':>7} | labels match")
+    print("-" * 62)
+    all_match = True
+    for num_faces in face_counts:
+        _, faces = make_frame(num_faces, rng)
+
+        expected = classify_faces_per_face(faces, gender_model, emotion_model)
+        actual = classify_faces(faces, gender_runner, emotion_runner, confidence_threshold, emotions)
+        match = expected == actual
+        all_match = all_match and match
+
+        per_face_fps = time_fps(lambda: classify_faces_per_face(faces, gender_model, emotion_model), repeats)
+        batched_fps = time_fps(lambda: classify_faces(faces, gender_runner, emotion_runner, confidence_threshold, emotions), repeats)
+        print(f"{num_faces:>6} | {per_face_fps:>12.2f} | {batched_fps:>11.2f} | {batched_fps / per_face_fps:>6.1f}x | {match}")
+    return all_match
+
+if __name__ == "__main__":
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    print("Per-face vs batched gender/emotion inference")
+    print("=" * 62)
+    ok = run_benchmark(repeats)
+    sys.exit(0 if ok else 1)
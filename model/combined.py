@@ -4,12 +4,16 @@ import os
 import time
 import json
 import random
+import cv2
+import numpy as np
+from frame_cache import FrameResultCache
 
 app = Flask(__name__)
 from flask_cors import CORS
 CORS(app, origins=['http://127.0.0.1:5500', 'http://localhost:5500', 'http://localhost:3000', 'http://127.0.0.1:3000', '*'], 
      methods=['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS'],
-     allow_headers=['Content-Type', 'Authorization'])
+     allow_headers=['Content-Type', 'Authorization'],
+     expose_headers=['X-Cache', 'X-Cache-Hit-Rate', 'X-Cache-Saved-Ms', 'X-Cache-Distance'])
 
 # Get the directory of the current script
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -19,7 +23,7 @@ def index():
     return jsonify({
         "status": "running", 
         "message": "KavachEye AI Model Service (Vercel)",
-        "endpoints": ["/predict", "/status", "/health"]
+        "endpoints": ["/predict", "/predict/metrics", "/status", "/health"]
     })
 
 @app.route('/test')
@@ -45,6 +49,10 @@ def handle_preflight():
     response.headers.add('Access-Control-Allow-Credentials', 'true')
     return response
 
+# Near-duplicate frames from the same stream reuse the cached results
+# (per warm instance on Vercel)
+predict_cache = FrameResultCache.from_env()
+
 @app.route('/predict', methods=['POST'])
 def predict():
     """Handle AI prediction requests from frontend"""
@@ -54,15 +62,34 @@ def predict():
         if not data or 'image' not in data:
             return jsonify({'error': 'No image data provided'}), 400
         
-        # Process frame with simulated AI models
-        results = process_frame_with_simulated_ai()
+        # Decode the frame for the perceptual hash. Bodies that do not decode as an
+        # image were always accepted here, so they are analyzed without the cache
+        frame = None
+        try:
+            image_data = data['image'].split(',')[1] if ',' in data['image'] else data['image']
+            frame = cv2.imdecode(np.frombuffer(base64.b64decode(image_data), np.uint8), cv2.IMREAD_COLOR)
+        except Exception as decode_error:
+            print(f"Predict frame not decodable, skipping cache: {decode_error}")
+        
+        stream_id = data.get('stream_id', 'default')
+        frame_hash = predict_cache.frame_hash(frame) if frame is not None else None
+        results, distance, _ = predict_cache.lookup(stream_id, frame_hash) if frame_hash is not None else (None, None, 0.0)
+        cache_hit = results is not None
+        if not cache_hit:
+            # Process frame with simulated AI models
+            start = time.time()
+            results = process_frame_with_simulated_ai()
+            if frame_hash is not None:
+                predict_cache.store(stream_id, frame_hash, results, (time.time() - start) * 1000)
         
         # Return results in expected format
         response = jsonify({
             'status': 'success', 
             'results': results,
+            'cached': cache_hit,
             'timestamp': time.time()
         })
+        response.headers.update(predict_cache.headers(cache_hit, distance))
         
         # Add CORS headers
         response.headers.add('Access-Control-Allow-Origin', '*')
@@ -75,6 +102,11 @@ def predict():
         print(f"Error in predict endpoint: {e}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/predict/metrics')
+def predict_metrics():
+    """Hit rate and saved inference time of the /predict result cache"""
+    return jsonify({'status': 'success', 'cache': predict_cache.stats()})
+
 def process_frame_with_simulated_ai():
     """Process frame with simulated AI models for Vercel deployment"""
     results = {
@@ -5,8 +5,8 @@ import numpy as np
 import tensorflow as tf
 from tensorflow.keras.models import load_model
 from keras.layers import DepthwiseConv2D
-from keras.preprocessing.image import img_to_array
 from ultralytics import YOLO
+from face_batch import extract_faces, classify_faces
 import base64
 import time
 from keras.layers import DepthwiseConv2D
@@ -57,20 +57,12 @@ violence_count = 0
 ratio=0.0
 start_time = time.time()
 
-# Function to preprocess face for gender detection
-def preprocess_face(face, img_size=(150, 150)):
-    face = cv2.resize(face, img_size)
-    face = face.astype('float32') / 255.0
-    face = np.expand_dims(face, axis=0)
-    return face
-
 # Function to handle gender, emotion, and violence detection
 def detect_face(frame):
     
     global male_count, female_count, frame_count, violence_count, start_time
     global ratio
     
-    h, w = frame.shape[:2]
     blob = cv2.dnn.blobFromImage(cv2.resize(frame, (300, 300)), 1.0, (300, 300), (104.0, 177.0, 123.0))
     face_net.setInput(blob)
     detections = face_net.forward()
@@ -78,53 +70,32 @@ def detect_face(frame):
     frame_male_count = 0
     frame_female_count = 0
     
-    for i in range(detections.shape[2]):
-        confidence = detections[0, 0, i, 2]
-        if confidence > 0.5:
-            box = detections[0, 0, i, 3:7] * np.array([w, h, w, h])
-            (startX, startY, endX, endY) = box.astype("int")
-            face = frame[startY:endY, startX:endX]
-            
-            # Gender detection
-            face_preprocessed = preprocess_face(face)
-            gender_prediction = gender_model.predict(face_preprocessed)
-            predicted_gender_prob = gender_prediction[0][0]
-            
-            if predicted_gender_prob > (1 - confidence_threshold):
-                gender = 'Female'
-                frame_female_count += 1
-            elif predicted_gender_prob < confidence_threshold:
-                gender = 'Male'
-                frame_male_count += 1
-            else:
-                gender = neutral_label
-            
-            # Emotion detection
-            roi_gray = cv2.cvtColor(face, cv2.COLOR_BGR2GRAY)
-            roi_gray = cv2.resize(roi_gray, (48, 48))
-            roi_gray = roi_gray.astype('float') / 255.0
-            roi_gray = img_to_array(roi_gray)
-            roi_gray = np.expand_dims(roi_gray, axis=0)
-            emotion_prediction = emotion_model.predict(roi_gray)
-            max_index = np.argmax(emotion_prediction[0])
-            emotion = emotions[max_index]
-            
-            # Violence detection
-            image_resized = cv2.resize(frame, (224, 224), interpolation=cv2.INTER_AREA)
-            image_array = np.asarray(image_resized, dtype=np.float32).reshape(1, 224, 224, 3)
-            image_array = (image_array / 127.5) - 1
-            violence_prediction = violence_model.predict(image_array)
-            violence_index = np.argmax(violence_prediction)
-            violence_class = violence_labels[violence_index].strip()[2:]
-            
-            if violence_class == 'violence':
-                violence_count += 1
-                print(f"Class: {violence_class} | Confidence Score: {str(np.round(violence_prediction[0][violence_index] * 100))[:-2]}%, Count: {violence_count}")
-            
-            # Draw bounding box and labels
-            cv2.rectangle(frame, (startX, startY), (endX, endY), (0, 255, 0), 2)
-            # cv2.putText(frame, f"{gender}, {emotion}, {violence_class}", (startX, startY - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (36, 255, 12), 2)
-            cv2.putText(frame, f"{gender}, {emotion}", (startX, startY - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (36, 255, 12), 2)
+    # Gender and emotion detection, batched over every face in the frame
+    boxes, faces = extract_faces(frame, detections)
+    genders, face_emotions = classify_faces(faces, gender_model, emotion_model, confidence_threshold, emotions)
+    
+    for (startX, startY, endX, endY), gender, emotion in zip(boxes, genders, face_emotions):
+        if gender == 'Female':
+            frame_female_count += 1
+        elif gender == 'Male':
+            frame_male_count += 1
+        
+        # Violence detection
+        image_resized = cv2.resize(frame, (224, 224), interpolation=cv2.INTER_AREA)
+        image_array = np.asarray(image_resized, dtype=np.float32).reshape(1, 224, 224, 3)
+        image_array = (image_array / 127.5) - 1
+        violence_prediction = violence_model.predict(image_array)
+        violence_index = np.argmax(violence_prediction)
+        violence_class = violence_labels[violence_index].strip()[2:]
+        
+        if violence_class == 'violence':
+            violence_count += 1
+            print(f"Class: {violence_class} | Confidence Score: {str(np.round(violence_prediction[0][violence_index] * 100))[:-2]}%, Count: {violence_count}")
+        
+        # Draw bounding box and labels
+        cv2.rectangle(frame, (startX, startY), (endX, endY), (0, 255, 0), 2)
+        # cv2.putText(frame, f"{gender}, {emotion}, {violence_class}", (startX, startY - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (36, 255, 12), 2)
+        cv2.putText(frame, f"{gender}, {emotion}", (startX, startY - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (36, 255, 12), 2)
     
     
     male_count += frame_male_count
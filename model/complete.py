@@ -4,16 +4,25 @@ from flask_cors import CORS
 import time
 import cv2
 import numpy as np
-import tensorflow as tf
-from tensorflow.keras.preprocessing.image import img_to_array
-from tensorflow.keras.models import load_model
-from keras.layers import DepthwiseConv2D
-from ultralytics import YOLO
 from twilio.rest import Client
 import base64
 import threading
 # Import show.py methods
 from show import run_show
+from face_tracker import FaceTracker, PeopleCounter
+from pose_faces import pose_face_boxes, merge_fallback_boxes
+from violence_stage import ViolenceStage
+from frame_pipeline import FramePipeline
+from motion_gate import MotionGate
+from frame_context import FrameContext, BufferPool
+from sos_scheduler import SOSScheduler
+# Models, face tracking and the headless analyze_frame live in frame_analyzer.py
+# so that analysis worker processes can import them without this app's side effects
+from frame_analyzer import (
+    violence_model, pose_model, violence_labels, violence_settings, face_source, pose_keypoint_confidence,
+    face_refresh_frames, detect_face_boxes, track_faces, batch_inference,
+    analysis_violence_model, analysis_pose_model, camera_states, get_camera_state, analyze_frame
+)
 
 # Twilio credentials
 import os
@@ -71,153 +80,79 @@ def make_sos_call(authority_number, twiml_url):
     except Exception as e:
         print(f"Error making call: {str(e)}")
 
-def start_sos_sequence(authority_number, message, twiml_url):
-    alert_count = 0
-    max_alerts = 15
-    call_after_alerts = 2
-    while alert_count < max_alerts:
-        send_sos_alert(authority_number, message)
-        alert_count += 1
-        if alert_count == call_after_alerts:
-            make_sos_call(authority_number, twiml_url)
-        if alert_count < max_alerts:
-            time.sleep(30)
-
-# Load model with custom objects
-class CustomDepthwiseConv2D(DepthwiseConv2D):
-    def __init__(self, *args, **kwargs):
-        if 'groups' in kwargs:
-            kwargs.pop('groups')
-        super(CustomDepthwiseConv2D, self).__init__(*args, **kwargs)
-
-# Get the directory of the current script
-import os
-current_dir = os.path.dirname(os.path.abspath(__file__))
-
-# Load models for gender, emotion, and violence detection with correct paths
-gender_model = load_model(os.path.join(current_dir, 'gender_model_best.h5'))
-emotion_model = load_model(os.path.join(current_dir, 'emotion_model.h5'))
-violence_model = load_model(os.path.join(current_dir, "violence.h5"), custom_objects={'DepthwiseConv2D': CustomDepthwiseConv2D}, compile=False)
-pose_model = YOLO(os.path.join(current_dir, "yolov8n-pose.pt"))
-
-# Define labels and confidence threshold for gender detection
-gender_labels = ['Male', 'Female']
-confidence_threshold = 0.6
+# All SOS sequences (up to 15 SMS 30 s apart, a call after the second) run on
+# one scheduler thread, deduplicated per contact and incident
+sos_scheduler = SOSScheduler(send_sos_alert, make_sos_call, max_alerts=15, call_after_alerts=2, interval=30)
 
-# Load SSD model files for face detection
-ssd_prototxt = os.path.join(current_dir, 'deploy.prototxt.txt')
-ssd_weights = os.path.join(current_dir, 'res10_300x300_ssd_iter_140000.caffemodel')
-face_net = cv2.dnn.readNetFromCaffe(ssd_prototxt, ssd_weights)
+# Frame-level violence stage of the live feed (settings from VIOLENCE_* in frame_analyzer.py)
+violence_stage = ViolenceStage(violence_model, violence_labels, **violence_settings)
 
-# Emotion labels
-emotions = ["positive", "negative", "neutral"]
+# Face tracks of the live feed, re-classified every FACE_REFRESH_FRAMES frames
+face_tracker = FaceTracker(refresh_interval=face_refresh_frames)
 
-# Violence detection labels
-violence_labels = open(os.path.join(current_dir, "labels_violence.txt"), "r").readlines()
+# Model stages are skipped while the scene is static (enable with MOTION_GATE=1)
+motion_gate = MotionGate.from_env()
 
-# Initialize webcam
-cap = cv2.VideoCapture(0)
+# Camera source: webcam index or stream URL (opened by the pipeline's capture stage)
+camera_source = os.getenv('CAMERA_SOURCE', '0')
+camera_source = int(camera_source) if camera_source.isdigit() else camera_source
 
-# Global counters for male, female, frames, and violence detection
-male_count = 0
-female_count = 0
-frame_count = 0
+# People seen in the last PEOPLE_WINDOW_SECONDS, one per face track (confirmed
+# after PEOPLE_MIN_HITS frames), and the violence counter
+people_counter = PeopleCounter(window=float(os.getenv('PEOPLE_WINDOW_SECONDS', '60')),
+                               min_hits=int(os.getenv('PEOPLE_MIN_HITS', '3')))
 violence_count = 0
 ratio = 0.0
-start_time = time.time()
-
-# Function to preprocess face for gender detection
-def preprocess_face(face, img_size=(150, 150)):
-    face = cv2.resize(face, img_size)
-    face = face.astype('float32') / 255.0
-    face = np.expand_dims(face, axis=0)
-    return face
-
-# Function to handle gender, emotion, and violence detection
-def detect_face(frame):
-    global male_count, female_count, frame_count, violence_count, start_time
+
+# Function to handle gender and emotion detection (SSD boxes unless boxes are given)
+def detect_face(frame, boxes=None, context=None):
     global ratio
     
-    h, w = frame.shape[:2]
-    blob = cv2.dnn.blobFromImage(cv2.resize(frame, (300, 300)), 1.0, (300, 300), (104.0, 177.0, 123.0))
-    face_net.setInput(blob)
-    detections = face_net.forward()
+    if boxes is None:
+        boxes = detect_face_boxes(frame, context)
     
-    frame_male_count = 0
-    frame_female_count = 0
+    # Count people as tracks with their smoothed gender, not per-frame detections
+    tracks, genders, face_emotions = track_faces(frame, boxes, face_tracker, context)
+    people_counter.update(tracks, genders)
     
-    for i in range(detections.shape[2]):
-        confidence = detections[0, 0, i, 2]
-        if confidence > 0.5:
-            box = detections[0, 0, i, 3:7] * np.array([w, h, w, h])
-            (startX, startY, endX, endY) = box.astype("int")
-            face = frame[startY:endY, startX:endX]
-            
-            # Gender detection
-            face_preprocessed = preprocess_face(face)
-            gender_prediction = gender_model.predict(face_preprocessed)
-            predicted_gender_prob = gender_prediction[0][0]
-            
-            if predicted_gender_prob > (1 - confidence_threshold):
-                gender = 'Female'
-                frame_female_count += 1
-            elif predicted_gender_prob < confidence_threshold:
-                gender = 'Male'
-                frame_male_count += 1
-            else:
-                gender = 'Neutral'
-            
-            # Emotion detection
-            roi_gray = cv2.cvtColor(face, cv2.COLOR_BGR2GRAY)
-            roi_gray = cv2.resize(roi_gray, (48, 48))
-            roi_gray = roi_gray.astype('float') / 255.0
-            roi_gray = img_to_array(roi_gray)
-            roi_gray = np.expand_dims(roi_gray, axis=0)
-            emotion_prediction = emotion_model.predict(roi_gray)
-            max_index = np.argmax(emotion_prediction[0])
-            emotion = emotions[max_index]
-            
-            # Violence detection
-            image_resized = cv2.resize(frame, (224, 224), interpolation=cv2.INTER_AREA)
-            image_array = np.asarray(image_resized, dtype=np.float32).reshape(1, 224, 224, 3)
-            image_array = (image_array / 127.5) - 1
-            violence_prediction = violence_model.predict(image_array)
-            violence_index = np.argmax(violence_prediction)
-            violence_class = violence_labels[violence_index].strip()[2:]
-            
-            if violence_class == 'violence':
-                violence_count += 1
-                print(f"Class: {violence_class} | Confidence Score: {str(np.round(violence_prediction[0][violence_index] * 100))[:-2]}%, Count: {violence_count}")
-            
-            # Draw bounding box and labels
-            cv2.rectangle(frame, (startX, startY), (endX, endY), (0, 255, 0), 2)
-            cv2.putText(frame, f"{gender}, {emotion}", (startX, startY - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (36, 255, 12), 2)
+    for track, gender, emotion in zip(tracks, genders, face_emotions):
+        # Draw bounding box and labels
+        (startX, startY, endX, endY) = track.box
+        cv2.rectangle(frame, (startX, startY), (endX, endY), (0, 255, 0), 2)
+        cv2.putText(frame, f"#{track.id} {gender}, {emotion}", (startX, startY - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (36, 255, 12), 2)
     
-    male_count += frame_male_count
-    female_count += frame_female_count
-    frame_count += 1
-    
-    current_time = time.time()
-    if current_time - start_time >= 1:
-        avg_male = male_count / frame_count
-        avg_female = female_count / frame_count
-        if avg_female > 0:
-            ratio = avg_male / avg_female
-        else:
-            ratio = 0
-        male_count = 0
-        female_count = 0
-        frame_count = 0
-        start_time = current_time
+    counts = people_counter.counts()
+    ratio = counts['Male'] / counts['Female'] if counts['Female'] > 0 else 0
     
     return frame
 
+# Function to handle violence detection, once per frame regardless of face count
+def detect_violence(frame, context=None):
+    global violence_count
+    result = violence_stage.update(frame, context)
+    # Every frame spent in the smoothed "violent" state counts towards the SOS threshold
+    if result['violent']:
+        violence_count += 1
+        if result['evaluated']:
+            print(f"Class: violence | Smoothed Score: {result['score'] * 100:.0f}%, Count: {violence_count}")
+    return result
+
 # Function to handle pose detection using YOLO
 def detect_pose(frame):
     results = pose_model(frame)
     plotted_frame = results[0].plot()
     return plotted_frame
 
+# Function to handle pose detection with face boxes derived from the pose keypoints;
+# the SSD face detector only runs when some person's head keypoints are low-confidence
+def detect_pose_and_face(frame, context=None):
+    results = pose_model(frame)
+    boxes, needs_fallback = pose_face_boxes(results[0], pose_keypoint_confidence)
+    if needs_fallback:
+        boxes = merge_fallback_boxes(boxes, detect_face_boxes(frame, context))
+    frame = detect_face(frame, boxes, context)
+    return results[0].plot(img=frame)
+
 # Women Safety Prediction Function
 def predict_women_safety(location, time):
     """
@@ -325,32 +260,53 @@ def get_safety_recommendations(safety_level, hour, location):
     
     return recommendations
 
-# Generate frames for streaming
-def generate_frames():
+# Violence incidents are tracked per camera source
+sos_incident = f"violence:{camera_source}"
+
+# Check the violence counter and trigger the SOS sequence once it crosses the threshold
+def check_violence_threshold():
     global violence_count
-    while True:
-        success, frame = cap.read()
-        if not success:
-            break
-        
-        frame = detect_face(frame)
+    if violence_count > 25:
+        print("Threshold for violence crossed")
+        # Trigger SOS sequence
+        if emergency_contact:
+            # Re-triggers while this camera's incident is still escalating are merged into it
+            sequence, started = sos_scheduler.start(emergency_contact, sos_incident, 'EMERGENCY ALERT: Violence detected in surveillance feed. Please respond immediately.', 'http://demo.twilio.com/docs/voice.xml')
+            if not started:
+                print(f"SOS sequence already running for {sos_incident} ({sequence.alerts_sent} alerts sent)")
+        else:
+            print("WARNING: No emergency contact number provided. Cannot send SOS alert.")
+        violence_count = 0
+
+# Run every detection stage on one frame (inference stage of the pipeline).
+# The frame context builds each resized input once and reuses preallocated buffers
+def process_frame(frame):
+    if not motion_gate.check(frame):
+        return frame
+    context = FrameContext(frame, buffer_pool)
+    detect_violence(frame, context)
+    if face_source == 'pose':
+        frame = detect_pose_and_face(frame, context)
+    else:
+        frame = detect_face(frame, context=context)
         frame = detect_pose(frame)
-        
-        ret, buffer = cv2.imencode('.jpg', frame)
-        frame = buffer.tobytes()
-        
+    check_violence_threshold()
+    return frame
+
+# Preprocessing buffers reused across frames by the (single) inference stage
+buffer_pool = BufferPool()
+
+# Capture, inference and JPEG encoding run as separate pipeline stages
+pipeline = FramePipeline(camera_source, process_frame)
+
+# Generate frames for streaming; every MJPEG viewer moves along the encoding
+# ladder (full / half-res / low quality) to match its connection
+def generate_frames():
+    pipeline.start()
+    for frame in pipeline.frames(adaptive=True):
         yield (b'--frame\r\n'
                b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
 
-        if violence_count > 25:
-            print("Threshold for violence crossed")
-            # Trigger SOS sequence
-            if emergency_contact:
-                threading.Thread(target=start_sos_sequence, args=(emergency_contact, 'EMERGENCY ALERT: Violence detected in surveillance feed. Please respond immediately.', 'http://demo.twilio.com/docs/voice.xml')).start()
-            else:
-                print("WARNING: No emergency contact number provided. Cannot send SOS alert.")
-            violence_count = 0
-
 # Flask routes
 @app.route('/')
 def index():
@@ -362,16 +318,11 @@ def video_feed():
 
 @app.route('/get_averages')
 def get_averages():
-    global male_count, female_count, frame_count, ratio
-    if frame_count > 0:
-        avg_male = male_count / frame_count
-        avg_female = female_count / frame_count
-        if avg_female > 0:
-            ratio = avg_male / avg_female
-        else:
-            ratio = 0
-    else:
-        avg_male = avg_female = 0
+    global ratio
+    # Distinct people (face tracks) seen in the last PEOPLE_WINDOW_SECONDS
+    counts = people_counter.counts()
+    avg_male, avg_female = counts['Male'], counts['Female']
+    ratio = avg_male / avg_female if avg_female > 0 else 0
     return jsonify({'avg_male': avg_male, 'avg_female': avg_female, 'ratio': ratio})
 
 @app.route('/predict', methods=['POST'])
@@ -406,9 +357,58 @@ def predict_safety():
     except Exception as e:
         return jsonify({"error": f"Prediction failed: {str(e)}"}), 500
 
+@app.route('/pipeline_stats')
+def pipeline_stats():
+    return jsonify(pipeline.stats())
+
+@app.route('/batch_stats')
+def batch_stats():
+    if not batch_inference:
+        return jsonify({'enabled': False})
+    return jsonify({
+        'enabled': True,
+        'violence': analysis_violence_model.stats(),
+        'pose': analysis_pose_model.stats()
+    })
+
+@app.route('/sos_status')
+def sos_status():
+    return jsonify(sos_scheduler.state())
+
+@app.route('/sos/resolve', methods=['POST'])
+def resolve_sos():
+    # Cancels the remaining steps of the incident's sequences (all contacts unless one is given)
+    data = request.get_json(silent=True) or {}
+    cancelled = sos_scheduler.cancel(incident=data.get('incident', sos_incident), contact=data.get('contact'))
+    return jsonify({'cancelled': cancelled})
+
+@app.route('/gate_stats')
+def gate_stats():
+    return jsonify(motion_gate.stats())
+
+# Socket.IO viewers share a single emitter task: the frame is base64-encoded once
+# and broadcast to every connected client, regardless of how many are connected
+frame_emitter_running = False
+frame_emitter_lock = threading.Lock()
+
+def emit_frames():
+    global frame_emitter_running
+    try:
+        for frame in pipeline.frames():
+            socketio.emit('video_frame', {'frame': base64.b64encode(frame).decode('utf-8')})
+    finally:
+        with frame_emitter_lock:
+            frame_emitter_running = False
+
 @socketio.on('connect')
 def handle_connect():
-    socketio.start_background_task(generate_frames)
+    global frame_emitter_running
+    pipeline.start()
+    with frame_emitter_lock:
+        start_emitter = not frame_emitter_running
+        frame_emitter_running = True
+    if start_emitter:
+        socketio.start_background_task(emit_frames)
     # Start the clustering and mapping task
     socketio.start_background_task(run_show)
 
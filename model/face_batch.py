@@ -0,0 +1,92 @@
+import cv2
+import numpy as np
+
+# Batched face analysis helpers shared by complete.py and combined_html.py.
+# Instead of calling the gender and emotion models once per face, all accepted
+# SSD crops of a frame are stacked into one tensor per model and classified in
+# a single call.
+
+def crop_faces(frame, boxes):
+    """Clip (startX, startY, endX, endY) boxes to the frame; returns (boxes, faces) for non-empty crops"""
+    h, w = frame.shape[:2]
+    kept_boxes = []
+    faces = []
+    for (startX, startY, endX, endY) in boxes:
+        # Clip to the frame so partially visible faces do not produce
+        # empty (or wrapped-around) slices
+        startX, startY = max(0, int(startX)), max(0, int(startY))
+        endX, endY = min(w, int(endX)), min(h, int(endY))
+        face = frame[startY:endY, startX:endX]
+        if face.size == 0:
+            continue
+        kept_boxes.append((startX, startY, endX, endY))
+        faces.append(face)
+    return kept_boxes, faces
+
+def ssd_boxes(frame, detections, min_confidence=0.5):
+    """Pixel boxes for every SSD detection above min_confidence"""
+    h, w = frame.shape[:2]
+    boxes = []
+    for i in range(detections.shape[2]):
+        confidence = detections[0, 0, i, 2]
+        if confidence > min_confidence:
+            box = detections[0, 0, i, 3:7] * np.array([w, h, w, h])
+            boxes.append(tuple(box.astype("int")))
+    return boxes
+
+def extract_faces(frame, detections, min_confidence=0.5):
+    """Return (boxes, faces) for every SSD detection above min_confidence"""
+    return crop_faces(frame, ssd_boxes(frame, detections, min_confidence))
+
+def preprocess_gender_batch(faces, img_size=(150, 150)):
+    """Stack face crops into one (N, 150, 150, 3) float32 tensor scaled to [0, 1]"""
+    batch = np.empty((len(faces), img_size[1], img_size[0], 3), dtype=np.float32)
+    for i, face in enumerate(faces):
+        batch[i] = cv2.resize(face, img_size)
+    batch /= 255.0
+    return batch
+
+def preprocess_emotion_batch(faces, img_size=(48, 48)):
+    """Stack face crops into one (N, 48, 48, 1) grayscale float32 tensor scaled to [0, 1]"""
+    batch = np.empty((len(faces), img_size[1], img_size[0], 1), dtype=np.float32)
+    for i, face in enumerate(faces):
+        roi_gray = cv2.cvtColor(face, cv2.COLOR_BGR2GRAY)
+        batch[i, :, :, 0] = cv2.resize(roi_gray, img_size)
+    batch /= 255.0
+    return batch
+
+def decode_genders(gender_probs, confidence_threshold):
+    """Map female probabilities to 'Female' / 'Male' / 'Neutral' labels"""
+    genders = []
+    for predicted_gender_prob in gender_probs:
+        if predicted_gender_prob > (1 - confidence_threshold):
+            genders.append('Female')
+        elif predicted_gender_prob < confidence_threshold:
+            genders.append('Male')
+        else:
+            genders.append('Neutral')
+    return genders
+
+def decode_emotions(emotion_probs, emotion_labels):
+    """Map emotion model outputs to their labels"""
+    return [emotion_labels[i] for i in np.argmax(emotion_probs, axis=1)]
+
+def predict_face_probs(faces, gender_model, emotion_model, context=None):
+    """Female probability (N,) and emotion probabilities (N, K) with one call per model"""
+    if context is not None:
+        # Reuse the frame context's preallocated buffers
+        gender_input, emotion_input = context.gender_batch(faces), context.emotion_batch(faces)
+    else:
+        gender_input, emotion_input = preprocess_gender_batch(faces), preprocess_emotion_batch(faces)
+    # verbose=0 keeps plain Keras models (combined_html.py) from printing a
+    # progress bar per frame; ModelRunner accepts and ignores it
+    gender_prediction = gender_model.predict(gender_input, verbose=0)
+    emotion_prediction = emotion_model.predict(emotion_input, verbose=0)
+    return gender_prediction[:, 0], emotion_prediction
+
+def classify_faces(faces, gender_model, emotion_model, confidence_threshold, emotion_labels):
+    """Run gender and emotion classification for all faces with one call per model"""
+    if not faces:
+        return [], []
+    gender_probs, emotion_probs = predict_face_probs(faces, gender_model, emotion_model)
+    return decode_genders(gender_probs, confidence_threshold), decode_emotions(emotion_probs, emotion_labels)
@@ -0,0 +1,143 @@
+import time
+import numpy as np
+
+# Lightweight face tracker over the SSD boxes.
+# Each face gets a track id and a cached, smoothed gender/emotion result, so the
+# classifiers only run for new tracks, every `refresh_interval` frames, or when
+# a noticeably larger (better) crop of the face shows up.
+
+def iou_matrix(boxes_a, boxes_b):
+    """Pairwise IoU between (N, 4) and (M, 4) arrays of (startX, startY, endX, endY)"""
+    a = np.asarray(boxes_a, dtype=np.float32).reshape(-1, 4)[:, np.newaxis]
+    b = np.asarray(boxes_b, dtype=np.float32).reshape(-1, 4)[np.newaxis]
+    inter_w = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    inter_h = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    inter = inter_w * inter_h
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    return inter / np.maximum(area_a + area_b - inter, 1e-6)
+
+def box_area(box):
+    return max(0, box[2] - box[0]) * max(0, box[3] - box[1])
+
+class FaceTrack:
+    def __init__(self, track_id, box):
+        self.id = track_id
+        self.box = box
+        self.missed = 0
+        self.hits = 1
+        self.classified_at = None
+        self.best_area = 0
+        self.gender_prob = None
+        self.emotion_probs = None
+
+class FaceTracker:
+    def __init__(self, iou_threshold=0.3, max_missed=10, refresh_interval=15, quality_gain=1.3, alpha=0.5):
+        self.iou_threshold = iou_threshold
+        self.max_missed = max_missed
+        self.refresh_interval = refresh_interval
+        self.quality_gain = quality_gain
+        self.alpha = alpha
+        self.tracks = []
+        self.next_id = 1
+        self.frame_index = 0
+
+    def update(self, boxes):
+        """Match this frame's boxes to tracks; returns one track per box, in order"""
+        self.frame_index += 1
+        matched = [None] * len(boxes)
+        free_tracks = set(range(len(self.tracks)))
+
+        if boxes and self.tracks:
+            ious = iou_matrix(boxes, [track.box for track in self.tracks])
+            # Greedy assignment, highest overlap first
+            for flat in np.argsort(-ious, axis=None):
+                box_index, track_index = np.unravel_index(flat, ious.shape)
+                if ious[box_index, track_index] < self.iou_threshold:
+                    break
+                if matched[box_index] is None and track_index in free_tracks:
+                    matched[box_index] = self.tracks[track_index]
+                    free_tracks.discard(track_index)
+
+            # Centroid fallback for fast motion: an unmatched box adopts the nearest
+            # free track whose centre is within half a face width
+            for box_index, box in enumerate(boxes):
+                if matched[box_index] is not None or not free_tracks:
+                    continue
+                centre = np.array([(box[0] + box[2]) / 2, (box[1] + box[3]) / 2])
+                nearest = min(free_tracks, key=lambda t: np.linalg.norm(centre - self._centre(self.tracks[t])))
+                if np.linalg.norm(centre - self._centre(self.tracks[nearest])) < (box[2] - box[0]) / 2:
+                    matched[box_index] = self.tracks[nearest]
+                    free_tracks.discard(nearest)
+
+        for box_index, box in enumerate(boxes):
+            track = matched[box_index]
+            if track is None:
+                track = FaceTrack(self.next_id, box)
+                self.next_id += 1
+                self.tracks.append(track)
+                matched[box_index] = track
+            else:
+                track.box = box
+                track.hits += 1
+                track.missed = 0
+
+        for track_index in free_tracks:
+            self.tracks[track_index].missed += 1
+        self.tracks = [track for track in self.tracks if track.missed <= self.max_missed]
+        return matched
+
+    @staticmethod
+    def _centre(track):
+        box = track.box
+        return np.array([(box[0] + box[2]) / 2, (box[1] + box[3]) / 2])
+
+    def needs_classification(self, track):
+        """New track, stale cached result, or a clearly better (larger) crop"""
+        if track.classified_at is None:
+            return True
+        if self.frame_index - track.classified_at >= self.refresh_interval:
+            return True
+        return box_area(track.box) >= track.best_area * self.quality_gain
+
+    def record(self, track, gender_prob, emotion_probs):
+        """Store a classifier result on the track, smoothed with an EMA"""
+        emotion_probs = np.asarray(emotion_probs, dtype=np.float32)
+        if track.gender_prob is None:
+            track.gender_prob = float(gender_prob)
+            track.emotion_probs = emotion_probs
+        else:
+            track.gender_prob = self.alpha * float(gender_prob) + (1 - self.alpha) * track.gender_prob
+            track.emotion_probs = self.alpha * emotion_probs + (1 - self.alpha) * track.emotion_probs
+        track.classified_at = self.frame_index
+        track.best_area = max(track.best_area, box_area(track.box))
+
+    def stats(self):
+        return {'active_tracks': len(self.tracks), 'next_track_id': self.next_id, 'frame_index': self.frame_index}
+
+class PeopleCounter:
+    """
+    Distinct people by gender: each face track counts once, however many frames
+    it stays in view, once it has been matched `min_hits` times (so one-frame
+    false detections are not counted). A track is forgotten `window` seconds
+    after it was last seen.
+    """
+    def __init__(self, window=60.0, min_hits=3):
+        self.window = window
+        self.min_hits = min_hits
+        self.seen = {}
+
+    def update(self, tracks, genders, now=None):
+        now = time.time() if now is None else now
+        for track, gender in zip(tracks, genders):
+            if track.hits >= self.min_hits and gender in ('Male', 'Female'):
+                # The latest smoothed label wins if a track's gender settles later
+                self.seen[track.id] = (gender, now)
+
+    def counts(self, now=None):
+        now = time.time() if now is None else now
+        for track_id, (_, last_seen) in list(self.seen.items()):
+            if now - last_seen > self.window:
+                del self.seen[track_id]
+        genders = [gender for gender, _ in self.seen.values()]
+        return {'Male': genders.count('Male'), 'Female': genders.count('Female')}
@@ -0,0 +1,165 @@
+import os
+import threading
+import cv2
+from ultralytics import YOLO
+from dotenv import load_dotenv
+from face_batch import ssd_boxes, crop_faces, predict_face_probs, decode_genders, decode_emotions
+from face_tracker import FaceTracker
+from pose_faces import pose_face_boxes, merge_fallback_boxes
+from violence_stage import ViolenceStage
+from model_runner import get_runner
+from motion_gate import MotionGate
+from frame_context import FrameContext, BufferPool
+from batch_inference import BatchedModel, BatchedPose
+
+# Models and headless per-frame analysis shared by complete.py and the offline /
+# multi-camera workers (camera_scheduler.py, analyze_footage.py). Importing this
+# module only loads the models: no Flask app, no Twilio client and no SOS
+# scheduler thread, so every spawned worker process stays lightweight.
+
+load_dotenv()
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Load models for gender, emotion, and violence detection behind warm, shape-fixed runners
+# (backend per model selectable with KAVACH_BACKEND_<NAME>, see model_runner.py)
+gender_model = get_runner('gender_best')
+emotion_model = get_runner('emotion')
+violence_model = get_runner('violence')
+pose_model = YOLO(os.path.join(current_dir, "yolov8n-pose.pt"))
+
+# Define labels and confidence threshold for gender detection
+gender_labels = ['Male', 'Female']
+confidence_threshold = 0.6
+
+# Load SSD model files for face detection
+ssd_prototxt = os.path.join(current_dir, 'deploy.prototxt.txt')
+ssd_weights = os.path.join(current_dir, 'res10_300x300_ssd_iter_140000.caffemodel')
+face_net = cv2.dnn.readNetFromCaffe(ssd_prototxt, ssd_weights)
+# cv2.dnn.Net is not thread-safe; cameras analyzed in parallel threads share it
+face_net_lock = threading.Lock()
+
+# Emotion labels
+emotions = ["positive", "negative", "neutral"]
+
+# Violence detection labels
+violence_labels = open(os.path.join(current_dir, "labels_violence.txt"), "r").readlines()
+
+# Frame-level violence stage settings: runs once every VIOLENCE_STRIDE frames and
+# smooths the scores with an EMA plus an on/off hysteresis band
+violence_settings = dict(
+    stride=int(os.getenv('VIOLENCE_STRIDE', '3')),
+    alpha=float(os.getenv('VIOLENCE_EMA_ALPHA', '0.3')),
+    on_threshold=float(os.getenv('VIOLENCE_ON_THRESHOLD', '0.7')),
+    off_threshold=float(os.getenv('VIOLENCE_OFF_THRESHOLD', '0.4'))
+)
+
+# Face box source: 'ssd' runs the res10 SSD face detector on every frame, 'pose'
+# derives face boxes from the YOLOv8 pose keypoints and uses SSD only as a fallback
+face_source = os.getenv('FACE_SOURCE', 'ssd')
+pose_keypoint_confidence = float(os.getenv('POSE_KEYPOINT_CONFIDENCE', '0.5'))
+
+# Face tracks cache smoothed gender/emotion results; faces are re-classified only
+# when new, every FACE_REFRESH_FRAMES frames, or when a larger crop appears
+face_refresh_frames = int(os.getenv('FACE_REFRESH_FRAMES', '15'))
+
+# Function to run the SSD face detector
+def detect_face_boxes(frame, context=None):
+    if context is not None:
+        blob = context.ssd_blob()
+    else:
+        blob = cv2.dnn.blobFromImage(cv2.resize(frame, (300, 300)), 1.0, (300, 300), (104.0, 177.0, 123.0))
+    with face_net_lock:
+        face_net.setInput(blob)
+        detections = face_net.forward()
+    return ssd_boxes(frame, detections)
+
+# Match face boxes to tracks and classify gender and emotion, batched over the
+# faces whose cached track result is missing, stale or based on a worse crop.
+# Returns the visible tracks with their smoothed gender and emotion labels.
+def track_faces(frame, boxes, tracker, context=None):
+    boxes, faces = crop_faces(frame, boxes)
+    tracks = tracker.update(boxes)
+    pending = [i for i, track in enumerate(tracks) if tracker.needs_classification(track)]
+    if pending:
+        gender_probs, emotion_probs = predict_face_probs([faces[i] for i in pending], gender_model, emotion_model, context)
+        for i, gender_prob, emotion_prob in zip(pending, gender_probs, emotion_probs):
+            tracker.record(tracks[i], gender_prob, emotion_prob)
+    genders = decode_genders([track.gender_prob for track in tracks], confidence_threshold)
+    face_emotions = decode_emotions([track.emotion_probs for track in tracks], emotions) if tracks else []
+    return tracks, genders, face_emotions
+
+# Cross-camera batching for analyze_frame (BATCH_INFERENCE=1): cameras analyzed
+# concurrently in threads of one process share one batched violence call and
+# one batched pose call per window of BATCH_MAX_WAIT_MS milliseconds
+batch_inference = os.getenv('BATCH_INFERENCE', '0') == '1'
+if batch_inference:
+    batch_max_size = int(os.getenv('BATCH_MAX_SIZE', '8'))
+    batch_max_wait_ms = float(os.getenv('BATCH_MAX_WAIT_MS', '20'))
+    analysis_violence_model = BatchedModel(violence_model, batch_max_size, batch_max_wait_ms)
+    analysis_pose_model = BatchedPose(pose_model, batch_max_size, batch_max_wait_ms)
+else:
+    analysis_violence_model = violence_model
+    analysis_pose_model = pose_model
+
+# Per-camera state for analyze_frame. Every camera gets its own violence
+# smoothing, face tracks, motion gate and buffers so that frames from different
+# cameras interleaved in one worker process do not mix. Worker threads of one
+# process create states concurrently, and the scheduler calls forget_camera
+# when a camera is removed so the dict does not keep growing.
+camera_states = {}
+camera_states_lock = threading.Lock()
+
+def get_camera_state(camera_id):
+    with camera_states_lock:
+        state = camera_states.get(camera_id)
+        if state is None:
+            state = camera_states[camera_id] = {
+                'violence': ViolenceStage(analysis_violence_model, violence_labels, **violence_settings),
+                'tracker': FaceTracker(refresh_interval=face_refresh_frames),
+                'gate': MotionGate.from_env(),
+                'pool': BufferPool()
+            }
+        return state
+
+def forget_camera(camera_id):
+    """Drop a removed camera's state"""
+    with camera_states_lock:
+        camera_states.pop(camera_id, None)
+
+# Headless analysis of one frame for the multi-camera scheduler: no drawing, no
+# streaming and no SOS side effects, just the detections as a JSON-friendly dict.
+# `timestamp` (seconds) drives the motion gate; recorded footage passes the
+# frame's video time, live cameras leave it to the wall clock.
+def analyze_frame(frame, camera_id=None, timestamp=None):
+    state = get_camera_state(camera_id)
+    if not state['gate'].check(frame, timestamp):
+        return {'gated': True}
+    context = FrameContext(frame, state['pool'])
+    violence = state['violence'].update(frame, context)
+
+    # Pose runs on every analyzed frame for the people count (and is the call
+    # batched across cameras); FACE_SOURCE only picks where face boxes come from
+    results = analysis_pose_model(frame, verbose=False)
+    people = len(results[0].boxes)
+    if face_source == 'pose':
+        boxes, needs_fallback = pose_face_boxes(results[0], pose_keypoint_confidence)
+        if needs_fallback:
+            boxes = merge_fallback_boxes(boxes, detect_face_boxes(frame, context))
+    else:
+        boxes = detect_face_boxes(frame, context)
+
+    tracks, genders, face_emotions = track_faces(frame, boxes, state['tracker'], context)
+
+    return {
+        'gated': False,
+        'violence_score': round(violence['score'], 4),
+        'violent': violence['violent'],
+        'people': people,
+        'male': genders.count('Male'),
+        'female': genders.count('Female'),
+        'faces': [
+            {'track': track.id, 'box': [int(v) for v in track.box], 'gender': gender, 'emotion': emotion}
+            for track, gender, emotion in zip(tracks, genders, face_emotions)
+        ]
+    }
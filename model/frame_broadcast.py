@@ -0,0 +1,184 @@
+import time
+import itertools
+import threading
+from collections import deque, namedtuple
+import cv2
+
+# Fan-out of encoded frames from one producer to any number of viewers.
+# Every subscriber has its own small drop-oldest buffer, so a slow viewer only
+# loses its own frames and never holds back the producer or other viewers.
+#
+# Frames can be published as EncodedFrame objects carrying a small ladder of
+# JPEG encodings (full, half resolution, low quality). Each rung is encoded at
+# most once per frame and only when some viewer asks for it; a ViewerRate per
+# viewer moves it down the ladder when its connection cannot keep up and back
+# up once it drains quickly again.
+#
+# MJPEG has no client acknowledgements, so a viewer's speed is inferred on the
+# server: from how long each write takes, and from how many frames pile up in
+# its buffer meanwhile. Write time alone is not enough because the kernel's
+# socket buffer accepts the first writes to a slow client immediately; the
+# buffer backlog shows the viewer falling behind the producer regardless.
+
+EncodingLevel = namedtuple('EncodingLevel', ['name', 'scale', 'quality'])
+
+ENCODING_LADDER = [
+    EncodingLevel('full', 1.0, 90),
+    EncodingLevel('half', 0.5, 75),
+    EncodingLevel('low', 0.5, 40)
+]
+
+class EncodedFrame:
+    """One raw frame and its lazily built JPEG encodings, shared by all viewers"""
+    def __init__(self, frame, ladder=ENCODING_LADDER):
+        self.frame = frame
+        self.ladder = ladder
+        self.encodings = {}
+        self.lock = threading.Lock()
+        self.encode_ms = 0.0
+
+    def get(self, level=0):
+        with self.lock:
+            if level not in self.encodings:
+                start = time.time()
+                rung = self.ladder[level]
+                image = self.frame
+                if rung.scale != 1.0:
+                    image = cv2.resize(image, None, fx=rung.scale, fy=rung.scale, interpolation=cv2.INTER_AREA)
+                ret, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, rung.quality])
+                self.encodings[level] = buffer.tobytes() if ret else None
+                self.encode_ms += (time.time() - start) * 1000
+            return self.encodings[level]
+
+class ViewerRate:
+    """
+    Picks a ladder level for one viewer from how long its sends take and how far
+    it lags behind the producer.
+    load = max(send time / frame interval, frames still buffered after the send):
+    above `down_load` (or any dropped frame) the viewer moves one rung down;
+    after `up_frames` consecutive frames below `up_load` it moves one rung back up.
+    """
+    def __init__(self, levels=len(ENCODING_LADDER), level=0, down_load=0.8, up_load=0.3, up_frames=30, alpha=0.2):
+        self.levels = levels
+        self.level = level
+        self.down_load = down_load
+        self.up_load = up_load
+        self.up_frames = up_frames
+        self.alpha = alpha
+        self.load = 0.0
+        self.fast_frames = 0
+        self.bytes_sent = 0
+        self.send_seconds = 0.0
+        self.changes = 0
+
+    def record(self, size, send_seconds, frame_interval, dropped=0, backlog=0):
+        self.bytes_sent += size
+        self.send_seconds += send_seconds
+        load = max(send_seconds / max(frame_interval, 1e-3), backlog)
+        self.load = self.alpha * load + (1 - self.alpha) * self.load
+        if (dropped or self.load > self.down_load) and self.level < self.levels - 1:
+            self._move(1)
+        elif self.load < self.up_load and self.level > 0:
+            self.fast_frames += 1
+            if self.fast_frames >= self.up_frames:
+                self._move(-1)
+        else:
+            self.fast_frames = 0
+        return self.level
+
+    def _move(self, step):
+        self.level += step
+        self.changes += 1
+        self.fast_frames = 0
+        # Start the new rung from a neutral estimate instead of the old rung's history
+        self.load = (self.up_load + self.down_load) / 2
+
+    def throughput_kbps(self):
+        # An upper bound: writes the socket buffer absorbed count as instant
+        return self.bytes_sent * 8 / 1000 / self.send_seconds if self.send_seconds else 0.0
+
+class Subscription:
+    def __init__(self, subscriber_id, buffer_size):
+        self.id = subscriber_id
+        self.buffer = deque(maxlen=buffer_size)
+        self.condition = threading.Condition()
+        self.closed = False
+        self.delivered = 0
+        self.dropped = 0
+        # Ladder level this viewer currently reads (None for raw items)
+        self.level = None
+        self.rate = None
+
+    def push(self, item):
+        with self.condition:
+            if len(self.buffer) == self.buffer.maxlen:
+                self.dropped += 1
+            self.buffer.append(item)
+            self.condition.notify()
+
+    def get(self, timeout=None):
+        """Next buffered item, or None on timeout / once closed"""
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.buffer or self.closed, timeout):
+                return None
+            if not self.buffer:
+                return None
+            self.delivered += 1
+            return self.buffer.popleft()
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+class FrameBroadcaster:
+    def __init__(self, buffer_size=2):
+        self.buffer_size = buffer_size
+        self.subscribers = {}
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1)
+        self.published = 0
+
+    def subscribe(self, buffer_size=None):
+        subscription = Subscription(next(self.ids), buffer_size or self.buffer_size)
+        with self.lock:
+            self.subscribers[subscription.id] = subscription
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            self.subscribers.pop(subscription.id, None)
+        subscription.close()
+
+    def levels_in_use(self):
+        with self.lock:
+            return {s.level for s in self.subscribers.values() if s.level is not None}
+
+    def publish(self, item):
+        with self.lock:
+            subscribers = list(self.subscribers.values())
+            self.published += 1
+        for subscription in subscribers:
+            subscription.push(item)
+
+    def close(self):
+        with self.lock:
+            subscribers = list(self.subscribers.values())
+        for subscription in subscribers:
+            subscription.close()
+
+    def stats(self):
+        with self.lock:
+            subscribers = list(self.subscribers.values())
+        return {
+            'published': self.published,
+            'subscribers': len(subscribers),
+            'per_subscriber': [
+                dict(
+                    {'id': s.id, 'delivered': s.delivered, 'dropped': s.dropped, 'buffered': len(s.buffer)},
+                    **({'level': ENCODING_LADDER[s.level].name, 'throughput_kbps': round(s.rate.throughput_kbps(), 1),
+                        'level_changes': s.rate.changes} if s.rate is not None else {})
+                )
+                for s in subscribers
+            ]
+        }
@@ -0,0 +1,137 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+import cv2
+import numpy as np
+
+# Perceptual-hash cache for per-frame analysis results.
+# Cameras watching a static scene post nearly identical frames over and over.
+# Each decoded frame is reduced to a 64-bit difference hash (or average hash)
+# of a tiny grayscale thumbnail; a frame whose hash is within `max_distance`
+# bits of a fresh cached frame from the same stream reuses that frame's result
+# instead of running inference again. Entries expire after `ttl` seconds so a
+# slowly changing scene is still re-analyzed, and the cache is a bounded LRU.
+#
+# model/frame_cache.py is the source of this module. KavachEye-backend deploys
+# as a separate app that cannot import from model/, so it vendors a copy: edit
+# model/frame_cache.py only, then sync the copy from the repository root with
+#     cp model/frame_cache.py KavachEye-backend/frame_cache.py
+# model/test_frame_cache.py fails while the two files differ.
+
+def dhash(frame, size=8):
+    """Difference hash: sign of the horizontal gradient on a (size+1) x size thumbnail"""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    small = cv2.resize(gray, (size + 1, size), interpolation=cv2.INTER_AREA)
+    bits = small[:, 1:] > small[:, :-1]
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+def ahash(frame, size=8):
+    """Average hash: thumbnail pixels above the thumbnail mean"""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    small = cv2.resize(gray, (size, size), interpolation=cv2.INTER_AREA)
+    bits = small > small.mean()
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+HASHES = {'dhash': dhash, 'ahash': ahash}
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+class FrameResultCache:
+    def __init__(self, max_entries=256, ttl=2.0, max_distance=4, method='dhash', hash_size=8):
+        if method not in HASHES:
+            raise ValueError(f"Unknown hash method: {method}")
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_distance = max_distance
+        self.hash_fn = HASHES[method]
+        self.method = method
+        self.hash_size = hash_size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.saved_ms = 0.0
+        self.hash_ms = 0.0
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            max_entries=int(os.getenv('PREDICT_CACHE_SIZE', '256')),
+            ttl=float(os.getenv('PREDICT_CACHE_TTL', '2.0')),
+            max_distance=int(os.getenv('PREDICT_CACHE_DISTANCE', '4')),
+            method=os.getenv('PREDICT_CACHE_HASH', 'dhash')
+        )
+
+    def frame_hash(self, frame):
+        start = time.time()
+        value = self.hash_fn(frame, self.hash_size)
+        with self.lock:
+            self.hash_ms += (time.time() - start) * 1000
+        return value
+
+    def lookup(self, stream_id, frame_hash):
+        """Return (result, distance, saved_ms) for the closest fresh entry of the stream, or (None, None, 0)"""
+        now = time.time()
+        with self.lock:
+            best_key, best_distance = None, None
+            for key, (result, stored_at, compute_ms) in list(self.entries.items()):
+                if now - stored_at > self.ttl:
+                    del self.entries[key]
+                    continue
+                if key[0] != stream_id:
+                    continue
+                distance = hamming(key[1], frame_hash)
+                if distance <= self.max_distance and (best_distance is None or distance < best_distance):
+                    best_key, best_distance = key, distance
+                    if distance == 0:
+                        break
+            if best_key is None:
+                self.misses += 1
+                return None, None, 0.0
+            self.entries.move_to_end(best_key)
+            result, _, compute_ms = self.entries[best_key]
+            self.hits += 1
+            self.saved_ms += compute_ms
+            return result, best_distance, compute_ms
+
+    def store(self, stream_id, frame_hash, result, compute_ms):
+        # The entry is timestamped when stored and not refreshed by hits, so a
+        # cached result is never served for longer than `ttl`
+        with self.lock:
+            self.entries[(stream_id, frame_hash)] = (result, time.time(), compute_ms)
+            self.entries.move_to_end((stream_id, frame_hash))
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def headers(self, hit, distance=None):
+        """Response headers describing this lookup and the cache totals"""
+        headers = {
+            'X-Cache': 'HIT' if hit else 'MISS',
+            'X-Cache-Hit-Rate': f"{self.hit_rate():.3f}",
+            'X-Cache-Saved-Ms': f"{self.saved_ms:.1f}"
+        }
+        if hit:
+            headers['X-Cache-Distance'] = str(distance)
+        return headers
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'method': self.method,
+                'entries': len(self.entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl,
+                'max_distance': self.max_distance,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hit_rate(), 4),
+                'saved_ms': round(self.saved_ms, 1),
+                'avg_hash_ms': round(self.hash_ms / lookups, 3) if lookups else 0.0
+            }
@@ -0,0 +1,79 @@
+import cv2
+import numpy as np
+
+# Per-frame preprocessing shared by the model stages.
+# Each resized copy of the frame is built at most once per frame, and the
+# normalized model inputs are written into preallocated buffers that are reused
+# from frame to frame instead of allocating new float32 arrays in the hot loop.
+# Tensors handed out are views into those buffers and are only valid until the
+# next frame is processed.
+
+SSD_SIZE = (300, 300)
+SSD_MEAN = (104.0, 177.0, 123.0)
+VIOLENCE_SIZE = (224, 224)
+GENDER_SIZE = (150, 150)
+EMOTION_SIZE = (48, 48)
+
+class BufferPool:
+    """Reusable buffers (float32 unless asked otherwise), grown along the batch axis when needed"""
+    def __init__(self):
+        self.buffers = {}
+
+    def get(self, name, batch, shape, dtype=np.float32):
+        buffer = self.buffers.get(name)
+        if buffer is None or buffer.shape[1:] != shape or buffer.dtype != dtype:
+            buffer = np.empty((batch,) + shape, dtype=dtype)
+        elif buffer.shape[0] < batch:
+            buffer = np.empty((max(batch, 2 * buffer.shape[0]),) + shape, dtype=dtype)
+        self.buffers[name] = buffer
+        return buffer[:batch]
+
+class FrameContext:
+    def __init__(self, frame, pool):
+        self.frame = frame
+        self.pool = pool
+        self.resize_cache = {}
+        self.blob_cache = {}
+
+    def resized(self, size, interpolation=cv2.INTER_LINEAR):
+        """Frame resized to (width, height), computed once per frame"""
+        key = (size, interpolation)
+        if key not in self.resize_cache:
+            self.resize_cache[key] = cv2.resize(self.frame, size, interpolation=interpolation)
+        return self.resize_cache[key]
+
+    def ssd_blob(self):
+        """(1, 3, 300, 300) mean-subtracted blob for the res10 SSD face detector"""
+        if 'ssd' not in self.blob_cache:
+            # The frame is already at the network size, so blobFromImage does not resize again
+            self.blob_cache['ssd'] = cv2.dnn.blobFromImage(self.resized(SSD_SIZE), 1.0, SSD_SIZE, SSD_MEAN)
+        return self.blob_cache['ssd']
+
+    def violence_tensor(self):
+        """(1, 224, 224, 3) frame tensor scaled to [-1, 1]"""
+        if 'violence' not in self.blob_cache:
+            tensor = self.pool.get('violence', 1, VIOLENCE_SIZE[::-1] + (3,))
+            np.multiply(self.resized(VIOLENCE_SIZE, cv2.INTER_AREA), 1 / 127.5, out=tensor[0], casting='unsafe')
+            tensor -= 1
+            self.blob_cache['violence'] = tensor
+        return self.blob_cache['violence']
+
+    def gender_batch(self, faces):
+        """(N, 150, 150, 3) face tensor scaled to [0, 1]"""
+        # Each face is resized straight into a pooled uint8 batch, then the whole
+        # batch is scaled into the pooled float tensor in one pass
+        pixels = self.pool.get('gender_pixels', len(faces), GENDER_SIZE[::-1] + (3,), np.uint8)
+        for face, dst in zip(faces, pixels):
+            cv2.resize(face, GENDER_SIZE, dst=dst)
+        tensor = self.pool.get('gender', len(faces), GENDER_SIZE[::-1] + (3,))
+        np.multiply(pixels, 1 / 255.0, out=tensor, casting='unsafe')
+        return tensor
+
+    def emotion_batch(self, faces):
+        """(N, 48, 48, 1) grayscale face tensor scaled to [0, 1]"""
+        pixels = self.pool.get('emotion_pixels', len(faces), EMOTION_SIZE[::-1], np.uint8)
+        for face, dst in zip(faces, pixels):
+            cv2.resize(cv2.cvtColor(face, cv2.COLOR_BGR2GRAY), EMOTION_SIZE, dst=dst)
+        tensor = self.pool.get('emotion', len(faces), EMOTION_SIZE[::-1] + (1,))
+        np.multiply(pixels, 1 / 255.0, out=tensor[..., 0], casting='unsafe')
+        return tensor
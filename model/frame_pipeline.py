@@ -0,0 +1,216 @@
+import time
+import threading
+from collections import deque
+import cv2
+from frame_broadcast import FrameBroadcaster, EncodedFrame, ViewerRate, ENCODING_LADDER
+
+# Staged frame pipeline: capture thread -> inference worker -> JPEG encoder.
+# Stages are connected by bounded latest-wins queues, so when inference is
+# slower than the camera the oldest pending frame is dropped instead of
+# building a backlog, and camera I/O, model inference and JPEG encoding run
+# concurrently (OpenCV and TensorFlow release the GIL in their native code).
+# Encoded frames are published once to a FrameBroadcaster, so any number of
+# viewers share the same inference and encode work. The encoder only builds the
+# ladder rungs (full / half / low) that some viewer currently reads; adaptive
+# viewers pick their rung from how fast their connection drains.
+
+class LatestQueue:
+    """Bounded queue that drops the oldest item when full"""
+    def __init__(self, maxsize=1):
+        self.items = deque(maxlen=maxsize)
+        self.condition = threading.Condition()
+        self.closed = False
+        self.dropped = 0
+
+    def put(self, item):
+        with self.condition:
+            if len(self.items) == self.items.maxlen:
+                self.dropped += 1
+            self.items.append(item)
+            self.condition.notify()
+
+    def get(self, timeout=None):
+        """Oldest pending item, or None once closed / on timeout"""
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.items or self.closed, timeout):
+                return None
+            return self.items.popleft() if self.items else None
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    def __len__(self):
+        return len(self.items)
+
+class StageStats:
+    """Items processed and busy time of one stage, for occupancy reporting"""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.started = time.time()
+            self.items = 0
+            self.busy = 0.0
+
+    def record(self, busy_seconds):
+        with self.lock:
+            self.items += 1
+            self.busy += busy_seconds
+
+    def snapshot(self):
+        with self.lock:
+            elapsed = max(time.time() - self.started, 1e-6)
+            return {
+                'items': self.items,
+                'fps': round(self.items / elapsed, 2),
+                'occupancy': round(min(1.0, self.busy / elapsed), 3),
+                'avg_ms': round(self.busy * 1000 / self.items, 2) if self.items else 0.0
+            }
+
+class FramePipeline:
+    def __init__(self, source, process, jpeg_quality=None, queue_size=1):
+        self.source = source
+        self.process = process
+        # jpeg_quality overrides the quality of the full-resolution rung
+        self.ladder = list(ENCODING_LADDER)
+        if jpeg_quality:
+            self.ladder[0] = self.ladder[0]._replace(quality=jpeg_quality)
+        self.queue_size = queue_size
+        self.lock = threading.Lock()
+        self.running = False
+        self.threads = []
+        self.broadcaster = FrameBroadcaster()
+        self.stats_by_stage = {'capture': StageStats(), 'inference': StageStats(), 'encode': StageStats()}
+        self.latency_ms = 0.0
+        self.frame_interval = 1 / 30
+        self.last_published = None
+
+    def start(self):
+        """Start the stage threads (no-op if already running)"""
+        with self.lock:
+            if self.running:
+                return
+            self.running = True
+            self.inference_queue = LatestQueue(self.queue_size)
+            self.encode_queue = LatestQueue(self.queue_size)
+            for stats in self.stats_by_stage.values():
+                stats.reset()
+            self.threads = [
+                threading.Thread(target=self._capture_loop, daemon=True),
+                threading.Thread(target=self._inference_loop, daemon=True),
+                threading.Thread(target=self._encode_loop, daemon=True)
+            ]
+            for thread in self.threads:
+                thread.start()
+
+    def stop(self):
+        with self.lock:
+            if not self.running:
+                return
+            self.running = False
+            self.inference_queue.close()
+            self.encode_queue.close()
+        self.broadcaster.close()
+
+    def _capture_loop(self):
+        cap = cv2.VideoCapture(self.source)
+        seq = 0
+        try:
+            while self.running:
+                start = time.time()
+                success, frame = cap.read()
+                if not success:
+                    print("Failed to read frame from capture source, stopping pipeline")
+                    break
+                self.stats_by_stage['capture'].record(time.time() - start)
+                seq += 1
+                self.inference_queue.put((seq, start, frame))
+        finally:
+            cap.release()
+            self.stop()
+
+    def _inference_loop(self):
+        while self.running:
+            item = self.inference_queue.get(timeout=0.5)
+            if item is None:
+                continue
+            seq, captured_at, frame = item
+            start = time.time()
+            try:
+                frame = self.process(frame)
+            except Exception as e:
+                print(f"Error processing frame {seq}: {str(e)}")
+                continue
+            self.stats_by_stage['inference'].record(time.time() - start)
+            self.encode_queue.put((seq, captured_at, frame))
+
+    def _encode_loop(self):
+        while self.running:
+            item = self.encode_queue.get(timeout=0.5)
+            if item is None:
+                continue
+            seq, captured_at, frame = item
+            start = time.time()
+            encoded = EncodedFrame(frame, self.ladder)
+            # Encode the rungs viewers are reading now; a viewer that has just
+            # switched rung gets its encoding built lazily on first read
+            for level in self.broadcaster.levels_in_use():
+                encoded.get(level)
+            now = time.time()
+            self.stats_by_stage['encode'].record(now - start)
+            # Glass-to-glass latency from camera read to encoded JPEG, smoothed
+            latency_ms = (now - captured_at) * 1000
+            self.latency_ms = latency_ms if not self.latency_ms else 0.9 * self.latency_ms + 0.1 * latency_ms
+            if self.last_published is not None:
+                self.frame_interval = 0.9 * self.frame_interval + 0.1 * (now - self.last_published)
+            self.last_published = now
+            self.broadcaster.publish(encoded)
+
+    def frames(self, buffer_size=None, adaptive=False, level=0):
+        """
+        Yield encoded JPEGs to one viewer until the pipeline stops or the viewer disconnects.
+        With adaptive=True the time the consumer takes to send each frame, and the
+        frames that queued up for the viewer meanwhile, move it along the encoding
+        ladder; otherwise it stays on `level`.
+        """
+        subscription = self.broadcaster.subscribe(buffer_size)
+        subscription.level = level
+        if adaptive:
+            subscription.rate = ViewerRate(len(self.ladder), level)
+        seen_dropped = 0
+        try:
+            while self.running:
+                encoded = subscription.get(timeout=1.0)
+                if encoded is None:
+                    continue
+                jpeg = encoded.get(subscription.level)
+                if jpeg is None:
+                    continue
+                sent_at = time.time()
+                # The generator resumes once the consumer has written this frame
+                yield jpeg
+                if adaptive:
+                    dropped = subscription.dropped - seen_dropped
+                    seen_dropped = subscription.dropped
+                    subscription.level = subscription.rate.record(len(jpeg), time.time() - sent_at, self.frame_interval,
+                                                                  dropped, backlog=len(subscription.buffer))
+        finally:
+            self.broadcaster.unsubscribe(subscription)
+
+    def stats(self):
+        stages = {name: stats.snapshot() for name, stats in self.stats_by_stage.items()}
+        if self.running:
+            stages['inference']['queue_depth'] = len(self.inference_queue)
+            stages['inference']['dropped'] = self.inference_queue.dropped
+            stages['encode']['queue_depth'] = len(self.encode_queue)
+            stages['encode']['dropped'] = self.encode_queue.dropped
+        return {
+            'running': self.running,
+            'stages': stages,
+            'latency_ms': round(self.latency_ms, 1),
+            'viewers': self.broadcaster.stats()
+        }
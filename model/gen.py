@@ -1,22 +1,12 @@
-from keras.models import load_model  # TensorFlow is required for Keras to work
 import cv2  # Install opencv-python
 import numpy as np
-
-
-from keras.layers import DepthwiseConv2D
-
-# Custom DepthwiseConv2D layer that ignores unrecognized arguments
-class CustomDepthwiseConv2D(DepthwiseConv2D):
-    def __init__(self, *args, **kwargs):
-        if 'groups' in kwargs:
-            kwargs.pop('groups')
-        super(CustomDepthwiseConv2D, self).__init__(*args, **kwargs)
+from model_runner import get_runner
 
 # Disable scientific notation for clarity
 np.set_printoptions(suppress=True)
 
-# Load the model using the custom layer definition
-model = load_model("gender.h5", custom_objects={'DepthwiseConv2D': CustomDepthwiseConv2D}, compile=False)
+# Load the model behind a warm, shape-fixed runner
+model = get_runner('gender')
 
 # Load the labels
 class_names = open("labels_gender.txt", "r").readlines()
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Shared model runners for the KavachEye scripts
+
+Each Keras model is loaded once per process and exposed behind a warm,
+fixed-input-shape call. keras.Model.predict builds a data adapter and a
+callback list on every call, which dominates the cost of single-sample
+inference; the runners skip that and call the model (or a compiled version of
+it) directly.
+
+Backends:
+    keras        direct model(x, training=False) call
+    tf_function  tf.function traced once with a fixed input signature
+    tflite       TFLite interpreter (converted from the Keras model on first use)
+    tflite_int8  int8 TFLite artifact produced by quantize.py (no Keras load)
+    opencv       OpenCV DNN on a frozen TensorFlow graph
+
+The backend can be chosen per model with KAVACH_BACKEND_<NAME> (for example
+KAVACH_BACKEND_VIOLENCE=tflite) or for all models with KAVACH_BACKEND.
+KAVACH_QUANTIZED=1 switches every model that has an int8 artifact to
+tflite_int8.
+
+Run this file directly to print a per-backend latency report:
+    python model_runner.py --models violence gender --repeats 50
+"""
+
+import os
+import time
+import threading
+import argparse
+import numpy as np
+import cv2
+import tensorflow as tf
+from tensorflow.keras.models import load_model
+from keras.layers import DepthwiseConv2D
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Custom DepthwiseConv2D layer to ignore unrecognized arguments
+# (needed by the Teachable Machine exports gender.h5 and violence.h5)
+class CustomDepthwiseConv2D(DepthwiseConv2D):
+    def __init__(self, *args, **kwargs):
+        if 'groups' in kwargs:
+            kwargs.pop('groups')
+        super(CustomDepthwiseConv2D, self).__init__(*args, **kwargs)
+
+# Input preprocessing used by each model, applied to a BGR image (whole frame
+# for the violence model, face crop for the others)
+def preprocess_teachable(image, img_size=(224, 224)):
+    image = cv2.resize(image, img_size, interpolation=cv2.INTER_AREA)
+    return (np.asarray(image, dtype=np.float32) / 127.5) - 1
+
+def preprocess_unit(image, img_size=(150, 150)):
+    return cv2.resize(image, img_size).astype('float32') / 255.0
+
+def preprocess_gray_unit(image, img_size=(48, 48)):
+    roi_gray = cv2.resize(cv2.cvtColor(image, cv2.COLOR_BGR2GRAY), img_size)
+    return roi_gray.astype('float32')[:, :, np.newaxis] / 255.0
+
+MODEL_SPECS = {
+    'gender': {'file': 'gender.h5', 'custom_objects': True, 'preprocess': preprocess_teachable, 'face_input': True},
+    'gender_best': {'file': 'gender_model_best.h5', 'custom_objects': False, 'preprocess': preprocess_unit, 'face_input': True},
+    'emotion': {'file': 'emotion_model.h5', 'custom_objects': False, 'preprocess': preprocess_gray_unit, 'face_input': True},
+    'violence': {'file': 'violence.h5', 'custom_objects': True, 'preprocess': preprocess_teachable, 'face_input': False},
+}
+
+BACKENDS = ['keras', 'tf_function', 'tflite', 'tflite_int8', 'opencv']
+DEFAULT_BACKEND = 'tf_function'
+
+_keras_models = {}
+_runners = {}
+_registry_lock = threading.Lock()
+_runner_lock = threading.Lock()
+
+def model_path(name, model_dir=current_dir):
+    return os.path.join(model_dir, MODEL_SPECS[name]['file'])
+
+def quantized_model_path(name, model_dir=current_dir):
+    stem = os.path.splitext(MODEL_SPECS[name]['file'])[0]
+    return os.path.join(model_dir, 'quantized', f'{stem}_int8.tflite')
+
+def load_keras_model(name, model_dir=current_dir):
+    """Load a Keras model once per process"""
+    key = (name, model_dir)
+    with _registry_lock:
+        if key not in _keras_models:
+            if MODEL_SPECS[name]['custom_objects']:
+                model = load_model(model_path(name, model_dir), custom_objects={'DepthwiseConv2D': CustomDepthwiseConv2D}, compile=False)
+            else:
+                model = load_model(model_path(name, model_dir), compile=False)
+            _keras_models[key] = model
+        return _keras_models[key]
+
+def quantize_input(x, detail):
+    """Convert float input to the interpreter's input type (no-op for float models)"""
+    if detail['dtype'] == np.float32:
+        return x
+    scale, zero_point = detail['quantization']
+    info = np.iinfo(detail['dtype'])
+    return np.clip(np.round(x / scale + zero_point), info.min, info.max).astype(detail['dtype'])
+
+def dequantize_output(y, detail):
+    """Convert interpreter output back to float32 (copies, so the arena can be reused)"""
+    if detail['dtype'] == np.float32:
+        return y.copy()
+    scale, zero_point = detail['quantization']
+    return (y.astype(np.float32) - zero_point) * scale
+
+class ModelRunner:
+    def __init__(self, name, backend=DEFAULT_BACKEND, model_dir=current_dir):
+        if name not in MODEL_SPECS:
+            raise ValueError(f"Unknown model '{name}', expected one of {list(MODEL_SPECS)}")
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend '{backend}', expected one of {BACKENDS}")
+        self.name = name
+        self.backend = backend
+        self.model_dir = model_dir
+        # TFLite interpreters and OpenCV nets are not safe to share between threads
+        self._lock = threading.Lock()
+        self._batch_size = None
+        if backend == 'tflite_int8':
+            # The quantized artifact is self-contained, the float model is never loaded
+            self.keras_model = None
+        else:
+            self.keras_model = load_keras_model(name, model_dir)
+            # Spatial input shape is fixed by the model, only the batch dimension varies
+            self.input_shape = tuple(self.keras_model.input_shape[1:])
+        getattr(self, f'_init_{backend}')()
+        self.warmup()
+
+    def _init_keras(self):
+        self._call = lambda x: self.keras_model(x, training=False).numpy()
+
+    def _init_tf_function(self):
+        model = self.keras_model
+        fn = tf.function(
+            lambda x: model(x, training=False),
+            input_signature=[tf.TensorSpec((None,) + self.input_shape, tf.float32)]
+        )
+        self._call = lambda x: fn(x).numpy()
+
+    def _init_tflite(self):
+        converter = tf.lite.TFLiteConverter.from_keras_model(self.keras_model)
+        self.interpreter = tf.lite.Interpreter(model_content=converter.convert())
+        self._setup_interpreter()
+        self._call = self._call_tflite
+
+    def _init_tflite_int8(self):
+        path = quantized_model_path(self.name, self.model_dir)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"{path} not found, run quantize.py to create it")
+        self.interpreter = tf.lite.Interpreter(model_path=path)
+        self._setup_interpreter()
+        self.input_shape = tuple(int(d) for d in self._input_detail['shape'][1:])
+        self._call = self._call_tflite
+
+    def _setup_interpreter(self):
+        self.interpreter.allocate_tensors()
+        self._input_detail = self.interpreter.get_input_details()[0]
+        self._output_detail = self.interpreter.get_output_details()[0]
+        self._batch_size = int(self._input_detail['shape'][0])
+
+    def _call_tflite(self, x):
+        with self._lock:
+            if x.shape[0] != self._batch_size:
+                # Reallocation only happens when the batch size changes
+                self.interpreter.resize_tensor_input(self._input_detail['index'], x.shape)
+                self._setup_interpreter()
+            self.interpreter.set_tensor(self._input_detail['index'], quantize_input(x, self._input_detail))
+            self.interpreter.invoke()
+            return dequantize_output(self.interpreter.get_tensor(self._output_detail['index']), self._output_detail)
+
+    def _init_opencv(self):
+        from tensorflow.python.framework.convert_to_constants import convert_variables_to_constants_v2
+        model = self.keras_model
+        concrete = tf.function(lambda x: model(x, training=False)).get_concrete_function(
+            tf.TensorSpec((1,) + self.input_shape, tf.float32)
+        )
+        frozen = convert_variables_to_constants_v2(concrete)
+        graph_bytes = frozen.graph.as_graph_def().SerializeToString()
+        self.net = cv2.dnn.readNetFromTensorflow(np.frombuffer(graph_bytes, dtype=np.uint8))
+        self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+        self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+        self._call = self._call_opencv
+
+    def _call_opencv(self, x):
+        with self._lock:
+            # OpenCV DNN expects NCHW blobs and converts the layout internally
+            self.net.setInput(np.ascontiguousarray(x.transpose(0, 3, 1, 2)))
+            return self.net.forward().reshape(x.shape[0], -1)
+
+    def warmup(self):
+        self.predict(np.zeros((1,) + self.input_shape, dtype=np.float32))
+
+    def predict(self, x, verbose=0):
+        """
+        Run a (N,) + input_shape batch and return the model outputs as a NumPy array.
+        `verbose` is accepted (and ignored) so callers can treat runners and plain
+        Keras models alike.
+        """
+        x = np.ascontiguousarray(x, dtype=np.float32)
+        if x.shape[1:] != self.input_shape:
+            raise ValueError(f"{self.name} expects input shape (N,) + {self.input_shape}, got {x.shape}")
+        return self._call(x)
+
+def default_backend(name, model_dir=current_dir):
+    backend = os.getenv(f'KAVACH_BACKEND_{name.upper()}', os.getenv('KAVACH_BACKEND'))
+    if backend:
+        return backend
+    # KAVACH_QUANTIZED=1 prefers the int8 artifacts wherever quantize.py produced one
+    if os.getenv('KAVACH_QUANTIZED') == '1' and os.path.exists(quantized_model_path(name, model_dir)):
+        return 'tflite_int8'
+    return DEFAULT_BACKEND
+
+def get_runner(name, backend=None, model_dir=current_dir):
+    """Return the shared runner for a model, creating it on first use"""
+    backend = backend or default_backend(name, model_dir)
+    key = (name, backend, model_dir)
+    with _runner_lock:
+        if key not in _runners:
+            _runners[key] = ModelRunner(name, backend, model_dir)
+        return _runners[key]
+
+def latency_report(names=None, backends=None, repeats=50, batch_size=1, model_dir=current_dir):
+    """Measure mean/p95 latency per model and backend on random input"""
+    names = names or list(MODEL_SPECS)
+    backends = backends or BACKENDS
+    rows = []
+    for name in names:
+        for backend in backends:
+            row = {'model': name, 'backend': backend, 'batch_size': batch_size}
+            try:
+                runner = ModelRunner(name, backend, model_dir)
+                x = np.random.rand(batch_size, *runner.input_shape).astype(np.float32)
+                timings = []
+                for _ in range(repeats):
+                    start = time.perf_counter()
+                    runner.predict(x)
+                    timings.append((time.perf_counter() - start) * 1000)
+                row['mean_ms'] = float(np.mean(timings))
+                row['p95_ms'] = float(np.percentile(timings, 95))
+            except Exception as e:
+                row['error'] = str(e)
+            rows.append(row)
+    return rows
+
+def print_latency_report(rows):
+    print(f"{'model':<12} | {'backend':<12} | {'batch':>5} | {'mean ms':>8} | {'p95 ms':>8}")
+    print("-" * 57)
+    for row in rows:
+        if 'error' in row:
+            print(f"{row['model']:<12} | {row['backend']:<12} | {row['batch_size']:>5} | unavailable: {row['error'][:60]}")
+        else:
+            print(f"{row['model']:<12} | {row['backend']:<12} | {row['batch_size']:>5} | {row['mean_ms']:>8.2f} | {row['p95_ms']:>8.2f}")
+
+    print("\nFastest backend per model:")
+    for name in dict.fromkeys(row['model'] for row in rows):
+        timed = [row for row in rows if row['model'] == name and 'mean_ms' in row]
+        if timed:
+            best = min(timed, key=lambda row: row['mean_ms'])
+            print(f"  {name}: {best['backend']} ({best['mean_ms']:.2f} ms)  ->  KAVACH_BACKEND_{name.upper()}={best['backend']}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Per-backend latency report for the KavachEye models')
+    parser.add_argument('--models', nargs='+', choices=list(MODEL_SPECS), default=list(MODEL_SPECS))
+    parser.add_argument('--backends', nargs='+', choices=BACKENDS, default=BACKENDS)
+    parser.add_argument('--repeats', type=int, default=50)
+    parser.add_argument('--batch-size', type=int, default=1)
+    args = parser.parse_args()
+
+    print_latency_report(latency_report(args.models, args.backends, args.repeats, args.batch_size))
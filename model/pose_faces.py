@@ -0,0 +1,67 @@
+import numpy as np
+from face_tracker import iou_matrix
+
+# Face ROIs derived from YOLOv8 pose keypoints.
+# COCO keypoints 0-4 are nose, left eye, right eye, left ear and right ear, so
+# the pose model already locates every head; deriving the face box from them
+# saves the separate SSD face detector pass.
+
+HEAD_KEYPOINTS = slice(0, 5)
+LEFT_EYE, RIGHT_EYE = 1, 2
+
+def head_boxes_from_keypoints(xy, conf, min_conf=0.5, min_points=3):
+    """
+    Vectorized head boxes for P people.
+    xy: (P, 17, 2) keypoint coordinates, conf: (P, 17) keypoint confidences.
+    Returns (boxes (P, 4) int array of (startX, startY, endX, endY), reliable (P,) bool).
+    """
+    head_xy = np.asarray(xy, dtype=np.float32)[:, HEAD_KEYPOINTS]
+    head_conf = np.asarray(conf, dtype=np.float32)[:, HEAD_KEYPOINTS]
+    valid = head_conf >= min_conf
+    count = valid.sum(axis=1)
+    reliable = count >= min_points
+
+    # Masked statistics over the confident head keypoints only
+    weights = valid.astype(np.float32)
+    safe_count = np.maximum(count, 1)
+    centre = (head_xy * weights[..., np.newaxis]).sum(axis=1) / safe_count[:, np.newaxis]
+    x = head_xy[..., 0]
+    span_x = np.where(valid, x, -np.inf).max(axis=1) - np.where(valid, x, np.inf).min(axis=1)
+    span_x = np.where(count > 1, span_x, 0.0)
+
+    # Eye distance is roughly 40% of the face width and is the most stable cue
+    # when the head is turned and one ear is hidden
+    both_eyes = valid[:, LEFT_EYE] & valid[:, RIGHT_EYE]
+    eye_distance = np.linalg.norm(head_xy[:, LEFT_EYE] - head_xy[:, RIGHT_EYE], axis=1)
+    width = np.maximum(span_x * 1.2, np.where(both_eyes, eye_distance * 2.5, 0.0))
+    reliable &= width > 0
+
+    # The centre of the head keypoints sits a little above the middle of the face
+    boxes = np.stack([
+        centre[:, 0] - width / 2,
+        centre[:, 1] - width * 0.6,
+        centre[:, 0] + width / 2,
+        centre[:, 1] + width * 0.7
+    ], axis=1)
+    return np.round(boxes).astype(int), reliable
+
+def pose_face_boxes(result, min_conf=0.5):
+    """
+    Face boxes from one ultralytics pose result; also returns whether the SSD
+    fallback is needed (a person without reliable head keypoints, or no person
+    at all, since a face whose body the pose model missed is still a face)
+    """
+    keypoints = result.keypoints
+    if keypoints is None or len(keypoints) == 0:
+        return [], True
+    if keypoints.conf is None:
+        return [], True
+    boxes, reliable = head_boxes_from_keypoints(keypoints.xy.cpu().numpy(), keypoints.conf.cpu().numpy(), min_conf)
+    return [tuple(box) for box in boxes[reliable]], bool((~reliable).any())
+
+def merge_fallback_boxes(pose_boxes, fallback_boxes, iou_threshold=0.3):
+    """Add SSD boxes that do not overlap any pose-derived box"""
+    if not pose_boxes or not fallback_boxes:
+        return list(pose_boxes) + list(fallback_boxes)
+    overlaps = iou_matrix(fallback_boxes, pose_boxes).max(axis=1)
+    return list(pose_boxes) + [box for box, overlap in zip(fallback_boxes, overlaps) if overlap < iou_threshold]
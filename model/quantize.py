@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Int8 post-training quantization for the KavachEye models
+
+Converts violence.h5, gender.h5, gender_model_best.h5 and emotion_model.h5 to
+full-integer int8 TFLite using a local calibration set of frames (a folder of
+images and/or video files), then writes a report comparing the int8 model to
+the float model:
+
+    top-1 agreement   share of held-out samples where both models pick the same class
+    latency           mean ms per single-sample call (float tf.function vs int8 TFLite)
+    memory            on-disk size of the .h5, the float TFLite and the int8 TFLite
+
+Face models are calibrated on SSD face crops when the res10 SSD files are
+present, otherwise on whole frames.
+
+Usage:
+    python quantize.py --calibration ./calibration_frames
+    python quantize.py --calibration ./clips --models violence gender --max-samples 300
+
+Artifacts go to quantized/<name>_int8.tflite next to the .h5 files and are
+picked up at runtime with KAVACH_BACKEND_<NAME>=tflite_int8.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+import cv2
+import tensorflow as tf
+
+from model_runner import MODEL_SPECS, ModelRunner, load_keras_model, model_path, quantized_model_path, current_dir
+from face_batch import extract_faces
+
+image_extensions = ('.jpg', '.jpeg', '.png', '.bmp')
+video_extensions = ('.mp4', '.avi', '.mov', '.mkv')
+
+def load_calibration_frames(path, max_frames=500, frames_per_video=50):
+    """Read BGR frames from a folder of images and/or videos"""
+    frames = []
+    files = sorted(os.listdir(path)) if os.path.isdir(path) else [path]
+    for filename in files:
+        full_path = os.path.join(path, filename) if os.path.isdir(path) else filename
+        lower = full_path.lower()
+        if lower.endswith(image_extensions):
+            frame = cv2.imread(full_path)
+            if frame is not None:
+                frames.append(frame)
+        elif lower.endswith(video_extensions):
+            cap = cv2.VideoCapture(full_path)
+            total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) or frames_per_video
+            step = max(1, total // frames_per_video)
+            for index in range(0, total, step):
+                cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+                success, frame = cap.read()
+                if not success:
+                    break
+                frames.append(frame)
+            cap.release()
+        if len(frames) >= max_frames:
+            break
+    return frames[:max_frames]
+
+def load_face_net():
+    ssd_prototxt = os.path.join(current_dir, 'deploy.prototxt.txt')
+    ssd_weights = os.path.join(current_dir, 'res10_300x300_ssd_iter_140000.caffemodel')
+    if not os.path.exists(ssd_weights):
+        return None
+    return cv2.dnn.readNetFromCaffe(ssd_prototxt, ssd_weights)
+
+def calibration_images(frames, face_input, face_net):
+    """Face crops for face models (when the SSD is available), whole frames otherwise"""
+    if not face_input or face_net is None:
+        return frames
+    crops = []
+    for frame in frames:
+        blob = cv2.dnn.blobFromImage(cv2.resize(frame, (300, 300)), 1.0, (300, 300), (104.0, 177.0, 123.0))
+        face_net.setInput(blob)
+        _, faces = extract_faces(frame, face_net.forward())
+        crops.extend(faces)
+    # Fall back to whole frames if the calibration set contains no faces
+    return crops or frames
+
+def convert_int8(keras_model, samples):
+    converter = tf.lite.TFLiteConverter.from_keras_model(keras_model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.representative_dataset = lambda: ([sample[np.newaxis]] for sample in samples)
+    converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    converter.inference_input_type = tf.int8
+    converter.inference_output_type = tf.int8
+    return converter.convert()
+
+def convert_float(keras_model):
+    return tf.lite.TFLiteConverter.from_keras_model(keras_model).convert()
+
+def mean_latency_ms(runner, sample, repeats):
+    x = sample[np.newaxis]
+    start = time.perf_counter()
+    for _ in range(repeats):
+        runner.predict(x)
+    return (time.perf_counter() - start) * 1000 / repeats
+
+def quantize_model(name, frames, face_net, holdout=0.2, repeats=50, model_dir=current_dir):
+    spec = MODEL_SPECS[name]
+    keras_model = load_keras_model(name, model_dir)
+    images = calibration_images(frames, spec['face_input'], face_net)
+    samples = np.stack([spec['preprocess'](image) for image in images])
+
+    # Calibrate on one part of the set, measure agreement on the rest
+    split = max(1, int(len(samples) * (1 - holdout)))
+    calibration, evaluation = samples[:split], samples[split:]
+    if len(evaluation) == 0:
+        evaluation = calibration
+
+    int8_path = quantized_model_path(name, model_dir)
+    os.makedirs(os.path.dirname(int8_path), exist_ok=True)
+    with open(int8_path, 'wb') as f:
+        f.write(convert_int8(keras_model, calibration))
+    float_tflite_size = len(convert_float(keras_model))
+
+    float_runner = ModelRunner(name, 'tf_function', model_dir)
+    int8_runner = ModelRunner(name, 'tflite_int8', model_dir)
+    float_top1 = np.argmax(float_runner.predict(evaluation), axis=1)
+    int8_top1 = np.argmax(int8_runner.predict(evaluation), axis=1)
+
+    return {
+        'model': name,
+        'artifact': os.path.relpath(int8_path, model_dir),
+        'calibration_samples': int(len(calibration)),
+        'evaluation_samples': int(len(evaluation)),
+        'top1_agreement': float(np.mean(float_top1 == int8_top1)),
+        'float_latency_ms': mean_latency_ms(float_runner, evaluation[0], repeats),
+        'int8_latency_ms': mean_latency_ms(int8_runner, evaluation[0], repeats),
+        'h5_bytes': os.path.getsize(model_path(name, model_dir)),
+        'float_tflite_bytes': float_tflite_size,
+        'int8_tflite_bytes': os.path.getsize(int8_path)
+    }
+
+def print_report(rows):
+    print(f"{'model':<12} | {'top-1 agree':>11} | {'float ms':>8} | {'int8 ms':>8} | {'speedup':>7} | {'float KB':>9} | {'int8 KB':>8}")
+    print("-" * 82)
+    for row in rows:
+        speedup = row['float_latency_ms'] / row['int8_latency_ms']
+        print(f"{row['model']:<12} | {row['top1_agreement'] * 100:>10.1f}% | {row['float_latency_ms']:>8.2f} | "
+              f"{row['int8_latency_ms']:>8.2f} | {speedup:>6.1f}x | {row['float_tflite_bytes'] / 1024:>9.0f} | {row['int8_tflite_bytes'] / 1024:>8.0f}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Int8 post-training quantization for the KavachEye models')
+    parser.add_argument('--calibration', required=True, help='Folder of images/videos (or a single video) to calibrate on')
+    parser.add_argument('--models', nargs='+', choices=list(MODEL_SPECS), default=list(MODEL_SPECS))
+    parser.add_argument('--max-samples', type=int, default=500)
+    parser.add_argument('--holdout', type=float, default=0.2, help='Share of samples kept out of calibration for the agreement check')
+    parser.add_argument('--repeats', type=int, default=50)
+    parser.add_argument('--report', default=os.path.join(current_dir, 'quantized', 'report.json'))
+    args = parser.parse_args()
+
+    frames = load_calibration_frames(args.calibration, args.max_samples)
+    if not frames:
+        print(f"Error: no calibration frames found in '{args.calibration}'")
+        sys.exit(1)
+    print(f"Loaded {len(frames)} calibration frames.")
+
+    face_net = load_face_net()
+    rows = []
+    for name in args.models:
+        print(f"Quantizing {name}...")
+        rows.append(quantize_model(name, frames, face_net, args.holdout, args.repeats))
+
+    os.makedirs(os.path.dirname(args.report), exist_ok=True)
+    with open(args.report, 'w') as f:
+        json.dump(rows, f, indent=2)
+    print()
+    print_report(rows)
+    print(f"\nReport saved to {args.report}")
@@ -0,0 +1,155 @@
+import time
+import heapq
+import itertools
+import threading
+
+# Central scheduler for SOS escalation sequences.
+# A sequence sends up to `max_alerts` SMS to one contact, `interval` seconds
+# apart, and places a call after the `call_after_alerts`-th SMS. Instead of one
+# sleeping thread per sequence, every pending step sits in a heap ordered by
+# due time and a single worker thread runs the steps as they come due, so the
+# thread count stays constant however many incidents are open. Sequences are
+# keyed by (contact, incident): a repeated trigger for an incident that is
+# already escalating to that contact does not start a second sequence, and
+# resolving the incident cancels its remaining steps.
+
+class SOSSequence:
+    def __init__(self, contact, incident, message, twiml_url, max_alerts, call_after_alerts, interval):
+        self.contact = contact
+        self.incident = incident
+        self.message = message
+        self.twiml_url = twiml_url
+        self.max_alerts = max_alerts
+        self.call_after_alerts = call_after_alerts
+        self.interval = interval
+        self.alerts_sent = 0
+        self.called = False
+        self.status = 'active'
+        self.triggers = 1
+        self.created_at = time.time()
+        self.next_at = None
+        self.finished_at = None
+
+    @property
+    def key(self):
+        return (self.contact, self.incident)
+
+    def to_dict(self):
+        return {
+            'contact': self.contact,
+            'incident': self.incident,
+            'status': self.status,
+            'alerts_sent': self.alerts_sent,
+            'max_alerts': self.max_alerts,
+            'called': self.called,
+            'triggers': self.triggers,
+            'created_at': self.created_at,
+            'next_alert_in': round(max(0.0, self.next_at - time.time()), 1) if self.status == 'active' and self.next_at else None,
+            'finished_at': self.finished_at
+        }
+
+class SOSScheduler:
+    def __init__(self, send_sms, make_call, max_alerts=15, call_after_alerts=2, interval=30.0, history=50):
+        self.send_sms = send_sms
+        self.make_call = make_call
+        self.max_alerts = max_alerts
+        self.call_after_alerts = call_after_alerts
+        self.interval = interval
+        self.history = history
+        self.heap = []
+        self.order = itertools.count()
+        self.active = {}
+        self.finished = []
+        self.condition = threading.Condition()
+        self.worker = threading.Thread(target=self._run, name='sos-scheduler', daemon=True)
+        self.worker.start()
+
+    def start(self, contact, incident, message, twiml_url):
+        """Start escalating an incident to a contact; returns (sequence, started) where started is False for a duplicate"""
+        with self.condition:
+            sequence = self.active.get((contact, incident))
+            if sequence is not None:
+                sequence.triggers += 1
+                return sequence, False
+            sequence = SOSSequence(contact, incident, message, twiml_url,
+                                   self.max_alerts, self.call_after_alerts, self.interval)
+            self.active[sequence.key] = sequence
+            self._schedule(sequence, time.time())
+            return sequence, True
+
+    def _schedule(self, sequence, due):
+        sequence.next_at = due
+        heapq.heappush(self.heap, (due, next(self.order), sequence))
+        self.condition.notify()
+
+    def cancel(self, incident=None, contact=None):
+        """Cancel the active sequences matching an incident and/or contact (all if neither is given)"""
+        with self.condition:
+            cancelled = [
+                sequence for sequence in self.active.values()
+                if (incident is None or sequence.incident == incident) and (contact is None or sequence.contact == contact)
+            ]
+            for sequence in cancelled:
+                self._finish(sequence, 'cancelled')
+            if cancelled:
+                # Drop their pending steps so queued_steps only counts steps that will run
+                self.heap = [entry for entry in self.heap if entry[2].status == 'active']
+                heapq.heapify(self.heap)
+            self.condition.notify()
+        return [sequence.to_dict() for sequence in cancelled]
+
+    def _finish(self, sequence, status):
+        sequence.status = status
+        sequence.finished_at = time.time()
+        self.active.pop(sequence.key, None)
+        self.finished.append(sequence)
+        del self.finished[:-self.history]
+
+    def _next_due(self):
+        """Pop the next due active sequence, waiting as needed (called with the condition held)"""
+        while True:
+            while self.heap and self.heap[0][2].status != 'active':
+                heapq.heappop(self.heap)
+            if not self.heap:
+                self.condition.wait()
+                continue
+            due = self.heap[0][0]
+            now = time.time()
+            if due > now:
+                self.condition.wait(due - now)
+                continue
+            return heapq.heappop(self.heap)[2]
+
+    def _run(self):
+        while True:
+            with self.condition:
+                sequence = self._next_due()
+                sequence.alerts_sent += 1
+                place_call = sequence.alerts_sent == sequence.call_after_alerts
+            # Twilio calls run outside the lock so triggers and cancels never wait on the network
+            try:
+                self.send_sms(sequence.contact, sequence.message)
+                if place_call:
+                    self.make_call(sequence.contact, sequence.twiml_url)
+                    sequence.called = True
+            except Exception as e:
+                print(f"Error in SOS sequence for {sequence.contact}: {str(e)}")
+            with self.condition:
+                if sequence.status != 'active':
+                    continue
+                if sequence.alerts_sent >= sequence.max_alerts:
+                    self._finish(sequence, 'completed')
+                else:
+                    self._schedule(sequence, time.time() + sequence.interval)
+
+    def state(self):
+        with self.condition:
+            active = [sequence.to_dict() for sequence in sorted(self.active.values(), key=lambda s: s.next_at)]
+            recent = [sequence.to_dict() for sequence in reversed(self.finished)]
+            queued = len(self.heap)
+        return {
+            'active': active,
+            'recent': recent,
+            'queued_steps': queued,
+            'worker_alive': self.worker.is_alive()
+        }
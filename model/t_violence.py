@@ -1,21 +1,14 @@
 # Working
 
 
-from flask import Flask, render_template, Response
+from flask import Flask, render_template, Response, jsonify
 import cv2
 import numpy as np
-from keras.models import load_model
-from keras.layers import DepthwiseConv2D
+from model_runner import get_runner
+from motion_gate import MotionGate
 
-# Custom DepthwiseConv2D layer to ignore unrecognized arguments
-class CustomDepthwiseConv2D(DepthwiseConv2D):
-    def __init__(self, *args, **kwargs):
-        if 'groups' in kwargs:
-            kwargs.pop('groups')
-        super(CustomDepthwiseConv2D, self).__init__(*args, **kwargs)
-
-# Load the violence detection model
-model = load_model("violence.h5", custom_objects={'DepthwiseConv2D': CustomDepthwiseConv2D}, compile=False)
+# Load the violence detection model behind a warm, shape-fixed runner
+model = get_runner('violence')
 
 class_names = open("labels_violence.txt", "r").readlines()
 
@@ -28,32 +21,38 @@ a = 0
 # Camera setup
 camera = cv2.VideoCapture(0)
 
+# Skip violence inference while the scene is static (enable with MOTION_GATE=1)
+motion_gate = MotionGate.from_env()
+
 def generate_frames():
     global a
+    label = None
     while True:
         # Capture frame-by-frame
         success, frame = camera.read()
         if not success:
             break
 
-        # Resize the frame for the model
-        image = cv2.resize(frame, (224, 224), interpolation=cv2.INTER_AREA)
-        image_array = np.asarray(image, dtype=np.float32).reshape(1, 224, 224, 3)
-        image_array = (image_array / 127.5) - 1
+        if motion_gate.check(frame):
+            # Resize the frame for the model
+            image = cv2.resize(frame, (224, 224), interpolation=cv2.INTER_AREA)
+            image_array = np.asarray(image, dtype=np.float32).reshape(1, 224, 224, 3)
+            image_array = (image_array / 127.5) - 1
 
-        # Predict using the model
-        prediction = model.predict(image_array)
-        index = np.argmax(prediction)
-        class_name = class_names[index].strip()
-        name = class_name[2:].strip()
+            # Predict using the model
+            prediction = model.predict(image_array)
+            index = np.argmax(prediction)
+            class_name = class_names[index].strip()
+            name = class_name[2:].strip()
 
-        if name == 'violence':
-            a += 1
-            print(f"Class: {class_name[2:]} | Confidence Score: {str(np.round(prediction[0][index] * 100))[:-2]}%")
+            if name == 'violence':
+                a += 1
+                print(f"Class: {class_name[2:]} | Confidence Score: {str(np.round(prediction[0][index] * 100))[:-2]}%")
+            label = f"{name}: {str(np.round(prediction[0][index] * 100))[:-2]}%"
 
-        # Draw predictions on the frame
-        cv2.putText(frame, f"{name}: {str(np.round(prediction[0][index] * 100))[:-2]}%", (10, 30),
-                    cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2, cv2.LINE_AA)
+        # Draw the latest prediction on the frame (kept while the gate is closed)
+        if label:
+            cv2.putText(frame, label, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2, cv2.LINE_AA)
 
         # Encode the frame as JPEG
         ret, buffer = cv2.imencode('.jpg', frame)
@@ -73,6 +72,10 @@ def index():
     # Video streaming home page
     return render_template('index_v.html')
 
+@app.route('/gate_stats')
+def gate_stats():
+    return jsonify(motion_gate.stats())
+
 @app.route('/video_feed')
 def video_feed():
     # Video streaming route
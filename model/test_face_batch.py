@@ -0,0 +1,25 @@
+import numpy as np
+from face_batch import crop_faces, ssd_boxes
+
+def test_crop_faces_clips_to_frame():
+    frame = np.arange(100 * 200 * 3, dtype=np.uint8).reshape(100, 200, 3)
+    boxes, faces = crop_faces(frame, [(-10, -5, 50, 40), (180, 90, 260, 140)])
+    assert boxes == [(0, 0, 50, 40), (180, 90, 200, 100)]
+    assert faces[0].shape == (40, 50, 3)
+    assert faces[1].shape == (10, 20, 3)
+    assert np.array_equal(faces[1], frame[90:100, 180:200])
+
+def test_crop_faces_drops_empty_crops():
+    frame = np.zeros((100, 200, 3), np.uint8)
+    # Entirely outside the frame, and inverted
+    boxes, faces = crop_faces(frame, [(210, 10, 250, 50), (60, 60, 40, 80)])
+    assert boxes == [] and faces == []
+
+def test_ssd_boxes_scales_and_filters_by_confidence():
+    frame = np.zeros((100, 200, 3), np.uint8)
+    detections = np.zeros((1, 1, 3, 7), np.float32)
+    detections[0, 0, 0, 2:7] = [0.9, 0.1, 0.2, 0.5, 0.6]
+    detections[0, 0, 1, 2:7] = [0.5, 0.0, 0.0, 1.0, 1.0]  # not above the threshold
+    detections[0, 0, 2, 2:7] = [0.6, 0.0, 0.0, 1.0, 1.0]
+    boxes = ssd_boxes(frame, detections)
+    assert [tuple(int(v) for v in box) for box in boxes] == [(20, 20, 100, 60), (0, 0, 200, 100)]
@@ -0,0 +1,34 @@
+from face_tracker import FaceTracker, PeopleCounter
+
+def test_stationary_face_is_one_track():
+    tracker = FaceTracker()
+    ids = {tracker.update([(100, 100, 160, 170)])[0].id for _ in range(20)}
+    assert ids == {1}
+
+def test_stationary_face_over_many_frames_counts_once():
+    tracker, counter = FaceTracker(), PeopleCounter(window=60, min_hits=3)
+    for frame in range(30):
+        tracks = tracker.update([(100 + frame % 2, 100, 160, 170)])
+        counter.update(tracks, ['Male'], now=frame / 10)
+    assert counter.counts(now=3.0) == {'Male': 1, 'Female': 0}
+
+def test_people_are_counted_per_track():
+    tracker, counter = FaceTracker(), PeopleCounter(window=60, min_hits=3)
+    for frame in range(5):
+        tracks = tracker.update([(0, 0, 50, 60), (200, 0, 250, 60)])
+        counter.update(tracks, ['Male', 'Female'], now=frame)
+    assert counter.counts(now=5) == {'Male': 1, 'Female': 1}
+
+def test_unconfirmed_and_neutral_tracks_are_not_counted():
+    tracker, counter = FaceTracker(), PeopleCounter(window=60, min_hits=3)
+    # A one-frame false detection, and a face whose gender never settles
+    counter.update(tracker.update([(0, 0, 50, 60)]), ['Male'], now=0)
+    for frame in range(5):
+        counter.update(tracker.update([(200, 0, 250, 60)]), ['Neutral'], now=frame)
+    assert counter.counts(now=5) == {'Male': 0, 'Female': 0}
+
+def test_people_leave_the_count_after_the_window():
+    tracker, counter = FaceTracker(), PeopleCounter(window=10, min_hits=1)
+    counter.update(tracker.update([(0, 0, 50, 60)]), ['Female'], now=0)
+    assert counter.counts(now=5)['Female'] == 1
+    assert counter.counts(now=11)['Female'] == 0
@@ -0,0 +1,39 @@
+from frame_broadcast import ViewerRate, FrameBroadcaster
+
+INTERVAL = 1 / 25
+
+def test_slow_sends_step_down():
+    rate = ViewerRate(levels=3)
+    for _ in range(10):
+        rate.record(50000, INTERVAL * 1.5, INTERVAL)
+    assert rate.level == 2
+
+def test_backlog_steps_down_when_writes_look_instant():
+    # The socket buffer absorbs the writes, but frames keep queueing for the viewer
+    rate = ViewerRate(levels=3)
+    for _ in range(10):
+        rate.record(50000, 0.0005, INTERVAL, backlog=1)
+    assert rate.level > 0
+
+def test_buffered_writes_alone_do_not_step_down():
+    # Known limitation: without backlog or drops, writes absorbed by the socket
+    # buffer read as a fast viewer
+    rate = ViewerRate(levels=3)
+    for _ in range(10):
+        rate.record(50000, 0.0005, INTERVAL)
+    assert rate.level == 0
+
+def test_drop_steps_down_and_fast_viewer_climbs_back():
+    rate = ViewerRate(levels=3, up_frames=5)
+    assert rate.record(50000, 0.001, INTERVAL, dropped=1) == 1
+    levels = [rate.record(50000, 0.001, INTERVAL) for _ in range(30)]
+    assert levels[-1] == 0 and rate.changes == 2
+
+def test_slow_subscriber_only_drops_its_own_frames():
+    broadcaster = FrameBroadcaster(buffer_size=2)
+    fast, slow = broadcaster.subscribe(), broadcaster.subscribe()
+    for frame in range(5):
+        broadcaster.publish(frame)
+        assert fast.get(timeout=0) == frame
+    assert [slow.get(timeout=0), slow.get(timeout=0)] == [3, 4]
+    assert (fast.dropped, slow.dropped) == (0, 3)
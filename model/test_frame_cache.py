@@ -0,0 +1,34 @@
+import os
+import numpy as np
+from frame_cache import FrameResultCache, dhash, hamming
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+def test_backend_copy_is_identical():
+    # The backend vendors a copy of this module (sync step in its header)
+    with open(os.path.join(current_dir, 'frame_cache.py'), 'rb') as f:
+        model_copy = f.read()
+    with open(os.path.join(current_dir, '..', 'KavachEye-backend', 'frame_cache.py'), 'rb') as f:
+        backend_copy = f.read()
+    assert model_copy == backend_copy
+
+def test_near_duplicate_frame_hits():
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 256, (120, 160, 3), dtype=np.uint8)
+    noisy = np.clip(frame.astype(np.int16) + rng.integers(-2, 3, frame.shape), 0, 255).astype(np.uint8)
+    cache = FrameResultCache(max_distance=4)
+    cache.store('cam', cache.frame_hash(frame), {'people': 1}, 25.0)
+    result, distance, saved_ms = cache.lookup('cam', cache.frame_hash(noisy))
+    assert result == {'people': 1}
+    assert distance <= 4 and saved_ms == 25.0
+    # Other streams never share results
+    assert cache.lookup('other', cache.frame_hash(frame))[0] is None
+
+def test_different_frame_misses():
+    frame = np.zeros((120, 160, 3), np.uint8)
+    frame[:, 80:] = 255
+    flipped = frame[:, ::-1].copy()
+    assert hamming(dhash(frame), dhash(flipped)) > 4
+    cache = FrameResultCache(max_distance=4)
+    cache.store('cam', cache.frame_hash(frame), {'people': 1}, 25.0)
+    assert cache.lookup('cam', cache.frame_hash(flipped)) == (None, None, 0.0)
@@ -0,0 +1,55 @@
+import numpy as np
+from pose_faces import pose_face_boxes, merge_fallback_boxes
+
+class Tensor:
+    """The slice of the torch.Tensor API pose_face_boxes uses"""
+    def __init__(self, array):
+        self.array = np.asarray(array, dtype=np.float32)
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.array
+
+class Keypoints:
+    def __init__(self, xy, conf):
+        self.xy = Tensor(xy)
+        self.conf = None if conf is None else Tensor(conf)
+
+    def __len__(self):
+        return len(self.xy.array)
+
+class Result:
+    def __init__(self, keypoints):
+        self.keypoints = keypoints
+
+def person(cx, cy, conf=0.9):
+    xy = np.zeros((17, 2))
+    xy[:5] = [(cx, cy), (cx - 10, cy - 5), (cx + 10, cy - 5), (cx - 20, cy), (cx + 20, cy)]
+    confidences = np.zeros(17)
+    confidences[:5] = conf
+    return xy, confidences
+
+def test_no_person_falls_back_to_ssd():
+    assert pose_face_boxes(Result(None)) == ([], True)
+    assert pose_face_boxes(Result(Keypoints(np.zeros((0, 17, 2)), np.zeros((0, 17))))) == ([], True)
+
+def test_reliable_head_needs_no_fallback():
+    xy, conf = person(100, 100)
+    boxes, needs_fallback = pose_face_boxes(Result(Keypoints([xy], [conf])))
+    assert len(boxes) == 1 and not needs_fallback
+    startX, startY, endX, endY = boxes[0]
+    assert startX < 100 < endX and startY < 100 < endY
+
+def test_unreliable_head_falls_back():
+    good = person(100, 100)
+    turned_away = person(300, 100, conf=0.1)
+    boxes, needs_fallback = pose_face_boxes(Result(Keypoints([good[0], turned_away[0]], [good[1], turned_away[1]])))
+    assert len(boxes) == 1 and needs_fallback
+
+def test_merge_keeps_only_new_ssd_boxes():
+    pose_boxes = [(70, 70, 130, 140)]
+    merged = merge_fallback_boxes(pose_boxes, [(72, 72, 128, 138), (300, 300, 340, 350)])
+    assert merged == [(70, 70, 130, 140), (300, 300, 340, 350)]
+    assert merge_fallback_boxes([], [(1, 2, 3, 4)]) == [(1, 2, 3, 4)]
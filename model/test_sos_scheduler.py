@@ -0,0 +1,44 @@
+import time
+from sos_scheduler import SOSScheduler
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "timed out"
+        time.sleep(0.01)
+
+def make_scheduler(**kwargs):
+    sent, calls = [], []
+    scheduler = SOSScheduler(lambda contact, message: sent.append(contact),
+                             lambda contact, url: calls.append(contact), **kwargs)
+    return scheduler, sent, calls
+
+def test_resolve_drops_queued_steps():
+    scheduler, sent, _ = make_scheduler(interval=60)
+    scheduler.start('+100', 'cam1', 'alert', 'url')
+    scheduler.start('+200', 'cam2', 'alert', 'url')
+    # The first SMS of each sequence goes out at once, the second is queued
+    wait_for(lambda: len(sent) == 2 and scheduler.state()['queued_steps'] == 2)
+    cancelled = scheduler.cancel(incident='cam1')
+    assert [sequence['contact'] for sequence in cancelled] == ['+100']
+    state = scheduler.state()
+    assert state['queued_steps'] == 1
+    assert [sequence['incident'] for sequence in state['active']] == ['cam2']
+    scheduler.cancel()
+    assert scheduler.state()['queued_steps'] == 0
+
+def test_duplicate_trigger_does_not_start_a_second_sequence():
+    scheduler, sent, _ = make_scheduler(interval=60)
+    _, started = scheduler.start('+100', 'cam1', 'alert', 'url')
+    sequence, started_again = scheduler.start('+100', 'cam1', 'alert', 'url')
+    assert started and not started_again and sequence.triggers == 2
+    wait_for(lambda: sent and scheduler.state()['queued_steps'] == 1)
+    assert sent == ['+100']
+
+def test_sequence_calls_then_completes():
+    scheduler, sent, calls = make_scheduler(max_alerts=3, call_after_alerts=2, interval=0.01)
+    scheduler.start('+100', 'cam1', 'alert', 'url')
+    wait_for(lambda: scheduler.state()['recent'])
+    state = scheduler.state()
+    assert state['recent'][0]['status'] == 'completed'
+    assert (len(sent), calls, state['queued_steps']) == (3, ['+100'], 0)
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+from violence_stage import ViolenceStage
+
+LABELS = ['0 normal\n', '1 violence\n']
+
+class ScriptedModel:
+    """Returns the next violence score of the script on every predict call"""
+    def __init__(self, scores):
+        self.scores = list(scores)
+        self.calls = 0
+
+    def predict(self, x):
+        score = self.scores[self.calls]
+        self.calls += 1
+        return np.array([[1 - score, score]], np.float32)
+
+FRAME = np.zeros((32, 32, 3), np.uint8)
+
+def test_hysteresis_band():
+    # alpha=1 disables smoothing so the band alone decides the state
+    stage = ViolenceStage(ScriptedModel([0.5, 0.8, 0.6, 0.5, 0.3, 0.6]), LABELS, stride=1, alpha=1.0,
+                          on_threshold=0.7, off_threshold=0.4)
+    states = [stage.update(FRAME)['violent'] for _ in range(6)]
+    assert states == [False, True, True, True, False, False]
+
+def test_ema_smooths_a_single_spike():
+    stage = ViolenceStage(ScriptedModel([0.0, 1.0, 0.0]), LABELS, stride=1, alpha=0.3)
+    results = [stage.update(FRAME) for _ in range(3)]
+    assert results[1]['raw_score'] == pytest.approx(1.0)
+    assert results[1]['score'] == pytest.approx(0.3)
+    assert not any(result['violent'] for result in results)
+
+def test_stride_reuses_last_score():
+    model = ScriptedModel([0.9, 0.1])
+    stage = ViolenceStage(model, LABELS, stride=3, alpha=1.0)
+    results = [stage.update(FRAME) for _ in range(4)]
+    assert [result['evaluated'] for result in results] == [True, False, False, True]
+    assert model.calls == 2
+    assert results[2]['score'] == pytest.approx(0.9)
+
+def test_rejects_inverted_band():
+    with pytest.raises(ValueError):
+        ViolenceStage(ScriptedModel([]), LABELS, on_threshold=0.4, off_threshold=0.7)
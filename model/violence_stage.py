@@ -0,0 +1,55 @@
+import cv2
+import numpy as np
+
+# Frame-level violence classification.
+# The violence model looks at the whole frame, so it runs once per frame (or
+# once every `stride` frames) instead of once per detected face. Raw scores are
+# smoothed with an EMA and a hysteresis band so that a single noisy frame does
+# not flip the state.
+
+def preprocess_violence_frame(frame, img_size=(224, 224)):
+    """Resize a BGR frame to the (1, 224, 224, 3) tensor scaled to [-1, 1]"""
+    image_resized = cv2.resize(frame, img_size, interpolation=cv2.INTER_AREA)
+    image_array = np.asarray(image_resized, dtype=np.float32).reshape(1, img_size[1], img_size[0], 3)
+    return (image_array / 127.5) - 1
+
+class ViolenceStage:
+    def __init__(self, model, labels, stride=3, alpha=0.3, on_threshold=0.7, off_threshold=0.4):
+        if stride < 1:
+            raise ValueError("stride must be >= 1")
+        if off_threshold > on_threshold:
+            raise ValueError("off_threshold must not exceed on_threshold")
+        self.model = model
+        self.labels = [label.strip()[2:] for label in labels]
+        self.violence_index = self.labels.index('violence')
+        self.stride = stride
+        self.alpha = alpha
+        self.on_threshold = on_threshold
+        self.off_threshold = off_threshold
+        self.reset()
+
+    def reset(self):
+        self.frame_index = 0
+        self.raw_score = 0.0
+        self.score = 0.0
+        self.violent = False
+
+    def update(self, frame, context=None):
+        """Feed one frame; the model only runs on every `stride`-th call"""
+        evaluated = self.frame_index % self.stride == 0
+        self.frame_index += 1
+        if evaluated:
+            image_array = context.violence_tensor() if context is not None else preprocess_violence_frame(frame)
+            prediction = self.model.predict(image_array)
+            self.raw_score = float(prediction[0][self.violence_index])
+            self.score = self.alpha * self.raw_score + (1 - self.alpha) * self.score
+            if self.violent and self.score <= self.off_threshold:
+                self.violent = False
+            elif not self.violent and self.score >= self.on_threshold:
+                self.violent = True
+        return {
+            'evaluated': evaluated,
+            'raw_score': self.raw_score,
+            'score': self.score,
+            'violent': self.violent
+        }